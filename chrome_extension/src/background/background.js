@@ -10,9 +10,15 @@ let extensionState = {
   token: null,
   refreshToken: null,
   shortcuts: [],
+  categories: [],
+  syncCursor: null,
+  usageQueue: [],
   lastSync: null,
 };
 
+// Limite de usos guardados enquanto o servidor está inacessível
+const MAX_QUEUED_USAGES = 1000;
+
 // Restaurar estado do storage
 async function restoreState() {
   try {
@@ -21,6 +27,9 @@ async function restoreState() {
       "refreshToken",
       "user",
       "shortcuts",
+      "categories",
+      "syncCursor",
+      "usageQueue",
       "lastSync",
     ]);
 
@@ -44,6 +53,18 @@ async function restoreState() {
       );
     }
 
+    if (result.categories) {
+      extensionState.categories = result.categories;
+    }
+
+    if (result.syncCursor) {
+      extensionState.syncCursor = result.syncCursor;
+    }
+
+    if (result.usageQueue) {
+      extensionState.usageQueue = result.usageQueue;
+    }
+
     if (result.lastSync) {
       extensionState.lastSync = result.lastSync;
     }
@@ -66,6 +87,9 @@ async function saveState() {
       refreshToken: extensionState.refreshToken,
       user: extensionState.user,
       shortcuts: extensionState.shortcuts,
+      categories: extensionState.categories,
+      syncCursor: extensionState.syncCursor,
+      usageQueue: extensionState.usageQueue,
       lastSync: extensionState.lastSync,
     });
   } catch (error) {
@@ -209,6 +233,11 @@ async function tryAutoLogin() {
       if (data.authenticated && data.access) {
         // Login automático bem-sucedido
         extensionState.token = data.access;
+        if (extensionState.user?.id !== data.user?.id) {
+          // Outro usuário: descarta o cursor para forçar sincronização completa
+          extensionState.syncCursor = null;
+          extensionState.usageQueue = [];
+        }
         extensionState.user = data.user;
         extensionState.isAuthenticated = true;
 
@@ -407,6 +436,11 @@ async function handleLogin(credentials) {
       // Login bem-sucedido
       extensionState.token = data.access;
       extensionState.refreshToken = data.refresh; // Armazenar refresh token
+      if (extensionState.user?.id !== data.user?.id) {
+        // Outro usuário: descarta o cursor para forçar sincronização completa
+        extensionState.syncCursor = null;
+        extensionState.usageQueue = [];
+      }
       extensionState.user = data.user;
       extensionState.isAuthenticated = true;
 
@@ -456,6 +490,9 @@ async function handleLogout() {
       token: null,
       refreshToken: null,
       shortcuts: [],
+      categories: [],
+      syncCursor: null,
+      usageQueue: [],
       lastSync: null,
     };
 
@@ -471,7 +508,47 @@ async function handleLogout() {
   }
 }
 
-// Sincronizar atalhos com a API
+// Aplica um lote de alterações da sincronização incremental ao estado local
+function applySyncChanges(data) {
+  const deletedShortcuts = new Set(data.deleted?.shortcuts || []);
+  const deletedCategories = new Set(data.deleted?.categories || []);
+
+  const categoriesById = new Map(
+    (data.full ? [] : extensionState.categories).map((c) => [c.id, c]),
+  );
+  for (const id of deletedCategories) {
+    categoriesById.delete(id);
+  }
+  for (const category of data.categories || []) {
+    categoriesById.set(category.id, category);
+  }
+
+  const shortcutsById = new Map(
+    (data.full ? [] : extensionState.shortcuts).map((s) => [s.id, s]),
+  );
+  for (const id of deletedShortcuts) {
+    shortcutsById.delete(id);
+  }
+  for (const shortcut of data.shortcuts || []) {
+    shortcutsById.set(shortcut.id, shortcut);
+  }
+
+  // Mantém o nome da categoria consistente com renomeações e exclusões
+  for (const shortcut of shortcutsById.values()) {
+    if (shortcut.category && !categoriesById.has(shortcut.category)) {
+      shortcut.category = null;
+      shortcut.category_name = null;
+    } else if (shortcut.category) {
+      shortcut.category_name = categoriesById.get(shortcut.category).name;
+    }
+  }
+
+  extensionState.categories = Array.from(categoriesById.values());
+  extensionState.shortcuts = Array.from(shortcutsById.values());
+  extensionState.syncCursor = data.cursor;
+}
+
+// Sincronizar atalhos com a API (apenas alterações desde o último cursor)
 async function syncShortcuts() {
   if (!extensionState.isAuthenticated || !extensionState.token) {
     return { success: false, error: "Não autenticado" };
@@ -480,20 +557,25 @@ async function syncShortcuts() {
   try {
     console.log("🔄 Sincronizando atalhos...");
 
-    const result = await authenticatedFetch(`${API_BASE_URL}/shortcuts/api/shortcuts/`, {
+    let url = `${API_BASE_URL}/shortcuts/api/shortcuts/changes/`;
+    if (extensionState.syncCursor) {
+      url += `?since=${encodeURIComponent(extensionState.syncCursor)}`;
+    }
+
+    const result = await authenticatedFetch(url, {
       method: "GET",
     });
 
     if (result.success && result.response.ok) {
       const data = await result.response.json();
-      extensionState.shortcuts = data.results || data || [];
+      applySyncChanges(data);
       extensionState.lastSync = Date.now();
 
       // Salvar no storage
       await saveState();
 
       console.log(
-        `✅ ${extensionState.shortcuts.length} atalhos sincronizados`,
+        `✅ ${extensionState.shortcuts.length} atalhos sincronizados (${data.full ? "completa" : `${data.shortcuts.length} alterados, ${data.deleted.shortcuts.length} removidos`})`,
       );
 
       return {
@@ -501,6 +583,11 @@ async function syncShortcuts() {
         shortcuts: extensionState.shortcuts,
         lastSync: extensionState.lastSync,
       };
+    } else if (result.status === 400 && extensionState.syncCursor) {
+      // Cursor inválido: descarta e faz uma sincronização completa
+      console.warn("⚠️ Cursor de sincronização inválido, refazendo sincronização completa");
+      extensionState.syncCursor = null;
+      return await syncShortcuts();
     } else {
       console.error("❌ Erro na sincronização:", result.status || "desconhecido");
       
@@ -516,38 +603,81 @@ async function syncShortcuts() {
   }
 }
 
-// Marcar atalho como usado
-async function markShortcutAsUsed(shortcutId) {
+// Enfileira o uso de um atalho para envio em lote
+async function queueShortcutUsage(shortcutId, context = "") {
+  extensionState.usageQueue.push({
+    shortcut_id: shortcutId,
+    used_at: new Date().toISOString(),
+    context: context,
+  });
+
+  if (extensionState.usageQueue.length > MAX_QUEUED_USAGES) {
+    extensionState.usageQueue.splice(
+      0,
+      extensionState.usageQueue.length - MAX_QUEUED_USAGES,
+    );
+  }
+
+  await saveState();
+}
+
+// Envia os usos enfileirados (offline ou limitados) em uma única requisição
+async function flushUsageQueue() {
   if (!extensionState.isAuthenticated || !extensionState.token) {
     return { success: false, error: "Não autenticado" };
   }
 
+  const events = extensionState.usageQueue.slice(0, MAX_QUEUED_USAGES);
+  if (events.length === 0) {
+    return { success: true, recorded: 0 };
+  }
+
   try {
     const result = await authenticatedFetch(
-      `${API_BASE_URL}/shortcuts/api/shortcuts/${shortcutId}/use/`,
+      `${API_BASE_URL}/shortcuts/api/shortcuts/use-batch/`,
       {
         method: "POST",
+        body: JSON.stringify({ events }),
       },
     );
 
     if (result.success && result.response.ok) {
-      console.log(`✅ Atalho ${shortcutId} marcado como usado`);
-      return { success: true };
+      const data = await result.response.json();
+      // Remove apenas o que foi enviado; novos usos podem ter chegado nesse meio tempo
+      extensionState.usageQueue = extensionState.usageQueue.slice(events.length);
+      await saveState();
+      console.log(`✅ ${data.recorded} usos de atalhos registrados`);
+      return { success: true, recorded: data.recorded };
+    } else if (result.status === 400) {
+      // Lote rejeitado pela validação: descarta para não bloquear a fila
+      console.warn("⚠️ Lote de usos inválido descartado");
+      extensionState.usageQueue = extensionState.usageQueue.slice(events.length);
+      await saveState();
+      return { success: false, error: "Lote inválido" };
     } else {
-      console.error("❌ Erro ao marcar atalho como usado:", result.status || "desconhecido");
-      
+      console.warn("⚠️ Usos mantidos na fila:", result.status || "desconhecido");
+
       if (result.requiresLogin) {
         return { success: false, error: "Requer novo login", requiresLogin: true };
       }
-      
+
       return { success: false, error: result.error || "Erro na API" };
     }
   } catch (error) {
-    console.error("❌ Erro de conexão ao marcar uso:", error);
+    console.warn("⚠️ Sem conexão, usos mantidos na fila:", error);
     return { success: false, error: "Erro de conexão" };
   }
 }
 
+// Marcar atalho como usado
+async function markShortcutAsUsed(shortcutId, context = "") {
+  await queueShortcutUsage(shortcutId, context);
+  const result = await flushUsageQueue();
+
+  // O uso fica na fila e será reenviado na próxima sincronização
+  return { success: true, queued: !result.success };
+}
+
 // Expandir texto com atalho
 async function handleTextExpansion(payload) {
   const { trigger } = payload;
@@ -584,17 +714,10 @@ async function handleTextExpansion(payload) {
       expandedText = expandedText.replace(regex, value);
     }
 
-    // Marcar como usado (opcional - não bloquear se falhar)
-    try {
-      await authenticatedFetch(
-        `${API_BASE_URL}/shortcuts/api/shortcuts/${shortcut.id}/use/`,
-        {
-          method: "POST",
-        },
-      );
-    } catch (error) {
+    // Marcar como usado (enfileirado - não bloqueia a expansão se falhar)
+    markShortcutAsUsed(shortcut.id, payload.context || "").catch((error) => {
       console.warn("⚠️ Não foi possível marcar atalho como usado:", error);
-    }
+    });
 
     console.log(
       "✨ Texto expandido:",
@@ -619,6 +742,7 @@ if (chrome.alarms) {
   chrome.alarms.onAlarm.addListener(async (alarm) => {
     if (alarm.name === "syncShortcuts" && extensionState.isAuthenticated) {
       console.log("⏰ Sincronização automática iniciada");
+      await flushUsageQueue();
       await syncShortcuts();
     }
   });
@@ -64,10 +64,11 @@ class ActivityLogAdmin(admin.ModelAdmin):
 class SystemStatsAdmin(admin.ModelAdmin):
     list_display = [
         'date', 'total_users', 'active_users', 'total_shortcuts',
-        'total_shortcut_uses', 'total_ai_requests', 'created_at'
+        'total_shortcut_uses', 'total_ai_requests', 'computed_at'
     ]
     list_filter = ['date', 'created_at']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'computed_at']
+    date_hierarchy = 'date'
 
     def has_add_permission(self, request):
         return False  # Stats são geradas automaticamente
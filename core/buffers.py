@@ -0,0 +1,160 @@
+"""
+Filas em memória gravadas em lote.
+
+``BatchBuffer`` é a base das filas que tiram gravações de alto volume do
+caminho da requisição (uso de atalhos, log de atividades, analytics da
+landing page): ``add`` apenas enfileira, e uma thread em segundo plano grava
+a fila em lotes de ``batch_size`` itens quando ela enche ou a cada
+``flush_interval`` segundos. A fila é limitada (``max_size``): com ela cheia
+os itens novos são descartados e contados em ``dropped``, então a memória do
+worker não cresce com o banco fora do ar.
+
+Se um lote falha, ``recover`` decide o que fazer com ele. O padrão devolve o
+que couber para a fila (o restante conta como descartado) e encerra o flush;
+a próxima rodada tenta de novo.
+
+Com ``threaded=False`` a thread nunca é iniciada e a fila só é gravada por
+``flush``/``drain``, o que deixa os testes determinísticos.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBuffer:
+    """Fila limitada em processo, gravada em lotes por uma thread em segundo plano"""
+
+    thread_name = 'batch-buffer'
+    label = 'itens'
+
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 500, max_size: int = 10000,
+                 threaded: bool = True):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_size = max_size
+        self.threaded = threaded
+        self.written = 0
+        self.dropped = 0
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def write(self, batch: list) -> int:
+        """Grava um lote e devolve quantos itens foram gravados"""
+        raise NotImplementedError
+
+    def add(self, item) -> bool:
+        """Enfileira um item sem esperar pela gravação; False se ele foi descartado"""
+        return self.add_many([item])
+
+    def add_many(self, items) -> bool:
+        """
+        Enfileira vários itens de uma vez
+
+        Returns:
+            False se não houver espaço para todos (nenhum é enfileirado)
+        """
+        items = list(items)
+        with self._lock:
+            if self._stopping or len(self._items) + len(items) > self.max_size:
+                self._drop(len(items))
+                return False
+            self._items.extend(items)
+            size = len(self._items)
+            if self.threaded:
+                self._ensure_thread()
+        if size >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _drop(self, count: int):
+        """Conta itens descartados (chamar com ``_lock``)"""
+        before = self.dropped
+        self.dropped += count
+        if before == 0 or before // 1000 != self.dropped // 1000:
+            logger.warning(f"Fila de {self.label} cheia: {self.dropped} descartados")
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def recover(self, batch: list, error: Exception) -> Optional[int]:
+        """
+        Trata um lote que falhou
+
+        Returns:
+            Itens gravados, ou None para encerrar o flush (o lote voltou para a fila)
+        """
+        with self._lock:
+            # Devolve o que couber; o restante conta como descartado
+            room = max(0, self.max_size - len(self._items))
+            self._items.extendleft(reversed(batch[:room]))
+            if len(batch) > room:
+                self._drop(len(batch) - room)
+        return None
+
+    def flush(self) -> int:
+        """Grava os itens pendentes em lotes"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+                if not batch:
+                    break
+
+                try:
+                    count = self.write(batch)
+                except Exception as e:
+                    logger.error(f"Erro ao gravar {len(batch)} {self.label}: {str(e)}")
+                    count = self.recover(batch, e)
+                    if count is None:
+                        break
+
+                written += count
+                with self._lock:
+                    self.written += count
+
+        if written:
+            logger.debug(f"{written} {self.label} gravados")
+        return written
+
+    def drain(self, timeout: float = 5.0) -> int:
+        """Para de aceitar itens e grava o que estiver na fila (encerramento do processo)"""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': len(self._items),
+                'written': self.written,
+                'dropped': self.dropped,
+            }
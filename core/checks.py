@@ -0,0 +1,32 @@
+"""
+Verificações do sistema do projeto.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends cujo conteúdo não é visto pelos outros processos
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Exige um cache compartilhado quando SHARED_CACHE_REQUIRED está ativo"""
+    if not getattr(settings, 'SHARED_CACHE_REQUIRED', False):
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f'O cache padrão ({backend}) não é compartilhado entre os processos.',
+            hint=(
+                'As versões dos índices de autocomplete, gatilhos e sugestões e os snapshots de '
+                'estatísticas dependem do cache do Django. Configure REDIS_URL ou use o '
+                'DatabaseCache (python manage.py createcachetable).'
+            ),
+            id='core.E001',
+        )
+    ]
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.system_stats import aggregate_system_stats
+
+
+class Command(BaseCommand):
+    help = 'Calcula as estatísticas diárias do sistema (SystemStats), com backfill retomável de dias anteriores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Primeiro dia (AAAA-MM-DD)')
+        parser.add_argument('--end', help='Último dia (AAAA-MM-DD, padrão: hoje)')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Últimos N dias quando --start não é informado (padrão: ontem e hoje)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Desde o cadastro do primeiro usuário',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Dias calculados por trecho',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Trechos processados em paralelo',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recalcula também os dias já fechados',
+        )
+
+    def _parse(self, value, option):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Data inválida para {option}: '{value}'")
+        return day
+
+    def handle(self, *args, **options):
+        end = self._parse(options['end'], '--end') if options['end'] else timezone.localdate()
+
+        if options['all']:
+            first_joined = User.objects.aggregate(first=Min('date_joined'))['first']
+            start = timezone.localdate(first_joined) if first_joined else end
+        elif options['start']:
+            start = self._parse(options['start'], '--start')
+        else:
+            start = end - timedelta(days=max(1, options['days']) - 1)
+
+        if start > end:
+            raise CommandError('--start deve ser anterior a --end')
+
+        self.stdout.write(f'📊 Calculando estatísticas do sistema de {start} a {end}...')
+        written = aggregate_system_stats(
+            start, end,
+            chunk_days=options['chunk_days'],
+            workers=max(1, options['workers']),
+            force=options['force'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ {written} dias gravados'))
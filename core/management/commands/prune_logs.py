@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.retention import ensure_monthly_partitions, get_policies, is_partitioned, prune_policy
+
+
+class Command(BaseCommand):
+    help = 'Apaga (e arquiva em JSONL compactado) os registros de log mais antigos que a retenção configurada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            action='append',
+            help='Apenas esta política (pode repetir): ' + ', '.join(policy.name for policy in get_policies()),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Faixa de ids apagada por transação',
+        )
+        parser.add_argument('--archive-dir', help='Diretório dos arquivos (padrão: LOG_ARCHIVE_DIR)')
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Apaga sem arquivar',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantos registros seriam apagados',
+        )
+        parser.add_argument(
+            '--partitions',
+            action='store_true',
+            help='Cria as próximas partições mensais das tabelas em LOG_PARTITIONED_TABLES (PostgreSQL)',
+        )
+
+    def handle(self, *args, **options):
+        policies = get_policies()
+        if options['only']:
+            unknown = set(options['only']) - {policy.name for policy in policies}
+            if unknown:
+                raise CommandError(f"Políticas desconhecidas: {', '.join(sorted(unknown))}")
+            policies = [policy for policy in policies if policy.name in options['only']]
+
+        if options['partitions']:
+            self._ensure_partitions(policies)
+
+        for policy in policies:
+            if policy.keep_days <= 0:
+                self.stdout.write(f'⏭️  {policy.name}: retenção desativada')
+                continue
+
+            if options['dry_run']:
+                model = apps.get_model(policy.model)
+                cutoff = timezone.now() - timedelta(days=policy.keep_days)
+                count = model.objects.filter(
+                    **{f'{policy.date_field}__lt': cutoff}, **policy.filters
+                ).count()
+                self.stdout.write(f'🔍 {policy.name}: {count} registros anteriores a {cutoff:%Y-%m-%d}')
+                continue
+
+            if options['no_archive']:
+                policy = policy._replace(archive=False)
+
+            result = prune_policy(
+                policy,
+                chunk_size=max(1, options['chunk_size']),
+                archive_dir=options['archive_dir'],
+            )
+            message = f'✅ {policy.name}: {result.deleted} registros apagados'
+            if result.archive_path:
+                message += f' (arquivo: {result.archive_path})'
+            if result.dropped_partitions:
+                message += f" | partições: {', '.join(result.dropped_partitions)}"
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def _ensure_partitions(self, policies):
+        partitioned = getattr(settings, 'LOG_PARTITIONED_TABLES', [])
+        for policy in policies:
+            model = apps.get_model(policy.model)
+            if model._meta.db_table not in partitioned:
+                continue
+            if not is_partitioned(model):
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️  {model._meta.db_table} não é uma tabela particionada (PostgreSQL)'
+                ))
+                continue
+            created = ensure_monthly_partitions(model)
+            self.stdout.write(f"🗂️  {model._meta.db_table}: partições {', '.join(created)}")
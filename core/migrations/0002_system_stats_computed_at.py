@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemstats',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Calculado em'),
+        ),
+    ]
@@ -67,7 +67,8 @@ class ActivityLog(models.Model):
     metadata = models.JSONField(default=dict, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Momento da ação, não da gravação em lote (core.activity)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Log de Atividade"
@@ -83,26 +84,26 @@ class ActivityLog(models.Model):
 
     @classmethod
     def log_activity(cls, user, action, description="", metadata=None, request=None):
-        """Método helper para registrar atividades"""
-        log_data = {
-            'user': user,
-            'action': action,
-            'description': description,
-            'metadata': metadata or {}
-        }
+        """
+        Método helper para registrar atividades (gravação em lote, ver core.activity)
+
+        Não retorna o registro: no modo assíncrono ele ainda não foi gravado
+        (sem ``pk``) e pode até ser descartado com a fila cheia.
+        """
+        from .activity import get_request_ip, log_activity
+
+        log = cls(
+            user=user,
+            action=action,
+            description=description,
+            metadata=metadata or {}
+        )
 
         if request:
-            # Extrai IP do request
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip = x_forwarded_for.split(',')[0]
-            else:
-                ip = request.META.get('REMOTE_ADDR')
-
-            log_data['ip_address'] = ip
-            log_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
+            log.ip_address = get_request_ip(request)
+            log.user_agent = request.META.get('HTTP_USER_AGENT', '')
 
-        return cls.objects.create(**log_data)
+        log_activity(log)
 
 
 class SystemStats(models.Model):
@@ -115,6 +116,7 @@ class SystemStats(models.Model):
     total_ai_requests = models.PositiveIntegerField(default=0)
     date = models.DateField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
+    computed_at = models.DateTimeField(null=True, blank=True, verbose_name="Calculado em")
 
     class Meta:
         verbose_name = "Estatística do Sistema"
@@ -127,38 +129,9 @@ class SystemStats(models.Model):
 
     @classmethod
     def update_daily_stats(cls):
-        """Atualiza as estatísticas diárias"""
-        from django.contrib.auth.models import User
-        from shortcuts.models import Shortcut, ShortcutUsage
-        from users.models import UserProfile
-
-        today = timezone.now().date()
-
-        # Calcula estatísticas
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        total_shortcuts = Shortcut.objects.filter(is_active=True).count()
-        total_shortcut_uses = sum(Shortcut.objects.values_list('use_count', flat=True))
-        total_ai_requests = sum(UserProfile.objects.values_list('ai_requests_used', flat=True))
-
-        # Cria ou atualiza registro
-        stats, created = cls.objects.get_or_create(
-            date=today,
-            defaults={
-                'total_users': total_users,
-                'active_users': active_users,
-                'total_shortcuts': total_shortcuts,
-                'total_shortcut_uses': total_shortcut_uses,
-                'total_ai_requests': total_ai_requests,
-            }
-        )
+        """Atualiza as estatísticas do dia (agregadas no banco, ver core.system_stats)"""
+        from .system_stats import aggregate_system_stats
 
-        if not created:
-            stats.total_users = total_users
-            stats.active_users = active_users
-            stats.total_shortcuts = total_shortcuts
-            stats.total_shortcut_uses = total_shortcut_uses
-            stats.total_ai_requests = total_ai_requests
-            stats.save()
-
-        return stats
+        today = timezone.localdate()
+        aggregate_system_stats(today, today, force=True)
+        return cls.objects.get(date=today)
@@ -0,0 +1,271 @@
+"""
+Retenção dos logs de alto volume.
+
+Cada tabela tem uma ``RetentionPolicy``: quantos dias ficam no banco, se as
+linhas mais antigas são arquivadas antes de apagar (JSONL compactado com gzip
+em ``LOG_ARCHIVE_DIR``) e, quando necessário, um rollup que precisa estar em
+dia antes da limpeza. Os totais que os dashboards usam já vivem em tabelas
+consolidadas (``ShortcutUsageDaily``, ``SystemStats``), então apagar os
+registros brutos não muda nenhuma estatística.
+
+A limpeza (comando ``prune_logs``) percorre a tabela em faixas de chave
+primária, do id mais antigo para o mais novo, e apaga cada faixa em uma
+transação curta, sem sinais por linha; ela para na primeira faixa que só
+tem linhas dentro do prazo. Nenhuma tabela referencia esses logs por FK.
+Os registros de exclusão da sincronização (``SyncTombstone``) entram na
+mesma limpeza, sempre guardados por mais tempo que a idade máxima de um
+cursor aceito.
+
+No PostgreSQL, as tabelas em ``LOG_PARTITIONED_TABLES`` que já foram
+convertidas em tabelas particionadas por mês (``PARTITION BY RANGE`` na
+coluna de data) ganham partições futuras, e as partições vencidas saem de uma
+vez em vez de linha a linha: são desanexadas (políticas com arquivamento,
+para exportação externa) ou removidas com ``DROP TABLE``. A conversão da
+tabela é uma migração manual, feita uma vez por tabela.
+"""
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy(NamedTuple):
+    """Política de retenção de uma tabela de log"""
+    name: str
+    model: str
+    date_field: str
+    keep_days: int
+    archive: bool = True
+    filters: dict = {}
+    rollup: Optional[str] = None
+
+
+class PruneResult(NamedTuple):
+    name: str
+    deleted: int
+    archive_path: Optional[str] = None
+    dropped_partitions: tuple = ()
+
+
+DEFAULT_POLICIES = [
+    RetentionPolicy('shortcut_usage', 'shortcuts.ShortcutUsage', 'used_at', 180),
+    RetentionPolicy('activity_log', 'core.ActivityLog', 'created_at', 90),
+    RetentionPolicy(
+        'ai_enhancement_log', 'shortcuts.AIEnhancementLog', 'created_at', 90,
+        rollup='core.retention.close_system_stats'
+    ),
+    # Só eventos já processados; os pendentes ficam até serem tratados
+    RetentionPolicy(
+        'stripe_webhook_event', 'payments.StripeWebhookEvent', 'created_at', 90,
+        filters={'processed': True}
+    ),
+    # O prazo acompanha SYNC_TOMBSTONE_RETENTION_DAYS (ver get_policies)
+    RetentionPolicy('sync_tombstone', 'shortcuts.SyncTombstone', 'deleted_at', 31, archive=False),
+]
+
+
+def get_policies() -> list:
+    """Políticas com os prazos de ``LOG_RETENTION_DAYS`` (0 desativa a limpeza da tabela)"""
+    overrides = getattr(settings, 'LOG_RETENTION_DAYS', {})
+    policies = []
+    for policy in DEFAULT_POLICIES:
+        keep_days = overrides.get(policy.name, policy.keep_days)
+        if policy.name == 'sync_tombstone' and keep_days > 0:
+            # Um cursor de sincronização aceito ainda precisa encontrar as exclusões feitas depois dele
+            keep_days = max(keep_days, getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30) + 1)
+        policies.append(policy._replace(keep_days=keep_days))
+    return policies
+
+
+def close_system_stats(cutoff):
+    """Garante o SystemStats dos dias que vão perder os registros brutos"""
+    from .system_stats import aggregate_system_stats
+
+    first = apps.get_model('shortcuts.AIEnhancementLog').objects.aggregate(first=Min('created_at'))['first']
+    if first is not None:
+        aggregate_system_stats(timezone.localdate(first), timezone.localdate(cutoff) - timedelta(days=1))
+
+
+def _archive_file(policy: RetentionPolicy, archive_dir) -> Path:
+    directory = Path(archive_dir) / policy.name
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{policy.name}-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz'
+
+
+def _delete_pks(model, pks) -> int:
+    """
+    ``DELETE`` direto pelos ids da faixa
+
+    Sem coleta de relacionados nem sinais por linha (``QuerySet.delete``
+    carregaria cada linha para disparar ``post_delete``): nada referencia
+    estes logs por FK.
+    """
+    if not pks:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(pks))})", pks)
+        return cursor.rowcount
+
+
+def prune_policy(policy: RetentionPolicy, chunk_size: int = 5000, archive_dir=None, now=None) -> PruneResult:
+    """
+    Apaga (e arquiva) as linhas de uma tabela mais antigas que o prazo da política
+
+    Args:
+        chunk_size: Tamanho de cada faixa de ids (uma transação por faixa)
+        archive_dir: Diretório dos arquivos JSONL (padrão: ``LOG_ARCHIVE_DIR``)
+    """
+    if policy.keep_days <= 0:
+        return PruneResult(policy.name, 0)
+
+    model = apps.get_model(policy.model)
+    cutoff = (now or timezone.now()) - timedelta(days=policy.keep_days)
+    if policy.rollup:
+        import_string(policy.rollup)(cutoff)
+
+    dropped = ()
+    if model._meta.db_table in getattr(settings, 'LOG_PARTITIONED_TABLES', []) and is_partitioned(model):
+        dropped = drop_expired_partitions(model, cutoff, archive=policy.archive)
+
+    archive = None
+    archive_path = None
+    if policy.archive:
+        archive_path = _archive_file(policy, archive_dir or getattr(settings, 'LOG_ARCHIVE_DIR', 'archive'))
+
+    old = {f'{policy.date_field}__lt': cutoff, **policy.filters}
+    recent = {f'{policy.date_field}__gte': cutoff}
+    deleted = 0
+    next_pk = model.objects.aggregate(first=Min('pk'))['first']
+
+    try:
+        while next_pk is not None:
+            window = model.objects.filter(pk__gte=next_pk, pk__lt=next_pk + chunk_size)
+            expired = window.filter(**old)
+
+            with transaction.atomic():
+                if archive_path is not None:
+                    rows = list(expired.values())
+                    if rows:
+                        if archive is None:
+                            archive = gzip.open(archive_path, 'at', encoding='utf-8')
+                        for row in rows:
+                            archive.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+                    pks = [row[model._meta.pk.attname] for row in rows]
+                else:
+                    pks = list(expired.values_list('pk', flat=True))
+                count = _delete_pks(model, pks)
+            deleted += count
+
+            # Os ids crescem com o tempo: uma faixa sem nada a apagar e com linhas recentes encerra a varredura
+            if count == 0 and window.filter(**recent).exists():
+                break
+            next_pk = model.objects.filter(pk__gte=next_pk + chunk_size).aggregate(first=Min('pk'))['first']
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if deleted:
+        logger.info(f"Retenção {policy.name}: {deleted} linhas apagadas (anteriores a {cutoff:%Y-%m-%d})")
+    return PruneResult(policy.name, deleted, str(archive_path) if archive is not None else None, dropped)
+
+
+def prune_logs(names=None, chunk_size: int = 5000, archive_dir=None) -> list:
+    """Aplica as políticas de retenção (todas ou apenas ``names``)"""
+    return [
+        prune_policy(policy, chunk_size=chunk_size, archive_dir=archive_dir)
+        for policy in get_policies()
+        if names is None or policy.name in names
+    ]
+
+
+# Partições mensais (PostgreSQL)
+
+def _partition_name(table: str, month) -> str:
+    return f'{table}_p{month.year}{month.month:02d}'
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def is_partitioned(model) -> bool:
+    """Verifica se a tabela do modelo é particionada (sempre False fora do PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def ensure_monthly_partitions(model, months_ahead: int = 2) -> list:
+    """Cria as partições do mês atual e dos próximos meses (UTC)"""
+    table = model._meta.db_table
+    month = timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+    created = []
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            upper = _next_month(month)
+            name = _partition_name(table, month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(name)} "
+                f"PARTITION OF {connection.ops.quote_name(table)} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+            )
+            created.append(name)
+            month = upper
+    return created
+
+
+def drop_expired_partitions(model, cutoff, archive: bool = True) -> tuple:
+    """
+    Remove as partições mensais que terminam antes de ``cutoff``
+
+    Com ``archive`` as partições são apenas desanexadas (``DETACH``) e
+    continuam no banco como tabelas comuns, para exportação externa.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [table]
+        )
+        partitions = [row[0] for row in cursor.fetchall()]
+
+    removed = []
+    prefix = f'{table}_p'
+    for name in sorted(partitions):
+        suffix = name[len(prefix):]
+        if not name.startswith(prefix) or len(suffix) != 6 or not suffix.isdigit():
+            continue
+        month = datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=dt_timezone.utc).date()
+        upper = datetime.combine(_next_month(month), datetime.min.time(), tzinfo=dt_timezone.utc)
+        if upper > cutoff:
+            continue
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {connection.ops.quote_name(table)} DETACH PARTITION {connection.ops.quote_name(name)}"
+            )
+            if not archive:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+        removed.append(name)
+        logger.info(f"Partição {name} {'desanexada' if archive else 'removida'}")
+    return tuple(removed)
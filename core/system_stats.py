@@ -0,0 +1,201 @@
+"""
+Agregação das estatísticas diárias do sistema (``SystemStats``).
+
+Cada dia é calculado com agregações no banco: um total acumulado até o início
+do trecho e contagens agrupadas por dia (``TruncDate``) dentro dele, somadas
+em Python dia a dia. Nenhuma linha de usuário ou atalho é trazida para a
+memória, e um trecho de N dias custa o mesmo número de consultas que um dia.
+
+* ``total_users`` / ``active_users``: contas criadas até o dia (todas / ativas);
+* ``total_shortcuts``: atalhos ativos criados até o dia;
+* ``total_shortcut_uses``: usos acumulados até o dia (``ShortcutUsageDaily``);
+* ``total_ai_requests``: expansões por IA bem-sucedidas no mês até o dia
+  (``AIEnhancementLog``).
+
+A gravação é um upsert por data, então reprocessar é idempotente. Dias já
+fechados (calculados depois de terminarem) são pulados, o que torna o
+backfill retomável: cada trecho é gravado na sua própria transação e uma nova
+execução continua de onde a anterior parou.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from shortcuts.models import AIEnhancementLog, Shortcut, ShortcutUsageDaily
+
+from .models import SystemStats
+
+logger = logging.getLogger(__name__)
+
+MAX_RANGE_DAYS = 366
+
+STATS_FIELDS = ['total_users', 'active_users', 'total_shortcuts', 'total_shortcut_uses', 'total_ai_requests']
+
+
+def _day_start(day) -> datetime:
+    """Início do dia no fuso local"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _days(start, end) -> list:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _counts_by_day(queryset, field: str, start, end) -> dict:
+    """Contagens por dia local de ``field`` entre ``start`` e ``end``"""
+    return dict(
+        queryset.filter(**{f'{field}__gte': _day_start(start), f'{field}__lt': _day_start(end + timedelta(days=1))})
+        .annotate(day=TruncDate(field))
+        .values('day')
+        .annotate(total=Count('id'))
+        .values_list('day', 'total')
+    )
+
+
+def _cumulative(queryset, field: str, start, end) -> dict:
+    """Totais acumulados até o fim de cada dia do trecho"""
+    running = queryset.filter(**{f'{field}__lt': _day_start(start)}).count()
+    daily = _counts_by_day(queryset, field, start, end)
+    totals = {}
+    for day in _days(start, end):
+        running += daily.get(day, 0)
+        totals[day] = running
+    return totals
+
+
+def _cumulative_uses(start, end) -> dict:
+    running = ShortcutUsageDaily.objects.filter(date__lt=start).aggregate(total=Sum('count'))['total'] or 0
+    daily = dict(
+        ShortcutUsageDaily.objects.filter(date__gte=start, date__lte=end)
+        .values('date')
+        .annotate(total=Sum('count'))
+        .values_list('date', 'total')
+    )
+    totals = {}
+    for day in _days(start, end):
+        running += daily.get(day, 0)
+        totals[day] = running
+    return totals
+
+
+def _month_to_date_ai_requests(start, end) -> dict:
+    """Expansões por IA do primeiro dia do mês até cada dia do trecho"""
+    logs = AIEnhancementLog.objects.filter(status='success')
+    month_start = start.replace(day=1)
+    daily = _counts_by_day(logs, 'created_at', month_start, end)
+    totals = {}
+    running = sum(count for day, count in daily.items() if day < start)
+    for day in _days(start, end):
+        if day.day == 1:
+            running = 0
+        running += daily.get(day, 0)
+        totals[day] = running
+    return totals
+
+
+def compute_stats_range(start, end) -> list:
+    """Calcula (sem gravar) as estatísticas de cada dia entre ``start`` e ``end``"""
+    users = _cumulative(User.objects.all(), 'date_joined', start, end)
+    active_users = _cumulative(User.objects.filter(is_active=True), 'date_joined', start, end)
+    shortcuts = _cumulative(Shortcut.objects.filter(is_active=True), 'created_at', start, end)
+    uses = _cumulative_uses(start, end)
+    ai_requests = _month_to_date_ai_requests(start, end)
+
+    now = timezone.now()
+    return [
+        SystemStats(
+            date=day,
+            total_users=users[day],
+            active_users=active_users[day],
+            total_shortcuts=shortcuts[day],
+            total_shortcut_uses=uses[day],
+            total_ai_requests=ai_requests[day],
+            computed_at=now,
+        )
+        for day in _days(start, end)
+    ]
+
+
+def _pending_days(start, end, force: bool) -> list:
+    """Dias do intervalo que ainda não foram fechados"""
+    days = _days(start, end)
+    if force:
+        return days
+    closed = {
+        day for day, computed_at in
+        SystemStats.objects.filter(date__gte=start, date__lte=end, computed_at__isnull=False)
+        .values_list('date', 'computed_at')
+        if computed_at >= _day_start(day + timedelta(days=1))
+    }
+    return [day for day in days if day not in closed]
+
+
+def _chunks(days: list, chunk_days: int) -> list:
+    """Agrupa dias em trechos contíguos de até ``chunk_days`` dias"""
+    chunks = []
+    for day in days:
+        if chunks and (day - chunks[-1][1]).days == 1 and (day - chunks[-1][0]).days < chunk_days:
+            chunks[-1][1] = day
+        else:
+            chunks.append([day, day])
+    return [tuple(chunk) for chunk in chunks]
+
+
+def _write_chunk(start, end) -> int:
+    rows = compute_stats_range(start, end)
+    with transaction.atomic():
+        SystemStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=STATS_FIELDS + ['computed_at'],
+        )
+    logger.debug(f"Estatísticas do sistema gravadas de {start} a {end}")
+    return len(rows)
+
+
+def aggregate_system_stats(start=None, end=None, chunk_days: int = 31, workers: int = 1, force: bool = False) -> int:
+    """
+    Calcula e grava as estatísticas diárias do intervalo
+
+    Args:
+        start: Primeiro dia (padrão: ``end``)
+        end: Último dia (padrão: hoje)
+        chunk_days: Dias calculados por trecho (cada trecho é uma transação)
+        workers: Trechos processados em paralelo
+        force: Recalcula também os dias já fechados
+
+    Returns:
+        Quantidade de dias gravados
+    """
+    end = end or timezone.localdate()
+    start = start or end
+    chunks = _chunks(_pending_days(start, end, force), max(1, chunk_days))
+    if not chunks:
+        return 0
+
+    if workers <= 1 or len(chunks) == 1:
+        written = sum(_write_chunk(chunk_start, chunk_end) for chunk_start, chunk_end in chunks)
+    else:
+        def process(chunk):
+            try:
+                return _write_chunk(*chunk)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='system-stats') as executor:
+            written = sum(executor.map(process, chunks))
+
+    logger.info(f"Estatísticas do sistema: {written} dias gravados ({start} a {end})")
+    return written
+
+
+def get_stats_range(start, end):
+    """Estatísticas gravadas entre ``start`` e ``end``, em ordem de data"""
+    return SystemStats.objects.filter(date__gte=start, date__lte=end).order_by('date')
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments.models import StripeWebhookEvent
+from shortcuts.models import AIEnhancementLog, Shortcut, ShortcutUsage, ShortcutUsageDaily, SyncTombstone
+
+from .activity import ActivityLogWriter
+from .checks import check_shared_cache
+from .models import ActivityLog, SystemStats
+from .retention import get_policies, prune_policy
+from .system_stats import aggregate_system_stats
+
+
+def _at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class SystemStatsAggregationTest(TestCase):
+    """Testes da agregação diária das estatísticas do sistema"""
+
+    def setUp(self):
+        self.day1 = date(2026, 3, 30)
+        self.day2 = date(2026, 3, 31)
+        self.day3 = date(2026, 4, 1)
+
+        first = User.objects.create_user(username='first', password='testpass123')
+        second = User.objects.create_user(username='second', password='testpass123', is_active=False)
+        User.objects.filter(pk=first.pk).update(date_joined=_at(self.day1))
+        User.objects.filter(pk=second.pk).update(date_joined=_at(self.day2))
+
+        shortcut = Shortcut.objects.create(user=first, trigger='//oi', title='Oi', content='Olá')
+        Shortcut.objects.filter(pk=shortcut.pk).update(created_at=_at(self.day1))
+        ShortcutUsageDaily.objects.create(user=first, shortcut=shortcut, date=self.day1, count=3)
+        ShortcutUsageDaily.objects.create(user=first, shortcut=shortcut, date=self.day3, count=2)
+
+        for day in (self.day1, self.day2, self.day3):
+            log = AIEnhancementLog.objects.create(
+                shortcut=shortcut, original_content='a', enhanced_content='b',
+                ai_model_used='fake', processing_time=0.1
+            )
+            AIEnhancementLog.objects.filter(pk=log.pk).update(created_at=_at(day))
+
+    def test_backfill_cumulative_totals(self):
+        """Testa os totais acumulados por dia e o reinício mensal da IA"""
+        self.assertEqual(aggregate_system_stats(self.day1, self.day3, chunk_days=2), 3)
+
+        rows = {
+            stats.date: (stats.total_users, stats.active_users, stats.total_shortcuts,
+                         stats.total_shortcut_uses, stats.total_ai_requests)
+            for stats in SystemStats.objects.all()
+        }
+        self.assertEqual(rows, {
+            self.day1: (1, 1, 1, 3, 1),
+            self.day2: (2, 1, 1, 3, 2),
+            self.day3: (2, 1, 1, 5, 1),
+        })
+
+    def test_idempotent_and_resumable(self):
+        """Testa que dias fechados são pulados e reprocessar não duplica"""
+        aggregate_system_stats(self.day1, self.day1)
+        self.assertEqual(aggregate_system_stats(self.day1, self.day3), 2)
+        self.assertEqual(aggregate_system_stats(self.day1, self.day3), 0)
+        self.assertEqual(aggregate_system_stats(self.day1, self.day3, force=True), 3)
+        self.assertEqual(SystemStats.objects.count(), 3)
+
+    def test_today_is_recomputed(self):
+        """Testa que o dia corrente continua aberto"""
+        today = timezone.localdate()
+        aggregate_system_stats(today, today)
+        self.assertEqual(aggregate_system_stats(today, today), 1)
+        self.assertEqual(SystemStats.update_daily_stats().date, today)
+
+
+class SystemStatsHistoryAPITest(TestCase):
+    """Testes da API de histórico de estatísticas"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        today = timezone.localdate()
+        aggregate_system_stats(today - timedelta(days=4), today)
+
+    def test_date_range(self):
+        """Testa a consulta por intervalo"""
+        start = timezone.localdate() - timedelta(days=2)
+        response = self.client.get('/api/statistics/history/', {'start': start.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['date'] for row in response.data['results']][0], start.isoformat())
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_range_and_permission(self):
+        """Testa datas inválidas e acesso de não administradores"""
+        self.assertEqual(self.client.get('/api/statistics/history/', {'start': 'ontem'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/statistics/history/', {'start': '2020-01-01', 'end': '2026-01-01'}).status_code,
+            400
+        )
+
+        user = User.objects.create_user(username='regular', password='testpass123')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get('/api/statistics/history/').status_code, 403)
+
+
+class ActivityLogWriterTest(TestCase):
+    """Testes da gravação em lote do log de atividades"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='activity', password='testpass123')
+        # Sem thread: só o flush/drain do teste grava a fila
+        self.writer = ActivityLogWriter(batch_size=100, max_size=3, threaded=False)
+
+    def tearDown(self):
+        self.writer.drain(timeout=1)
+
+    def test_flush_writes_in_batches(self):
+        """Testa que os registros ficam na fila até o flush"""
+        for index in range(3):
+            self.assertTrue(self.writer.add(ActivityLog(user=self.user, action='login', description=str(index))))
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        self.assertEqual(self.writer.stats(), {'pending': 0, 'written': 3, 'dropped': 0})
+
+    def test_full_queue_drops_and_counts(self):
+        """Testa o descarte com a fila cheia e após o encerramento"""
+        for _ in range(4):
+            self.writer.add(ActivityLog(user=self.user, action='login'))
+        self.assertEqual(self.writer.dropped, 1)
+
+        self.assertEqual(self.writer.drain(timeout=1), 3)
+        self.assertFalse(self.writer.add(ActivityLog(user=self.user, action='login')))
+        self.assertEqual(self.writer.dropped, 2)
+
+    def test_deleted_user_is_skipped(self):
+        """Testa que registros de usuários excluídos não quebram o lote"""
+        other = User.objects.create_user(username='gone', password='testpass123')
+        self.writer.add(ActivityLog(user=self.user, action='login'))
+        self.writer.add(ActivityLog(user=other, action='login'))
+        other.delete()
+        self.assertEqual(self.writer.flush(), 1)
+
+    @override_settings(ACTIVITY_LOG_ASYNC=False)
+    def test_sync_mode_with_request(self):
+        """Testa o modo síncrono e a extração de IP e user agent"""
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='10.0.0.1, 10.0.0.2', HTTP_USER_AGENT='Teste')
+        ActivityLog.log_activity(self.user, 'login', request=request)
+
+        log = ActivityLog.objects.get(user=self.user)
+        self.assertEqual((log.ip_address, log.user_agent), ('10.0.0.1', 'Teste'))
+
+
+class SharedCacheCheckTest(TestCase):
+    """Testes da verificação do cache compartilhado"""
+
+    @override_settings(SHARED_CACHE_REQUIRED=True)
+    def test_process_local_cache_is_an_error(self):
+        """Testa que o LocMemCache é recusado quando o cache compartilhado é exigido"""
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'symplifika_cache'
+        }}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class RetentionTest(TestCase):
+    """Testes da retenção dos logs"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='retention', password='testpass123')
+        self.shortcut = Shortcut.objects.create(user=self.user, trigger='//oi', title='Oi', content='Olá')
+        self.policies = {policy.name: policy for policy in get_policies()}
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+
+    def test_prune_in_chunks_and_archive(self):
+        """Testa a limpeza por faixas de id com arquivamento"""
+        old = timezone.now() - timedelta(days=400)
+        ShortcutUsage.objects.bulk_create(
+            [ShortcutUsage(shortcut=self.shortcut, user=self.user, used_at=old, context=str(i)) for i in range(7)]
+            + [ShortcutUsage(shortcut=self.shortcut, user=self.user) for _ in range(3)]
+        )
+
+        result = prune_policy(self.policies['shortcut_usage'], chunk_size=3, archive_dir=self.archive_dir)
+
+        self.assertEqual(result.deleted, 7)
+        self.assertEqual(ShortcutUsage.objects.count(), 3)
+        with gzip.open(result.archive_path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(sorted(row['context'] for row in rows), [str(i) for i in range(7)])
+        self.assertTrue(Path(result.archive_path).is_relative_to(self.archive_dir))
+
+    def test_policy_filters_and_disabled(self):
+        """Testa que eventos não processados ficam e que prazo 0 desativa a limpeza"""
+        for index, processed in enumerate([True, False]):
+            event = StripeWebhookEvent.objects.create(
+                stripe_event_id=f'evt_{index}', event_type='invoice.paid', data={}, processed=processed
+            )
+            StripeWebhookEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(days=200))
+
+        policy = self.policies['stripe_webhook_event']
+        self.assertEqual(prune_policy(policy._replace(keep_days=0)).deleted, 0)
+        result = prune_policy(policy._replace(archive=False))
+        self.assertEqual(result.deleted, 1)
+        self.assertIsNone(result.archive_path)
+        self.assertEqual(list(StripeWebhookEvent.objects.values_list('processed', flat=True)), [False])
+
+    def test_ai_logs_close_system_stats_first(self):
+        """Testa que o SystemStats dos dias apagados é calculado antes da limpeza"""
+        log = AIEnhancementLog.objects.create(
+            shortcut=self.shortcut, original_content='a', enhanced_content='b',
+            ai_model_used='fake', processing_time=0.1
+        )
+        day = timezone.localdate() - timedelta(days=120)
+        AIEnhancementLog.objects.filter(pk=log.pk).update(created_at=_at(day))
+
+        self.assertEqual(prune_policy(self.policies['ai_enhancement_log'], archive_dir=self.archive_dir).deleted, 1)
+        self.assertEqual(SystemStats.objects.get(date=day).total_ai_requests, 1)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=30, LOG_RETENTION_DAYS={'sync_tombstone': 7})
+    def test_tombstones_outlive_sync_cursors(self):
+        """Testa que os registros de exclusão ficam mais tempo que um cursor de sincronização"""
+        policy = {policy.name: policy for policy in get_policies()}['sync_tombstone']
+        self.assertEqual(policy.keep_days, 31)
+
+        for days in (20, 40):
+            SyncTombstone.objects.create(
+                user=self.user, object_type='shortcut', object_id=days,
+                deleted_at=timezone.now() - timedelta(days=days)
+            )
+        self.assertEqual(prune_policy(policy).deleted, 1)
+        self.assertEqual(list(SyncTombstone.objects.values_list('object_id', flat=True)), [20])
@@ -18,6 +18,7 @@ urlpatterns = [
     path('api/status/', views.api_status, name='api-status'),
     path('api/health/', views.health_check, name='health-check'),
     path('api/statistics/', views.statistics_view, name='api-statistics'),
+    path('api/statistics/history/', views.statistics_history_view, name='api-statistics-history'),
     path('api/dashboard/stats/', views.dashboard_stats, name='api-dashboard-stats'),
     path('api/plan/status/', views.plan_status, name='api-plan-status'),
     path('api/users/<int:user_id>/activity/', views.user_activity_api, name='user-activity-api'),
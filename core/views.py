@@ -1,8 +1,11 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
@@ -15,7 +18,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.views.decorators.cache import cache_page
 from shortcuts.models import Shortcut, Category
+from shortcuts.ai_client import get_clients_stats
+from shortcuts.autocomplete import autocomplete
+from shortcuts.ingestion import usage_buffer
 from users.models import UserProfile
+from users.stats import get_user_stats, wants_fresh
 import json
 
 from django.conf import settings as django_settings
@@ -23,12 +30,14 @@ import os
 
 # Importações DRF para o endpoint de estatísticas
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from .activity import activity_writer
 from .models import SystemStats
 from .serializers import SystemStatsSerializer
+from .system_stats import MAX_RANGE_DAYS, get_stats_range
 
 
 def frontend_app(request):
@@ -49,10 +58,18 @@ def api_status(request):
 @require_http_methods(["GET", "POST", "OPTIONS"])
 def health_check(request):
     """Health check endpoint"""
-    return JsonResponse({
+    data = {
         'status': 'healthy',
         'timestamp': timezone.now().isoformat()
-    })
+    }
+    if request.user.is_staff:
+        # Contadores do cliente de IA deste worker (em execução, rejeitadas, circuito)
+        data['ai_clients'] = get_clients_stats()
+        # Fila do log de atividades deste worker (pendentes, gravados, descartados)
+        data['activity_log'] = activity_writer.stats()
+        # Buffer dos usos de atalhos deste worker (pendentes, gravados, descartados)
+        data['shortcut_usage'] = usage_buffer.stats()
+    return JsonResponse(data)
 
 
 def index(request):
@@ -71,66 +88,43 @@ def dashboard(request):
 def dashboard_stats(request):
     """API endpoint for dashboard statistics"""
     user = request.user
+    stats = get_user_stats(user, fresh=wants_fresh(request))
 
-    # Get or create user profile
-    profile, created = UserProfile.objects.get_or_create(user=user)
-
-    # Get shortcuts statistics
-    shortcuts = Shortcut.objects.filter(user=user)
-    total_shortcuts = shortcuts.count()
-    active_shortcuts = shortcuts.filter(is_active=True).count()
-
-    # Get categories count
-    categories_count = Category.objects.filter(
-        shortcuts__user=user
-    ).distinct().count()
-
-    # Calculate monthly usage (last 30 days)
-    from datetime import timedelta
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    monthly_usage = shortcuts.filter(
-        last_used__gte=thirty_days_ago
-    ).count()
+    # Usos por dia nos últimos 30 dias (do snapshot, a partir dos totais diários)
+    daily_usage = stats['daily_usage']
+    monthly_usage = sum(daily_usage.values())
 
     # Calculate time saved (estimate: 30 seconds per shortcut use)
-    total_uses = sum(shortcut.use_count for shortcut in shortcuts)
+    total_uses = stats['total_uses']
     time_saved_minutes = total_uses * 0.5  # 30 seconds = 0.5 minutes
     time_saved_hours = round(time_saved_minutes / 60, 1)
 
     # Calculate today's usage for the usage counter
-    today = timezone.now().date()
-    usages_today = shortcuts.filter(
-        last_used__date=today
-    ).count()
+    usages_today = daily_usage.get(timezone.localdate(), 0)
 
     # Weekly usage for chart
-    weekly_usage = []
-    for i in range(7):
-        day = today - timedelta(days=i)
-        day_usage = shortcuts.filter(last_used__date=day).count()
-        weekly_usage.append({
-            'day': day.strftime('%a'),
-            'count': day_usage
-        })
-    weekly_usage.reverse()
+    weekly_usage = [
+        {'day': day.strftime('%a'), 'count': count}
+        for day, count in list(daily_usage.items())[-7:]
+    ]
 
     return Response({
-        'total_shortcuts': total_shortcuts,
-        'active_shortcuts': active_shortcuts,
-        'total_categories': categories_count,
-        'categories_count': categories_count,
+        'total_shortcuts': stats['total_shortcuts'],
+        'active_shortcuts': stats['active_shortcuts'],
+        'total_categories': stats['categories_count'],
+        'categories_count': stats['categories_count'],
         'monthly_usage': monthly_usage,
         'usages_today': usages_today,
         'total_usages': total_uses,
         'time_saved': f"{time_saved_hours}h",
         'time_saved_minutes': time_saved_minutes,
-        'ai_requests_used': profile.ai_requests_used,
-        'ai_requests_remaining': max(0, profile.max_ai_requests - profile.ai_requests_used),
-        'max_ai_requests': profile.max_ai_requests,
-        'max_ai_requests_free': profile.max_ai_requests_free if hasattr(profile, 'max_ai_requests_free') else 50,
-        'plan': profile.plan,
-        'plan_display': profile.get_plan_display(),
-        'max_shortcuts': profile.max_shortcuts,
+        'ai_requests_used': stats['ai_requests_used'],
+        'ai_requests_remaining': stats['ai_requests_remaining'],
+        'max_ai_requests': stats['max_ai_requests'],
+        'max_ai_requests_free': stats['max_ai_requests_free'],
+        'plan': stats['plan'],
+        'plan_display': stats['plan_display'],
+        'max_shortcuts': stats['max_shortcuts'],
         'weekly_usage': weekly_usage,
         'user_full_name': user.get_full_name() or user.username,
     })
@@ -140,16 +134,15 @@ def dashboard_stats(request):
 @permission_classes([IsAuthenticated])
 def plan_status(request):
     """API endpoint for quick plan status check"""
-    user = request.user
-    profile, created = UserProfile.objects.get_or_create(user=user)
+    stats = get_user_stats(request.user, fresh=wants_fresh(request))
 
     return Response({
-        'plan': profile.plan,
-        'plan_display': profile.get_plan_display(),
-        'ai_requests_used': profile.ai_requests_used,
-        'max_ai_requests': profile.max_ai_requests,
-        'max_ai_requests_free': profile.max_ai_requests_free if hasattr(profile, 'max_ai_requests_free') else 50,
-        'max_shortcuts': profile.max_shortcuts,
+        'plan': stats['plan'],
+        'plan_display': stats['plan_display'],
+        'ai_requests_used': stats['ai_requests_used'],
+        'max_ai_requests': stats['max_ai_requests'],
+        'max_ai_requests_free': stats['max_ai_requests_free'],
+        'max_shortcuts': stats['max_shortcuts'],
         'last_updated': timezone.now().isoformat(),
     })
 
@@ -353,6 +346,41 @@ def statistics_view(request):
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def statistics_history_view(request):
+    """
+    Estatísticas diárias do sistema em um intervalo (``?start=AAAA-MM-DD&end=AAAA-MM-DD``).
+
+    Padrão: últimos 30 dias. Dias ainda não calculados não aparecem (ver
+    comando ``aggregate_system_stats``).
+    """
+    try:
+        end = request.query_params.get('end')
+        start = request.query_params.get('start')
+        end = parse_date(end) if end else timezone.localdate()
+        start = parse_date(start) if start else (end - timedelta(days=29) if end else None)
+    except ValueError:
+        start = end = None
+
+    if start is None or end is None:
+        return Response({'error': 'Datas devem estar no formato AAAA-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'start deve ser anterior a end'}, status=status.HTTP_400_BAD_REQUEST)
+    if (end - start).days >= MAX_RANGE_DAYS:
+        return Response(
+            {'error': f'Intervalo máximo de {MAX_RANGE_DAYS} dias'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = SystemStatsSerializer(get_stats_range(start, end), many=True)
+    return Response({
+        'start': start,
+        'end': end,
+        'results': serializer.data,
+    })
+
+
 def favicon_view(request):
     """Serve favicon.ico"""
     # Try different favicon formats
@@ -451,17 +479,13 @@ def user_categories_api(request, user_id):
 @permission_classes([IsAuthenticated])
 def usage_stats_api(request):
     """API endpoint for user usage statistics"""
-    user = request.user
-
-    # Calculate AI requests used this month
-    ai_requests_used = getattr(user.userprofile, 'ai_requests_used', 0)
+    user_stats = get_user_stats(request.user, fresh=wants_fresh(request))
 
     # Calculate time saved (mock calculation)
-    shortcuts_count = user.shortcuts.count()
-    time_saved = shortcuts_count * 5  # 5 minutes per shortcut average
+    time_saved = user_stats['total_shortcuts'] * 5  # 5 minutes per shortcut average
 
     stats = {
-        'ai_requests_used': ai_requests_used,
+        'ai_requests_used': user_stats['ai_requests_used'],
         'time_saved': time_saved
     }
 
@@ -729,70 +753,15 @@ def search_suggestions_api(request):
     suggestions = []
 
     try:
-        # Get shortcuts suggestions
-        if filter_type in ['all', 'shortcuts']:
-            if request.user.is_authenticated:
-                shortcuts = Shortcut.objects.filter(user=request.user, is_active=True)
-            else:
-                # Para usuários não autenticados, não mostrar atalhos (são privados)
-                shortcuts = Shortcut.objects.none()
-
-            shortcuts = shortcuts.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(trigger__icontains=query)
-            ).select_related('category')[:limit//2 if filter_type == 'all' else limit]
-
-            for shortcut in shortcuts:
-                # Criar preview do conteúdo (primeiros 100 caracteres)
-                content_preview = shortcut.content[:100] + '...' if len(shortcut.content) > 100 else shortcut.content
-                
-                suggestions.append({
-                    'text': shortcut.title,
-                    'type': 'shortcut',
-                    'description': content_preview,
-                    'trigger': shortcut.trigger,
-                    'category': shortcut.category.name if shortcut.category else None,
-                    'url': f'/shortcuts/{shortcut.id}/' if shortcut.id else None
-                })
-
-        # Get categories suggestions
-        if filter_type in ['all', 'categories']:
-            if request.user.is_authenticated:
-                categories = Category.objects.filter(user=request.user)
-            else:
-                # Para usuários não autenticados, não mostrar categorias (são privadas)
-                categories = Category.objects.none()
-
-            categories = categories.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query)
-            )[:limit//2 if filter_type == 'all' else limit]
-
-            for category in categories:
-                # Criar preview da descrição
-                desc_preview = category.description[:100] + '...' if len(category.description) > 100 else category.description
-                
-                suggestions.append({
-                    'text': category.name,
-                    'type': 'category',
-                    'description': desc_preview if category.description else f'Categoria: {category.name}',
-                    'color': category.color,
-                    'url': f'/shortcuts/category/{category.id}/' if category.id else None
-                })
-
-        # Sort by relevance (exact matches first, then starts with, then contains)
-        def sort_key(item):
-            text = item['text'].lower()
-            query_lower = query.lower()
-            if text == query_lower:
-                return (0, text)
-            elif text.startswith(query_lower):
-                return (1, text)
-            else:
-                return (2, text)
+        # Índice em memória por usuário (atalhos e categorias são privados)
+        if request.user.is_authenticated:
+            per_type = limit // 2 if filter_type == 'all' else limit
+            if filter_type in ['all', 'shortcuts']:
+                suggestions.extend(autocomplete(request.user, query, per_type, 'shortcut'))
+            if filter_type in ['all', 'categories']:
+                suggestions.extend(autocomplete(request.user, query, per_type, 'category'))
 
-        suggestions.sort(key=sort_key)
+        # O índice já devolve prefixos antes de trechos
         suggestions = suggestions[:limit]
 
     except Exception as e:
@@ -1173,7 +1142,7 @@ def user_menu_data_api(request):
     profile, created = UserProfile.objects.get_or_create(user=request.user)
 
     # Get user statistics
-    shortcuts_count = Shortcut.objects.filter(user=request.user).count() if hasattr(request.user, 'shortcuts') else 0
+    shortcuts_count = profile.shortcuts_total
 
     data = {
         'user': {
@@ -1705,7 +1674,7 @@ def api_profile_extended(request):
                     },
                     'stats': {
                         'shortcuts_count': request.user.shortcuts.filter(is_active=True).count(),
-                        'total_usage': sum(s.use_count for s in request.user.shortcuts.all()),
+                        'total_usage': profile.total_shortcuts_used,
                         'time_saved_minutes': profile.time_saved_minutes,
                         'time_saved_hours': round(profile.time_saved_minutes / 60, 1),
                         'ai_requests_used': profile.ai_requests_used,
@@ -10,9 +10,36 @@ Para usar este código:
 2. Configure as URLs correspondentes
 3. Execute as migrações
 4. Configure as variáveis de ambiente necessárias
+5. Agende o rollup e a limpeza dos eventos (ver "ROLLUP E LIMPEZA" abaixo)
+
+Os eventos de analytics são gravados em lote: ``analytics_track_api`` aceita
+um evento ou uma lista de eventos e apenas os coloca em um spool em memória,
+descarregado com ``bulk_create`` por uma thread em segundo plano quando
+atinge ``LANDING_ANALYTICS_BATCH_SIZE`` eventos ou a cada
+``LANDING_ANALYTICS_FLUSH_INTERVAL`` segundos. Com o spool cheio
+(``LANDING_ANALYTICS_MAX_BUFFER``) o endpoint responde 429 com
+``Retry-After``. ``LANDING_ANALYTICS_BUFFERED = False`` grava na hora (útil
+em testes). O spool usa a fila em lote do projeto (``core.buffers``), que
+precisa ser copiada junto se este código for usado em outro projeto. Os
+textos são cortados no tamanho das colunas antes de entrar no spool.
+
+Os eventos brutos são consolidados por ``rollup_landing_analytics`` em
+tabelas pequenas (sessões, funil diário por UTM e contagens por hora), lidas
+pelo admin e por ``analytics_summary_api``; depois de consolidados podem ser
+apagados (e opcionalmente arquivados) por ``prune_landing_analytics``.
+
+As estatísticas da lista de espera vêm de uma única consulta agrupada por dia
+e área, guardada no cache por ``WAITLIST_STATS_CACHE_TTL`` segundos; o total
+de inscritos é uma contagem guardada por ``WAITLIST_COUNT_CACHE_TTL``
+segundos. Salvar ou apagar um inscrito invalida os dois, e o TTL curto
+cobre as alterações em massa (``update``) que não disparam sinais.
 """
 
-from django.db import models
+from django.db import DataError, IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -23,12 +50,20 @@ from django.core.validators import EmailValidator
 from django.core.exceptions import ValidationError
 from django.views.generic import TemplateView
 from django.conf import settings
+from django.core.cache import cache
+import atexit
+import gzip
 import json
 import logging
+import math
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, Any, Optional
 import re
 
+from core.buffers import BatchBuffer
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -159,8 +194,8 @@ class LandingPageAnalytics(models.Model):
     page_url = models.URLField()
     page_title = models.CharField(max_length=200, blank=True)
 
-    # Timestamp
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp (momento do evento, não da gravação em lote)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "landing_page_analytics"
@@ -177,6 +212,110 @@ class LandingPageAnalytics(models.Model):
         return f"{self.event_type} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class LandingPageHourlyStats(models.Model):
+    """Quantidade de eventos por hora e tipo (rollup de LandingPageAnalytics)"""
+
+    hour = models.DateTimeField()
+    event_type = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "landing_page_hourly_stats"
+        verbose_name = "Analytics por Hora"
+        verbose_name_plural = "Analytics por Hora"
+        ordering = ["-hour"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hour", "event_type"], name="unique_landing_hourly_event"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} - {self.hour.strftime('%Y-%m-%d %H:00')}: {self.count}"
+
+
+class LandingPageSession(models.Model):
+    """Resumo de uma sessão da landing page (rollup de LandingPageAnalytics)"""
+
+    session_id = models.CharField(max_length=100, unique=True)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    events = models.PositiveIntegerField(default=0)
+    page_views = models.PositiveIntegerField(default=0)
+
+    # Funil: page view → form start → form success
+    reached_form_start = models.BooleanField(default=False)
+    reached_form_success = models.BooleanField(default=False)
+
+    # Atribuição (primeiro evento da sessão)
+    referrer = models.URLField(blank=True)
+    utm_source = models.CharField(max_length=100, blank=True)
+    utm_medium = models.CharField(max_length=100, blank=True)
+    utm_campaign = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        db_table = "landing_page_sessions"
+        verbose_name = "Sessão da Landing Page"
+        verbose_name_plural = "Sessões da Landing Page"
+        ordering = ["-first_seen"]
+        indexes = [
+            models.Index(fields=["first_seen"]),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} ({self.events} eventos)"
+
+    @property
+    def duration(self):
+        return self.last_seen - self.first_seen
+
+
+class LandingPageFunnelDaily(models.Model):
+    """Funil e atribuição por dia e UTM, contados pela data de início da sessão"""
+
+    date = models.DateField()
+    utm_source = models.CharField(max_length=100, blank=True)
+    utm_medium = models.CharField(max_length=100, blank=True)
+    utm_campaign = models.CharField(max_length=100, blank=True)
+    sessions = models.PositiveIntegerField(default=0)
+    page_views = models.PositiveIntegerField(default=0)
+    form_starts = models.PositiveIntegerField(default=0)
+    form_successes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "landing_page_funnel_daily"
+        verbose_name = "Funil Diário"
+        verbose_name_plural = "Funil Diário"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "utm_source", "utm_medium", "utm_campaign"],
+                name="unique_landing_funnel_day_utm",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.utm_source or '(direto)'}: {self.sessions} sessões"
+
+    @property
+    def conversion_rate(self):
+        return round(self.form_successes / self.sessions * 100, 2) if self.sessions else 0.0
+
+
+class LandingPageRollupState(models.Model):
+    """Marca d'água do rollup (último id de LandingPageAnalytics processado)"""
+
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "landing_page_rollup_state"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
+
+
 # =============================================================================
 # UTILITIES
 # =============================================================================
@@ -201,6 +340,20 @@ def extract_utm_params(request):
     }
 
 
+def get_session_id(request, data=None) -> str:
+    """
+    Identificador da sessão do visitante
+
+    Usa a chave da sessão do Django (criada pela ``LandingPageView``) e, sem
+    o cookie de sessão, o ``session_id`` enviado pelo cliente no payload.
+    """
+    if request.session.session_key:
+        return request.session.session_key
+    if isinstance(data, dict) and isinstance(data.get("session_id"), str):
+        return data["session_id"]
+    return ""
+
+
 def validate_request_data(data: Dict[str, Any]) -> Dict[str, str]:
     """Valida dados do request e retorna erros se houver"""
     errors = {}
@@ -234,6 +387,352 @@ def validate_request_data(data: Dict[str, Any]) -> Dict[str, str]:
     return errors
 
 
+# =============================================================================
+# ANALYTICS SPOOL
+# =============================================================================
+
+# Erros de um evento específico (valor que o banco recusa); os demais são do banco em si
+BAD_ROW_ERRORS = (DataError, IntegrityError, ValueError, TypeError)
+
+
+def clamp_lengths(instance):
+    """Corta os campos de texto com tamanho máximo no limite da coluna"""
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, models.CharField) and field.max_length:
+            value = getattr(instance, field.attname)
+            if isinstance(value, str) and len(value) > field.max_length:
+                setattr(instance, field.attname, value[:field.max_length])
+    return instance
+
+
+def build_analytics_event(request, data: Dict[str, Any]) -> LandingPageAnalytics:
+    """
+    Monta (sem gravar) um evento de analytics a partir do payload
+
+    Raises:
+        ValueError: Evento inválido
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Evento deve ser um objeto")
+
+    event_type = data.get("event_type")
+    if not event_type or not isinstance(event_type, str):
+        raise ValueError("event_type é obrigatório")
+
+    event_data = data.get("event_data", {})
+    if not isinstance(event_data, dict):
+        raise ValueError("event_data deve ser um objeto")
+
+    return clamp_lengths(LandingPageAnalytics(
+        event_type=event_type,
+        event_data=event_data,
+        page_url=str(data.get("page_url", "")),
+        page_title=str(data.get("page_title", "")),
+        user_agent=request.META.get("HTTP_USER_AGENT", ""),
+        ip_address=get_client_ip(request),
+        referrer=request.META.get("HTTP_REFERER", ""),
+        session_id=get_session_id(request, data),
+    ))
+
+
+class AnalyticsSpool(BatchBuffer):
+    """
+    Spool em processo dos eventos de analytics, gravados em lote por uma thread em segundo plano
+
+    Um lote recusado por causa de um evento é regravado evento a evento: os
+    eventos inválidos são descartados e contados em ``dropped`` em vez de
+    voltarem para o spool. Erros do banco em si devolvem o lote ao spool.
+    """
+
+    thread_name = "landing-analytics-flusher"
+    label = "eventos de analytics"
+
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 200, max_size: int = 5000,
+                 threaded: bool = True):
+        super().__init__(flush_interval, batch_size, max_size, threaded)
+
+    @property
+    def retry_after(self) -> int:
+        """Segundos sugeridos ao cliente quando o spool está cheio"""
+        return max(1, math.ceil(self.flush_interval))
+
+    def write(self, batch: list) -> int:
+        with transaction.atomic():
+            LandingPageAnalytics.objects.bulk_create(batch)
+        return len(batch)
+
+    def recover(self, batch: list, error: Exception) -> Optional[int]:
+        if not isinstance(error, BAD_ROW_ERRORS):
+            return super().recover(batch, error)
+
+        written = 0
+        for event in batch:
+            try:
+                with transaction.atomic():
+                    LandingPageAnalytics.objects.bulk_create([event])
+            except BAD_ROW_ERRORS as e:
+                logger.warning(f"Evento de analytics descartado ({event.event_type}): {e}")
+                with self._lock:
+                    self.dropped += 1
+                continue
+            written += 1
+        return written
+
+
+analytics_spool = AnalyticsSpool(
+    flush_interval=getattr(settings, "LANDING_ANALYTICS_FLUSH_INTERVAL", 2.0),
+    batch_size=getattr(settings, "LANDING_ANALYTICS_BATCH_SIZE", 200),
+    max_size=getattr(settings, "LANDING_ANALYTICS_MAX_BUFFER", 5000),
+)
+
+atexit.register(analytics_spool.drain)
+
+
+def track_events(events) -> bool:
+    """Registra eventos de analytics (spool ou gravação imediata); False se o spool estiver cheio"""
+    events = [clamp_lengths(event) for event in events]
+    if not getattr(settings, "LANDING_ANALYTICS_BUFFERED", True):
+        LandingPageAnalytics.objects.bulk_create(events)
+        return True
+    return analytics_spool.add_many(events)
+
+
+# =============================================================================
+# ANALYTICS ROLLUPS
+# =============================================================================
+
+ROLLUP_STATE_NAME = "landing_analytics"
+UTM_FIELDS = ("utm_source", "utm_medium", "utm_campaign")
+SESSION_UPDATE_FIELDS = [
+    "last_seen", "events", "page_views", "reached_form_start", "reached_form_success",
+]
+
+
+def _add_counts(model, key_fields, deltas):
+    """Soma contadores por chave: cria as linhas que faltam e aplica ``F(campo) + n``"""
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True
+    )
+    for key, counts in deltas.items():
+        model.objects.filter(**dict(zip(key_fields, key))).update(
+            **{field: F(field) + count for field, count in counts.items() if count}
+        )
+
+
+def _rollup_batch(rows):
+    """Consolida um lote de eventos (ordenado por id) nas tabelas de rollup"""
+    hourly = defaultdict(Counter)
+    by_session = defaultdict(list)
+    for row in rows:
+        hour = timezone.localtime(row["created_at"]).replace(minute=0, second=0, microsecond=0)
+        hourly[(hour, row["event_type"])]["count"] += 1
+        if row["session_id"]:
+            by_session[row["session_id"]].append(row)
+
+    existing = LandingPageSession.objects.in_bulk(list(by_session), field_name="session_id")
+    to_create, to_update = [], []
+    funnel = defaultdict(Counter)
+
+    for session_id, events in by_session.items():
+        session = existing.get(session_id)
+        is_new = session is None
+        if is_new:
+            first = events[0]
+            utm = first["event_data"] if isinstance(first["event_data"], dict) else {}
+            session = LandingPageSession(
+                session_id=session_id,
+                first_seen=min(event["created_at"] for event in events),
+                last_seen=first["created_at"],
+                referrer=(first["referrer"] or "")[:200],
+                **{field: str(utm.get(field) or "")[:100] for field in UTM_FIELDS},
+            )
+            to_create.append(session)
+        else:
+            to_update.append(session)
+
+        reached_before = (session.reached_form_start, session.reached_form_success)
+        page_views = 0
+        for event in events:
+            session.events += 1
+            session.last_seen = max(session.last_seen, event["created_at"])
+            if event["event_type"] == "page_view":
+                page_views += 1
+            elif event["event_type"] == "form_start":
+                session.reached_form_start = True
+            elif event["event_type"] == "form_success":
+                session.reached_form_success = True
+        session.page_views += page_views
+
+        # A sessão conta no dia em que começou, com a UTM do primeiro evento
+        key = (timezone.localtime(session.first_seen).date(),) + tuple(
+            getattr(session, field) for field in UTM_FIELDS
+        )
+        funnel[key]["sessions"] += int(is_new)
+        funnel[key]["page_views"] += page_views
+        funnel[key]["form_starts"] += int(session.reached_form_start and not reached_before[0])
+        funnel[key]["form_successes"] += int(session.reached_form_success and not reached_before[1])
+
+    LandingPageSession.objects.bulk_create(to_create)
+    LandingPageSession.objects.bulk_update(to_update, SESSION_UPDATE_FIELDS)
+    _add_counts(LandingPageHourlyStats, ("hour", "event_type"), hourly)
+    _add_counts(LandingPageFunnelDaily, ("date",) + UTM_FIELDS, funnel)
+
+
+def rollup_landing_analytics(batch_size: int = 5000, max_batches: Optional[int] = None) -> int:
+    """
+    Consolida os eventos novos (id acima da marca d'água) nas tabelas de rollup
+
+    Cada lote é uma transação que também avança a marca d'água, então o job
+    é retomável e não conta o mesmo evento duas vezes. Eventos mais novos que
+    ``LANDING_ANALYTICS_ROLLUP_LAG`` segundos ficam para a próxima execução,
+    para que inserções ainda não confirmadas com id menor não sejam puladas.
+
+    Returns:
+        Quantidade de eventos consolidados
+    """
+    LandingPageRollupState.objects.get_or_create(name=ROLLUP_STATE_NAME)
+    lag = timedelta(seconds=getattr(settings, "LANDING_ANALYTICS_ROLLUP_LAG", 300))
+    processed = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            state = LandingPageRollupState.objects.select_for_update().get(name=ROLLUP_STATE_NAME)
+            rows = list(
+                LandingPageAnalytics.objects.filter(id__gt=state.last_event_id)
+                .order_by("id")
+                .values("id", "event_type", "session_id", "created_at", "event_data", "referrer")[:batch_size]
+            )
+
+            # Para no primeiro evento recente: a marca d'água nunca passa de um evento pendente
+            cutoff = timezone.now() - lag
+            for index, row in enumerate(rows):
+                if row["created_at"] >= cutoff:
+                    rows = rows[:index]
+                    break
+            if not rows:
+                break
+
+            _rollup_batch(rows)
+            state.last_event_id = rows[-1]["id"]
+            state.save(update_fields=["last_event_id", "updated_at"])
+
+        processed += len(rows)
+        batches += 1
+        if len(rows) < batch_size:
+            break
+
+    logger.info(f"Rollup de analytics: {processed} eventos consolidados")
+    return processed
+
+
+def prune_landing_analytics(days: int = 30, chunk_size: int = 5000, archive_dir=None) -> int:
+    """
+    Apaga eventos brutos já consolidados e mais antigos que ``days`` dias
+
+    A exclusão é feita em faixas de ``chunk_size`` ids, cada uma na sua
+    própria transação curta. Com ``archive_dir`` os eventos de cada faixa são
+    gravados antes em um arquivo JSONL compactado (gzip).
+
+    Returns:
+        Quantidade de eventos apagados
+    """
+    state = LandingPageRollupState.objects.filter(name=ROLLUP_STATE_NAME).first()
+    if state is None:
+        return 0
+
+    events = LandingPageAnalytics.objects.filter(
+        id__lte=state.last_event_id, created_at__lt=timezone.now() - timedelta(days=days)
+    )
+    bounds = events.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return 0
+
+    archive = None
+    if archive_dir:
+        Path(archive_dir).mkdir(parents=True, exist_ok=True)
+        archive_path = Path(archive_dir) / f"landing_page_analytics-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz"
+        archive = gzip.open(archive_path, "at", encoding="utf-8")
+
+    deleted = 0
+    try:
+        for start in range(bounds["first"], bounds["last"] + 1, chunk_size):
+            chunk = events.filter(id__gte=start, id__lt=start + chunk_size)
+            with transaction.atomic():
+                if archive:
+                    for row in chunk.values().iterator():
+                        archive.write(json.dumps(row, default=str) + "\n")
+                count, _ = chunk.delete()
+            deleted += count
+    finally:
+        if archive:
+            archive.close()
+
+    logger.info(f"Limpeza de analytics: {deleted} eventos apagados")
+    return deleted
+
+
+# =============================================================================
+# WAITLIST STATS
+# =============================================================================
+
+WAITLIST_STATS_CACHE_KEY = "landing:waitlist:stats"
+WAITLIST_COUNT_CACHE_KEY = "landing:waitlist:count"
+
+
+def compute_waitlist_stats() -> Dict[str, Any]:
+    """Inscritos ativos por dia e por área (uma consulta agrupada)"""
+    by_day = defaultdict(int)
+    roles = defaultdict(int)
+    rows = (
+        WaitlistSubscriber.objects.filter(is_active=True)
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "role")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        by_day[row["day"].isoformat()] += row["count"]
+        roles[row["role"]] += row["count"]
+
+    return {
+        "by_day": dict(by_day),
+        "roles": dict(roles),
+        "generated_at": timezone.now().isoformat(),
+    }
+
+
+def get_waitlist_stats() -> Dict[str, Any]:
+    """Estatísticas da lista de espera a partir do cache (TTL curto)"""
+    stats = cache.get(WAITLIST_STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_waitlist_stats()
+        cache.set(WAITLIST_STATS_CACHE_KEY, stats, getattr(settings, "WAITLIST_STATS_CACHE_TTL", 30))
+    return stats
+
+
+def get_waitlist_count() -> int:
+    """Total de inscritos ativos (recontado quando o cache expira ou é invalidado)"""
+    count = cache.get(WAITLIST_COUNT_CACHE_KEY)
+    if count is None:
+        count = WaitlistSubscriber.objects.filter(is_active=True).count()
+        cache.set(WAITLIST_COUNT_CACHE_KEY, count, getattr(settings, "WAITLIST_COUNT_CACHE_TTL", 60))
+    return count
+
+
+def invalidate_waitlist_cache():
+    """Descarta o total e as estatísticas em cache; a próxima leitura reconta"""
+    cache.delete_many([WAITLIST_COUNT_CACHE_KEY, WAITLIST_STATS_CACHE_KEY])
+
+
+@receiver([post_save, post_delete], sender=WaitlistSubscriber)
+def waitlist_subscriber_changed(sender, **kwargs):
+    """Inscrição, desativação ou exclusão: invalida os totais depois do commit"""
+    transaction.on_commit(invalidate_waitlist_cache)
+
+
 # =============================================================================
 # VIEWS
 # =============================================================================
@@ -250,26 +749,28 @@ class LandingPageView(TemplateView):
         # Adicionar dados para a página
         context.update(
             {
-                "waitlist_count": WaitlistSubscriber.objects.filter(
-                    is_active=True
-                ).count(),
+                "waitlist_count": get_waitlist_count(),
                 "page_title": "Symplifika - Automações Fáceis e Rápidas | Em Breve",
                 "meta_description": "Descubra o Symplifika - a plataforma de automação de texto com IA que vai revolucionar sua produtividade.",
             }
         )
 
+        # Cria a sessão na primeira visita: o cookie liga os eventos seguintes a esta page view
+        if self.request.session.session_key is None:
+            self.request.session.save()
+
         # Track page view
         try:
-            LandingPageAnalytics.objects.create(
+            track_events([LandingPageAnalytics(
                 event_type="page_view",
                 page_url=self.request.build_absolute_uri(),
                 page_title=context["page_title"],
                 user_agent=self.request.META.get("HTTP_USER_AGENT", ""),
                 ip_address=get_client_ip(self.request),
                 referrer=self.request.META.get("HTTP_REFERER", ""),
-                session_id=self.request.session.session_key or "",
+                session_id=self.request.session.session_key,
                 event_data=extract_utm_params(self.request),
-            )
+            )])
         except Exception as e:
             logger.error(f"Error tracking page view: {e}")
 
@@ -309,7 +810,7 @@ def waitlist_submit_api(request):
         location_data = data.get("location", {})
 
         # Criar subscriber
-        subscriber = WaitlistSubscriber.objects.create(
+        subscriber = clamp_lengths(WaitlistSubscriber(
             name=name,
             email=email,
             role=role,
@@ -320,23 +821,26 @@ def waitlist_submit_api(request):
             city=location_data.get("city", ""),
             timezone=location_data.get("timezone", ""),
             **extract_utm_params(request),
-        )
+        ))
+        subscriber.save()
+        # Contagem direta: o cache só é invalidado quando a transação confirmar
+        waitlist_count = WaitlistSubscriber.objects.filter(is_active=True).count()
 
         # Track successful submission
-        LandingPageAnalytics.objects.create(
+        track_events([LandingPageAnalytics(
             event_type="form_success",
             page_url=request.META.get("HTTP_REFERER", ""),
             user_agent=request.META.get("HTTP_USER_AGENT", ""),
             ip_address=get_client_ip(request),
             referrer=request.META.get("HTTP_REFERER", ""),
-            session_id=request.session.session_key or "",
+            session_id=get_session_id(request, data),
             event_data={
                 "subscriber_id": subscriber.id,
                 "role": role,
                 "referrer": data.get("referrer", ""),
                 **extract_utm_params(request),
             },
-        )
+        )])
 
         # Enviar email de boas-vindas (opcional)
         # send_welcome_email.delay(subscriber.id)
@@ -347,9 +851,7 @@ def waitlist_submit_api(request):
                 "success": True,
                 "message": "Obrigado! Você foi adicionado à nossa lista de espera.",
                 "subscriber_id": subscriber.id,
-                "waitlist_count": WaitlistSubscriber.objects.filter(
-                    is_active=True
-                ).count(),
+                "waitlist_count": waitlist_count,
             }
         )
 
@@ -363,14 +865,14 @@ def waitlist_submit_api(request):
 
         # Track error
         try:
-            LandingPageAnalytics.objects.create(
+            track_events([LandingPageAnalytics(
                 event_type="form_error",
                 page_url=request.META.get("HTTP_REFERER", ""),
                 user_agent=request.META.get("HTTP_USER_AGENT", ""),
                 ip_address=get_client_ip(request),
-                session_id=request.session.session_key or "",
+                session_id=get_session_id(request),
                 event_data={"error": str(e)},
-            )
+            )])
         except:
             pass
 
@@ -383,31 +885,55 @@ def waitlist_submit_api(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def analytics_track_api(request):
-    """API endpoint para tracking de eventos analytics"""
+    """
+    API endpoint para tracking de eventos analytics
+
+    Aceita um evento (objeto), uma lista de eventos ou ``{"events": [...]}``.
+    Os eventos vão para o spool e são gravados em lote; eventos inválidos de
+    uma lista são ignorados e contados em ``rejected``. Sem o cookie de sessão,
+    cada evento pode trazer o ``session_id`` gerado pelo cliente.
+    """
 
     try:
         data = json.loads(request.body.decode("utf-8"))
 
-        event_type = data.get("event_type")
-        if not event_type:
-            return JsonResponse(
-                {"success": False, "message": "event_type é obrigatório"}, status=400
+        if isinstance(data, dict) and isinstance(data.get("events"), list):
+            data = data["events"]
+
+        received = len(data) if isinstance(data, list) else 1
+
+        if isinstance(data, list):
+            max_events = getattr(settings, "LANDING_ANALYTICS_MAX_EVENTS_PER_REQUEST", 50)
+            if len(data) > max_events:
+                return JsonResponse(
+                    {"success": False, "message": f"Máximo de {max_events} eventos por requisição"},
+                    status=400,
+                )
+
+            events = []
+            for item in data:
+                try:
+                    events.append(build_analytics_event(request, item))
+                except ValueError:
+                    continue
+        else:
+            try:
+                events = [build_analytics_event(request, data)]
+            except ValueError as e:
+                return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+        if events and not track_events(events):
+            response = JsonResponse(
+                {"success": False, "message": "Muitos eventos no momento, tente novamente em instantes"},
+                status=429,
             )
+            response["Retry-After"] = str(analytics_spool.retry_after)
+            return response
 
-        # Criar evento analytics
-        LandingPageAnalytics.objects.create(
-            event_type=event_type,
-            event_data=data.get("event_data", {}),
-            page_url=data.get("page_url", ""),
-            page_title=data.get("page_title", ""),
-            user_agent=request.META.get("HTTP_USER_AGENT", ""),
-            ip_address=get_client_ip(request),
-            referrer=request.META.get("HTTP_REFERER", ""),
-            session_id=request.session.session_key or "",
+        return JsonResponse(
+            {"success": True, "accepted": len(events), "rejected": received - len(events)}
         )
 
-        return JsonResponse({"success": True})
-
     except json.JSONDecodeError:
         return JsonResponse(
             {"success": False, "message": "Dados inválidos"}, status=400
@@ -420,46 +946,71 @@ def analytics_track_api(request):
         )
 
 
-def waitlist_stats_api(request):
-    """API endpoint para estatísticas da lista de espera"""
+def analytics_summary_api(request):
+    """API endpoint (staff) com o resumo de analytics a partir das tabelas de rollup"""
+
+    if not request.user.is_staff:
+        return JsonResponse({"success": False, "message": "Acesso negado"}, status=403)
 
     try:
-        from django.db.models import Count
-        from django.utils import timezone
-        from datetime import datetime, timedelta
+        days = min(max(int(request.GET.get("days", 7)), 1), 90)
+    except ValueError:
+        return JsonResponse({"success": False, "message": "days deve ser um número"}, status=400)
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    funnel = LandingPageFunnelDaily.objects.filter(date__gte=since)
+    totals = ("sessions", "page_views", "form_starts", "form_successes")
+
+    return JsonResponse(
+        {
+            "success": True,
+            "data": {
+                "days": list(
+                    funnel.values("date").annotate(**{field: Sum(field) for field in totals}).order_by("date")
+                ),
+                "by_source": list(
+                    funnel.values("utm_source").annotate(**{field: Sum(field) for field in totals}).order_by("-sessions")[:20]
+                ),
+                "last_24_hours": list(
+                    LandingPageHourlyStats.objects.filter(hour__gte=timezone.now() - timedelta(hours=24))
+                    .values("hour", "event_type", "count")
+                    .order_by("hour")
+                ),
+                "generated_at": timezone.now().isoformat(),
+            },
+        },
+        json_dumps_params={"default": str},
+    )
 
-        # Dados básicos
-        total_count = WaitlistSubscriber.objects.filter(is_active=True).count()
-        today_count = WaitlistSubscriber.objects.filter(
-            created_at__date=timezone.now().date(), is_active=True
-        ).count()
 
-        # Distribuição por área
-        role_distribution = (
-            WaitlistSubscriber.objects.filter(is_active=True)
-            .values("role")
-            .annotate(count=Count("role"))
-            .order_by("-count")
-        )
+def waitlist_stats_api(request):
+    """API endpoint para estatísticas da lista de espera"""
+
+    try:
+        stats = get_waitlist_stats()
+        today = timezone.localdate()
 
         # Crescimento nos últimos 7 dias
         last_7_days = []
         for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            count = WaitlistSubscriber.objects.filter(
-                created_at__date=date, is_active=True
-            ).count()
-            last_7_days.append({"date": date.isoformat(), "count": count})
+            date = (today - timedelta(days=i)).isoformat()
+            last_7_days.append({"date": date, "count": stats["by_day"].get(date, 0)})
+
+        # Distribuição por área
+        role_distribution = [
+            {"role": role, "count": count}
+            for role, count in sorted(stats["roles"].items(), key=lambda item: -item[1])
+        ]
 
         return JsonResponse(
             {
                 "success": True,
                 "data": {
-                    "total_count": total_count,
-                    "today_count": today_count,
-                    "role_distribution": list(role_distribution),
+                    "total_count": get_waitlist_count(),
+                    "today_count": stats["by_day"].get(today.isoformat(), 0),
+                    "role_distribution": role_distribution,
                     "last_7_days": last_7_days,
-                    "generated_at": timezone.now().isoformat(),
+                    "generated_at": stats["generated_at"],
                 },
             }
         )
@@ -489,6 +1040,7 @@ urlpatterns = [
     path('api/waitlist/submit/', landing.waitlist_submit_api, name='waitlist_submit'),
     path('api/analytics/track/', landing.analytics_track_api, name='analytics_track'),
     path('api/waitlist/stats/', landing.waitlist_stats_api, name='waitlist_stats'),
+    path('api/analytics/summary/', landing.analytics_summary_api, name='analytics_summary'),
 ]
 """
 
@@ -500,7 +1052,10 @@ urlpatterns = [
 # Adicione ao seu admin.py:
 
 from django.contrib import admin
-from .models import WaitlistSubscriber, LandingPageAnalytics
+from .models import (
+    WaitlistSubscriber, LandingPageAnalytics, LandingPageSession,
+    LandingPageFunnelDaily, LandingPageHourlyStats,
+)
 
 @admin.register(WaitlistSubscriber)
 class WaitlistSubscriberAdmin(admin.ModelAdmin):
@@ -532,12 +1087,64 @@ class WaitlistSubscriberAdmin(admin.ModelAdmin):
 
 @admin.register(LandingPageAnalytics)
 class LandingPageAnalyticsAdmin(admin.ModelAdmin):
+    # Tabela bruta (só os eventos ainda não apagados): sem filtros por data nem contagem total
     list_display = ('event_type', 'page_url', 'ip_address', 'created_at')
-    list_filter = ('event_type', 'created_at')
-    search_fields = ('page_url', 'session_id')
+    list_filter = ('event_type',)
+    search_fields = ('=session_id',)
     readonly_fields = ('created_at',)
     list_per_page = 100
-    date_hierarchy = 'created_at'
+    show_full_result_count = False
+
+@admin.register(LandingPageSession)
+class LandingPageSessionAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'first_seen', 'events', 'page_views', 'reached_form_start', 'reached_form_success', 'utm_source')
+    list_filter = ('reached_form_success', 'utm_source')
+    search_fields = ('=session_id',)
+    date_hierarchy = 'first_seen'
+
+@admin.register(LandingPageFunnelDaily)
+class LandingPageFunnelDailyAdmin(admin.ModelAdmin):
+    list_display = ('date', 'utm_source', 'utm_medium', 'utm_campaign', 'sessions', 'form_starts', 'form_successes', 'conversion_rate')
+    list_filter = ('utm_source', 'utm_medium')
+    date_hierarchy = 'date'
+
+@admin.register(LandingPageHourlyStats)
+class LandingPageHourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('hour', 'event_type', 'count')
+    list_filter = ('event_type',)
+    date_hierarchy = 'hour'
+"""
+
+# =============================================================================
+# ROLLUP E LIMPEZA
+# =============================================================================
+
+"""
+# Agende (cron, a cada poucos minutos) um management command como este,
+# em management/commands/rollup_landing_analytics.py:
+
+from django.core.management.base import BaseCommand
+from landing_page.django_integration import prune_landing_analytics, rollup_landing_analytics
+
+class Command(BaseCommand):
+    help = 'Consolida os eventos da landing page e apaga os eventos brutos antigos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prune-days', type=int, help='Apaga eventos consolidados mais antigos que N dias')
+        parser.add_argument('--archive-dir', help='Arquiva os eventos apagados em JSONL compactado')
+
+    def handle(self, *args, **options):
+        processed = rollup_landing_analytics(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {processed} eventos consolidados'))
+
+        if options['prune_days']:
+            deleted = prune_landing_analytics(
+                days=options['prune_days'],
+                chunk_size=options['batch_size'],
+                archive_dir=options['archive_dir'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'🧹 {deleted} eventos brutos apagados'))
 """
 
 # =============================================================================
@@ -0,0 +1,143 @@
+import json
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+
+LANDING_MODELS = [
+    'WaitlistSubscriber', 'LandingPageAnalytics', 'LandingPageHourlyStats',
+    'LandingPageSession', 'LandingPageFunnelDaily', 'LandingPageRollupState',
+]
+
+
+class LandingPageTestCase(TestCase):
+    """Base dos testes da integração da landing page (fora de INSTALLED_APPS no projeto)"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Instala o app só durante a classe e cria as tabelas fora da transação do teste;
+        # as limpezas de classe rodam depois do rollback de tearDownClass, em ordem inversa
+        cls.enterClassContext(override_settings(INSTALLED_APPS=settings.INSTALLED_APPS + ['landing_page']))
+        cls.landing = import_module('landing_page.django_integration')
+        models = [getattr(cls.landing, name) for name in LANDING_MODELS]
+        with connection.schema_editor() as editor:
+            for model in models:
+                editor.create_model(model)
+        cls.addClassCleanup(cls._drop_tables, models)
+        super().setUpClass()
+
+    @staticmethod
+    def _drop_tables(models):
+        with connection.schema_editor() as editor:
+            for model in models:
+                editor.delete_model(model)
+
+    def post(self, view, payload, **extra):
+        request = RequestFactory().post('/', data=json.dumps(payload), content_type='application/json', **extra)
+        request.session = SessionStore()
+        return view(request)
+
+
+@override_settings(LANDING_ANALYTICS_BUFFERED=True)
+class AnalyticsTrackTest(LandingPageTestCase):
+    """Testes do endpoint de analytics e do spool"""
+
+    def setUp(self):
+        self.spool = self.landing.AnalyticsSpool(batch_size=10, max_size=3, threaded=False)
+        patcher = mock.patch.object(self.landing, 'analytics_spool', self.spool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list_payload(self):
+        """Testa uma lista de eventos com itens inválidos e textos longos"""
+        response = self.post(self.landing.analytics_track_api, {'events': [
+            {'event_type': 'cta_click', 'page_url': 'https://symplifika.com/' + 'a' * 300},
+            {'event_data': {}},
+            'evento',
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'success': True, 'accepted': 1, 'rejected': 2})
+        self.assertEqual(self.spool.flush(), 1)
+        self.assertEqual(len(self.landing.LandingPageAnalytics.objects.get().page_url), 200)
+
+    def test_full_spool_returns_retry_after(self):
+        """Testa o 429 com Retry-After quando o lote não cabe no spool"""
+        events = [{'event_type': 'page_view', 'page_url': 'https://symplifika.com/'}] * 2
+        self.assertEqual(self.post(self.landing.analytics_track_api, events).status_code, 200)
+
+        response = self.post(self.landing.analytics_track_api, events)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(self.spool.stats(), {'pending': 2, 'written': 0, 'dropped': 2})
+
+    def test_bad_event_is_dropped_not_requeued(self):
+        """Testa que um lote recusado é regravado evento a evento sem o evento inválido"""
+        Analytics = self.landing.LandingPageAnalytics
+        self.spool.add_many([
+            Analytics(event_type='page_view', page_url='https://symplifika.com/'),
+            Analytics(event_type='page_view', page_url='https://symplifika.com/', event_data={'x': object()}),
+            Analytics(event_type='cta_click', page_url='https://symplifika.com/'),
+        ])
+
+        self.assertEqual(self.spool.flush(), 2)
+        self.assertEqual(self.spool.stats(), {'pending': 0, 'written': 2, 'dropped': 1})
+        self.assertEqual(Analytics.objects.count(), 2)
+
+
+@override_settings(LANDING_ANALYTICS_BUFFERED=False)
+class SessionTrackingTest(LandingPageTestCase):
+    """Testes da identificação da sessão nos eventos"""
+
+    def test_page_view_creates_session(self):
+        """Testa que a primeira visita cria a sessão usada no evento de page view"""
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        view = self.landing.LandingPageView()
+        view.setup(request)
+        view.get_context_data()
+
+        self.assertIsNotNone(request.session.session_key)
+        self.assertEqual(self.landing.LandingPageAnalytics.objects.get().session_id, request.session.session_key)
+
+    def test_client_session_id_without_cookie(self):
+        """Testa que, sem cookie de sessão, vale o session_id enviado pelo cliente"""
+        self.post(self.landing.analytics_track_api, [
+            {'event_type': 'form_start', 'page_url': 'https://symplifika.com/', 'session_id': 'cliente-1'},
+            {'event_type': 'cta_click', 'page_url': 'https://symplifika.com/'},
+        ])
+
+        self.assertEqual(
+            sorted(self.landing.LandingPageAnalytics.objects.values_list('session_id', flat=True)),
+            ['', 'cliente-1']
+        )
+
+
+@override_settings(LANDING_ANALYTICS_BUFFERED=False)
+class WaitlistCountTest(LandingPageTestCase):
+    """Testes do total de inscritos em cache"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_follows_subscriptions_and_deactivation(self):
+        """Testa que inscrição e desativação invalidam o total em cache"""
+        self.landing.WaitlistSubscriber.objects.create(name='Ana', email='ana@example.com', role='rh')
+        self.assertEqual(self.landing.get_waitlist_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(
+                self.landing.waitlist_submit_api, {'name': 'Bia', 'email': 'bia@example.com', 'role': 'design'}
+            )
+        self.assertEqual(json.loads(response.content)['waitlist_count'], 2)
+
+        subscriber = self.landing.WaitlistSubscriber.objects.get(email='ana@example.com')
+        subscriber.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            subscriber.save()
+        self.assertEqual(self.landing.get_waitlist_count(), 1)
+        self.assertEqual(self.landing.get_waitlist_stats()['roles'], {'design': 1})
@@ -12,7 +12,9 @@ from .models import (
     StripePaymentIntent,
     StripeWebhookEvent
 )
-from users.models import UserProfile
+from users.admin import CurrentAIUsageAdminMixin
+from users.models import AIQuotaUsage, UserProfile
+from users.quota import current_period
 import stripe
 from django.conf import settings
 
@@ -273,11 +275,12 @@ class StripeWebhookEventAdmin(admin.ModelAdmin):
 
 
 # Admin personalizado para UserProfile com controle de planos
-class UserProfilePlanAdmin(admin.ModelAdmin):
-    list_display = ['user', 'plan_display', 'max_shortcuts', 'max_ai_requests', 'ai_requests_used']
+class UserProfilePlanAdmin(CurrentAIUsageAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'plan_display', 'max_shortcuts', 'max_ai_requests', 'ai_requests_used_display']
+    list_select_related = ['user']
     list_filter = ['plan', 'created_at']
     search_fields = ['user__username', 'user__email']
-    readonly_fields = ['created_at', 'updated_at', 'total_shortcuts_used', 'time_saved_minutes']
+    readonly_fields = ['created_at', 'updated_at', 'total_shortcuts_used', 'time_saved_minutes', 'ai_requests_used']
 
     fieldsets = (
         ('Informações do Usuário', {
@@ -335,7 +338,11 @@ class UserProfilePlanAdmin(admin.ModelAdmin):
         self.message_user(request, f'{updated} usuários rebaixados para Free.')
 
     def reset_ai_usage(self, request, queryset):
-        updated = queryset.update(ai_requests_used=0)
+        AIQuotaUsage.objects.filter(
+            user_id__in=queryset.values('user_id'),
+            period=current_period()
+        ).update(used=0)
+        updated = queryset.count()
         self.message_user(request, f'Uso de IA resetado para {updated} usuários.')
 
     upgrade_to_premium.short_description = "Upgrade para Premium"
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
-from .models import Category, Shortcut, ShortcutUsage, AIEnhancementLog
+from .models import Category, Shortcut, ShortcutUsage, ShortcutUsageDaily, AIEnhancementLog, AIJob, SyncTombstone
+from .autocomplete import invalidate_user_index
+from .counters import set_shortcuts_active
 
 
 @admin.register(Category)
@@ -10,7 +13,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'color_display', 'shortcuts_count', 'created_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['name', 'description', 'user__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['shortcuts_total', 'shortcuts_active', 'created_at', 'updated_at']
 
     @admin.display(description='Cor')
     def color_display(self, obj):
@@ -22,7 +25,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
     @admin.display(description='Atalhos Ativos')
     def shortcuts_count(self, obj):
-        count = obj.shortcuts.filter(is_active=True).count()
+        count = obj.shortcuts_active
         url = reverse('admin:shortcuts_shortcut_changelist') + f'?category__id__exact={obj.id}'
         return format_html('<a href="{}">{} atalhos</a>', url, count)
 
@@ -75,12 +78,18 @@ class ShortcutAdmin(admin.ModelAdmin):
 
     @admin.action(description='Ativar atalhos selecionados')
     def activate_shortcuts(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = set_shortcuts_active(queryset, True)
+        self._invalidate_autocomplete(queryset)
         self.message_user(request, f'{updated} atalhos foram ativados.')
 
+    def _invalidate_autocomplete(self, queryset):
+        for user_id in set(queryset.values_list('user_id', flat=True)):
+            invalidate_user_index(user_id)
+
     @admin.action(description='Desativar atalhos selecionados')
     def deactivate_shortcuts(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = set_shortcuts_active(queryset, False)
+        self._invalidate_autocomplete(queryset)
         self.message_user(request, f'{updated} atalhos foram desativados.')
 
 
@@ -98,23 +107,40 @@ class ShortcutUsageAdmin(admin.ModelAdmin):
         return False  # Registros criados automaticamente
 
 
+@admin.register(ShortcutUsageDaily)
+class ShortcutUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ['shortcut', 'user', 'date', 'count']
+    list_filter = ['date']
+    search_fields = ['shortcut__trigger', 'user__username']
+    date_hierarchy = 'date'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('shortcut', 'user')
+
+    def has_add_permission(self, request):
+        return False  # Totais mantidos pela ingestão e pelo comando backfill_usage_daily
+
+
 @admin.register(AIEnhancementLog)
 class AIEnhancementLogAdmin(admin.ModelAdmin):
     list_display = [
-        'shortcut', 'ai_model_used', 'processing_time_display',
+        'shortcut', 'ai_model_used', 'status', 'attempt', 'processing_time_display',
         'content_preview', 'created_at'
     ]
-    list_filter = ['ai_model_used', 'created_at']
+    list_filter = ['status', 'ai_model_used', 'created_at']
     search_fields = ['shortcut__trigger', 'shortcut__title', 'original_content']
     readonly_fields = ['created_at']
 
     fieldsets = (
         ('Informações Básicas', {
-            'fields': ('shortcut', 'ai_model_used', 'processing_time', 'created_at')
+            'fields': ('shortcut', 'job', 'ai_model_used', 'processing_time', 'created_at')
         }),
         ('Conteúdo', {
             'fields': ('original_content', 'enhanced_content')
         }),
+        ('Tentativa', {
+            'fields': ('status', 'attempt', 'error_message')
+        }),
     )
 
     @admin.display(description='Tempo de Processamento')
@@ -139,6 +165,46 @@ class AIEnhancementLogAdmin(admin.ModelAdmin):
         return False  # Registros criados automaticamente
 
 
+@admin.register(AIJob)
+class AIJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'shortcut', 'user', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'bypass_cache', 'created_at']
+    search_fields = ['shortcut__trigger', 'user__username', 'error_message']
+    readonly_fields = ['created_at', 'updated_at', 'finished_at', 'locked_by', 'locked_at']
+    actions = ['requeue_jobs']
+
+    @admin.action(description='Reenfileirar tarefas selecionadas')
+    def requeue_jobs(self, request, queryset):
+        updated = queryset.exclude(status__in=['pending', 'running']).update(
+            status='pending',
+            attempts=0,
+            run_after=timezone.now(),
+            finished_at=None,
+            updated_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} tarefas reenfileiradas.')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('shortcut', 'user')
+
+    def has_add_permission(self, request):
+        return False  # Registros criados automaticamente
+
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    list_display = ['object_type', 'object_id', 'user', 'deleted_at']
+    list_filter = ['object_type', 'deleted_at']
+    search_fields = ['user__username']
+    readonly_fields = ['deleted_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+    def has_add_permission(self, request):
+        return False  # Registros criados automaticamente
+
+
 # Configurações gerais do admin
 admin.site.site_header = 'Symplifika - Administração'
 admin.site.site_title = 'Symplifika Admin'
@@ -0,0 +1,337 @@
+"""
+Backends de IA usados pelo ``AIService``.
+
+O backend é escolhido por ``AI_BACKEND`` (``'gemini'``, ``'fake'`` ou o caminho
+de uma classe) e implementa ``enhance``, ``enhance_stream``,
+``generate_email_template``, ``suggest_shortcuts`` e ``health``, lançando
+``AIServiceError`` em caso de falha. Cache e fallbacks continuam no
+``AIService``.
+
+O ``FakeBackend`` troca apenas o modelo do SDK por um modelo local
+determinístico, com latência, taxa de erros e vazão de tokens configuráveis
+(``AI_FAKE_*``). As chamadas passam pelo mesmo cliente compartilhado (limite
+de concorrência, timeouts e circuit breaker), então testes de carga exercitam
+o caminho real sem chamadas de rede.
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Iterator
+
+import google.generativeai as genai
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .ai_client import AIServiceError, get_client
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {
+    'gemini': 'shortcuts.ai_backends.GeminiBackend',
+    'fake': 'shortcuts.ai_backends.FakeBackend',
+}
+
+BASE_PROMPT = """
+Sua tarefa é expandir e melhorar o texto fornecido mantendo o contexto e a intenção original.
+
+Diretrizes:
+1. Mantenha o tom e estilo do texto original
+2. Adicione detalhes relevantes e úteis
+3. Melhore a clareza e profissionalismo
+4. Se for um email, torne-o mais cordial e completo
+5. Se for código, adicione comentários e melhore a estrutura
+6. Se for uma resposta, torne-a mais informativa
+7. Mantenha a linguagem apropriada para o contexto
+
+O texto expandido deve ser natural e fluido.
+""".strip()
+
+
+def get_backend():
+    """Instancia o backend configurado em ``AI_BACKEND``"""
+    name = getattr(settings, 'AI_BACKEND', 'gemini')
+    return import_string(BACKENDS.get(name, name))()
+
+
+class AIBackend(ABC):
+    """Interface dos backends de IA"""
+
+    name = ''
+    model_name = ''
+    max_tokens = 500
+    temperature = 0.7
+    base_prompt = BASE_PROMPT
+
+    @property
+    @abstractmethod
+    def configured(self) -> bool:
+        """Se o backend tem o necessário (chave, modelo) para atender chamadas"""
+
+    @property
+    def max_concurrency(self) -> int:
+        return 1
+
+    @abstractmethod
+    def enhance(self, content: str, custom_prompt: str = "") -> str:
+        """Retorna o texto expandido"""
+
+    def enhance_stream(self, content: str, custom_prompt: str = "") -> Iterator[str]:
+        """Entrega o texto expandido em partes (padrão: uma única parte)"""
+        yield self.enhance(content, custom_prompt)
+
+    @abstractmethod
+    def generate_email_template(self, purpose: str, tone: str) -> str:
+        """Retorna um template de email para o propósito e tom informados"""
+
+    @abstractmethod
+    def suggest_shortcuts(self, text: str, max_suggestions: int) -> list:
+        """Retorna sugestões de atalhos (dicts) para o texto"""
+
+    @abstractmethod
+    def health(self) -> dict:
+        """Dict com ``accessible`` e ``error``"""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class GeminiBackend(AIBackend):
+    """Google Gemini através do cliente compartilhado do processo"""
+
+    name = 'gemini'
+    model_name = 'gemini-1.5-flash'
+
+    def __init__(self):
+        self.api_key = getattr(settings, 'GEMINI_API_KEY', '')
+        self.client = None
+
+        if not self.api_key:
+            logger.warning("Gemini API key não configurada")
+            return
+        try:
+            # Cliente compartilhado pelo processo (criado uma única vez por chave)
+            self.client = self._get_client()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar o backend Gemini: {e}")
+
+    def _get_client(self):
+        return get_client(self.api_key)
+
+    @property
+    def configured(self) -> bool:
+        return self.client is not None
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.client.max_concurrency if self.client else 1
+
+    def _config(self, max_tokens: int, temperature: float):
+        return genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            candidate_count=1
+        )
+
+    def _enhancement_prompt(self, content: str, custom_prompt: str) -> str:
+        if custom_prompt:
+            return f"{self.base_prompt}\n\nInstruções específicas: {custom_prompt}\n\nTexto a expandir: {content}"
+        return f"{self.base_prompt}\n\nTexto a expandir: {content}"
+
+    def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        if not self.client:
+            raise AIServiceError("API key não configurada")
+
+        response = self.client.generate(self.model_name, prompt, self._config(max_tokens, temperature))
+        if response.candidates and response.candidates[0].content:
+            text = response.candidates[0].content.parts[0].text.strip()
+            if text:
+                return text
+        raise AIServiceError("Resposta vazia do modelo")
+
+    def enhance(self, content: str, custom_prompt: str = "") -> str:
+        return self._generate(
+            self._enhancement_prompt(content, custom_prompt), self.max_tokens, self.temperature
+        )
+
+    def enhance_stream(self, content: str, custom_prompt: str = "") -> Iterator[str]:
+        if not self.client:
+            raise AIServiceError("API key não configurada")
+
+        yield from self.client.stream(
+            self.model_name,
+            self._enhancement_prompt(content, custom_prompt),
+            self._config(self.max_tokens, self.temperature)
+        )
+
+    def generate_email_template(self, purpose: str, tone: str) -> str:
+        prompt = f"""
+Gere um template de email em português para o seguinte propósito: {purpose}
+Tom desejado: {tone}
+
+O template deve incluir:
+- Assunto sugerido
+- Saudação apropriada
+- Corpo do email com placeholders para personalização (ex: {{nome}}, {{empresa}})
+- Fechamento adequado
+- Assinatura com placeholder
+
+Formato:
+Assunto: [assunto aqui]
+
+[corpo do email aqui]
+
+Seja conciso mas completo.
+        """
+        return self._generate(prompt, 400, 0.6)
+
+    def suggest_shortcuts(self, text: str, max_suggestions: int) -> list:
+        prompt = f"""
+Analise o seguinte texto e sugira {max_suggestions} possíveis atalhos (triggers) que poderiam ser criados.
+
+Texto: {text}
+
+Para cada sugestão, forneça:
+1. Trigger (começando com //)
+2. Título descritivo
+3. Breve explicação do uso
+
+Formato da resposta:
+//trigger1 - Título 1 - Explicação 1
+//trigger2 - Título 2 - Explicação 2
+...
+
+Os triggers devem ser curtos, memoráveis e descritivos.
+        """
+        return self._parse_suggestions(self._generate(prompt, 300, 0.8))
+
+    def _parse_suggestions(self, suggestions_text: str) -> list:
+        """Parse das sugestões de atalhos retornadas pela IA"""
+        suggestions = []
+
+        for line in suggestions_text.split('\n'):
+            if line.strip() and line.startswith('//'):
+                parts = line.split(' - ')
+                if len(parts) >= 3:
+                    suggestions.append({
+                        'trigger': parts[0].strip(),
+                        'title': parts[1].strip(),
+                        'description': ' - '.join(parts[2:]).strip()
+                    })
+
+        return suggestions
+
+    def health(self) -> dict:
+        if not self.client:
+            return {'accessible': False, 'error': 'API key não configurada'}
+        try:
+            # Testa a API com uma requisição simples
+            response = self.client.generate(self.model_name, "test", self._config(1, 0.1))
+            if response.candidates:
+                return {'accessible': True, 'error': None}
+            return {'accessible': False, 'error': 'Resposta vazia da API'}
+        except Exception as e:
+            return {'accessible': False, 'error': str(e)}
+
+    def stats(self) -> dict:
+        return self.client.stats() if self.client else {}
+
+
+class FakeModel:
+    """
+    Substituto local do ``GenerativeModel`` com respostas determinísticas
+
+    A latência até o primeiro token segue ``AI_FAKE_LATENCY`` (``fixed``,
+    ``uniform`` ou ``lognormal``); o restante da resposta sai a
+    ``AI_FAKE_TOKENS_PER_SECOND``. Uma fração ``AI_FAKE_ERROR_RATE`` das
+    chamadas falha. Com ``AI_FAKE_SEED`` a sequência de latências e erros é
+    reprodutível.
+    """
+
+    def __init__(self, latency: dict = None, error_rate: float = 0.0, tokens_per_second: float = 0.0,
+                 output_tokens: int = 60, seed=None):
+        self.latency = latency or {'distribution': 'fixed', 'ms': 0}
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample_first_token_delay(self) -> tuple:
+        """Tupla (atraso até o primeiro token em segundos, se a chamada deve falhar)"""
+        spec = self.latency
+        distribution = spec.get('distribution', 'fixed')
+        with self._lock:
+            if distribution == 'uniform':
+                delay_ms = self._random.uniform(spec.get('min_ms', 0), spec.get('max_ms', 0))
+            elif distribution == 'lognormal':
+                # Mediana em ``median_ms``; ``sigma`` controla a cauda (p99 ≈ mediana · e^(2,33·sigma))
+                delay_ms = spec.get('median_ms', 100) * self._random.lognormvariate(0, spec.get('sigma', 0.5))
+            else:
+                delay_ms = spec.get('ms', 0)
+            fails = self._random.random() < self.error_rate
+        return delay_ms / 1000, fails
+
+    def _tokens(self, prompt: str, max_tokens: int) -> list:
+        """Texto determinístico derivado do prompt, em tokens (palavras)"""
+        match = re.search(r'Texto a expandir: (.*)$', prompt, re.S)
+        source = (match.group(1) if match else prompt).strip()
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+
+        words = source.split() + ['—', 'texto', 'expandido', 'localmente', f'[{digest}]']
+        filler = ['com', 'mais', 'detalhes', 'e', 'clareza']
+        while len(words) < self.output_tokens:
+            words.append(filler[len(words) % len(filler)])
+        return words[:max(1, min(self.output_tokens, max_tokens))]
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        max_tokens = getattr(generation_config, 'max_output_tokens', None) or self.output_tokens
+        delay, fails = self._sample_first_token_delay()
+        tokens = self._tokens(prompt, max_tokens)
+        time.sleep(delay)
+        if fails:
+            raise RuntimeError('Falha simulada do backend falso')
+
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        if stream:
+            return self._stream(tokens, interval)
+
+        time.sleep(interval * len(tokens))
+        return self._response(' '.join(tokens))
+
+    def _stream(self, tokens, interval):
+        for index, token in enumerate(tokens):
+            if index and interval:
+                time.sleep(interval)
+            yield SimpleNamespace(text=token if index == 0 else f' {token}')
+
+    def _response(self, text: str):
+        part = SimpleNamespace(text=text)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class FakeBackend(GeminiBackend):
+    """Backend local para testes de carga: mesmo caminho do Gemini, sem rede"""
+
+    name = 'fake'
+    model_name = 'fake-gemini'
+
+    def __init__(self):
+        self.api_key = 'fake'
+        self.client = self._get_client()
+
+    def _get_client(self):
+        options = {
+            'latency': getattr(settings, 'AI_FAKE_LATENCY', None),
+            'error_rate': getattr(settings, 'AI_FAKE_ERROR_RATE', 0.0),
+            'tokens_per_second': getattr(settings, 'AI_FAKE_TOKENS_PER_SECOND', 0.0),
+            'output_tokens': getattr(settings, 'AI_FAKE_OUTPUT_TOKENS', 60),
+            'seed': getattr(settings, 'AI_FAKE_SEED', None),
+        }
+        # Um cliente por configuração, para que mudanças nos AI_FAKE_* valham sem reiniciar
+        key = 'fake:' + hashlib.sha256(repr(sorted(options.items())).encode()).hexdigest()[:16]
+        return get_client(key, model_factory=lambda model_name: FakeModel(**options))
@@ -0,0 +1,114 @@
+"""
+Regeneração em lote do conteúdo expandido pela IA.
+
+A cota do usuário é reservada de uma vez (``users.quota``); as chamadas ao Gemini rodam em paralelo em um pool
+limitado e, ao final, os atalhos são gravados com um único ``bulk_update`` e os
+logs com um único ``bulk_create``. Cotas reservadas para chamadas que falharam
+são devolvidas.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.quota import release_ai_requests, reserve_ai_requests
+
+from .models import AIEnhancementLog, Shortcut
+from .services import AIService, AIServiceError
+
+logger = logging.getLogger(__name__)
+
+
+def regenerate_shortcuts(user, shortcuts, max_workers: int = None) -> dict:
+    """
+    Regenera (ignorando o cache) o conteúdo expandido dos atalhos ``ai_enhanced``
+
+    Args:
+        shortcuts: Queryset ou lista de atalhos do usuário
+        max_workers: Chamadas simultâneas à IA (limitado pelo cliente compartilhado)
+
+    Returns:
+        Dict com ``requested``, ``regenerated``, ``failed``, ``skipped_quota`` e ``errors``
+    """
+    shortcuts = [shortcut for shortcut in shortcuts if shortcut.expansion_type == 'ai_enhanced']
+    summary = {
+        'requested': len(shortcuts),
+        'regenerated': 0,
+        'failed': 0,
+        'skipped_quota': 0,
+        'errors': [],
+    }
+    if not shortcuts:
+        return summary
+
+    ai_service = AIService()
+    if not ai_service.is_configured:
+        summary['failed'] = len(shortcuts)
+        summary['errors'].append({'shortcut_id': None, 'error': 'API key não configurada'})
+        return summary
+
+    reservation = reserve_ai_requests(user.pk, len(shortcuts), partial=True)
+    granted = reservation.count if reservation else 0
+    summary['skipped_quota'] = len(shortcuts) - granted
+    shortcuts = shortcuts[:granted]
+    if not shortcuts:
+        return summary
+
+    if max_workers is None:
+        max_workers = getattr(settings, 'AI_BULK_MAX_WORKERS', 4)
+    # Mais threads que o limite do cliente só gerariam rejeições
+    max_workers = max(1, min(max_workers, ai_service.backend.max_concurrency, len(shortcuts)))
+
+    def enhance(shortcut):
+        start_time = time.time()
+        try:
+            enhanced_content, _ = ai_service.enhance_text_cached(
+                shortcut.content,
+                shortcut.ai_prompt,
+                bypass_cache=True,
+                raise_errors=True
+            )
+            return shortcut, enhanced_content, None, time.time() - start_time
+        except AIServiceError as e:
+            return shortcut, None, str(e), time.time() - start_time
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-bulk') as executor:
+        results = list(executor.map(enhance, shortcuts))
+
+    now = timezone.now()
+    updated = []
+    logs = []
+    for shortcut, enhanced_content, error, processing_time in results:
+        if error:
+            summary['errors'].append({'shortcut_id': shortcut.id, 'error': error})
+            continue
+        logs.append(AIEnhancementLog(
+            shortcut=shortcut,
+            original_content=shortcut.content,
+            enhanced_content=enhanced_content,
+            ai_model_used=ai_service.model_name,
+            processing_time=processing_time
+        ))
+        if enhanced_content != shortcut.expanded_content:
+            shortcut.expanded_content = enhanced_content
+            shortcut.updated_at = now
+            updated.append(shortcut)
+
+    with transaction.atomic():
+        if updated:
+            Shortcut.objects.bulk_update(updated, ['expanded_content', 'updated_at'])
+        if logs:
+            AIEnhancementLog.objects.bulk_create(logs)
+
+    summary['regenerated'] = len(logs)
+    summary['failed'] = len(summary['errors'])
+    release_ai_requests(reservation, summary['failed'])
+
+    logger.info(
+        f"Regeneração em lote para usuário {user.pk}: {summary['regenerated']} regenerados, "
+        f"{summary['failed']} falhas, {summary['skipped_quota']} sem cota"
+    )
+    return summary
@@ -0,0 +1,111 @@
+"""
+Cache das respostas da IA endereçado pelo conteúdo.
+
+A chave é o hash de tudo que influencia a resposta (modelo, temperatura,
+máximo de tokens, prompt base, prompt customizado e texto). Há dois níveis:
+um LRU com TTL em memória no processo e o cache do Django, compartilhado
+entre os workers.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'shortcuts:ai:enhance:'
+
+
+def make_cache_key(model_name: str, temperature: float, max_tokens: int,
+                   base_prompt: str, custom_prompt: str, content: str) -> str:
+    """Hash estável dos parâmetros que determinam a resposta da IA"""
+    payload = json.dumps(
+        [model_name, temperature, max_tokens, base_prompt, custom_prompt or '', content],
+        ensure_ascii=False
+    )
+    return CACHE_KEY_PREFIX + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AIResponseCache:
+    """LRU com TTL em processo, com o cache do Django como segundo nível"""
+
+    def __init__(self, max_entries: int = 1000, ttl: int = 7 * 24 * 3600, use_shared_cache: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_shared_cache = use_shared_cache
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def get(self, key: str):
+        """Retorna a resposta em cache ou None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._metrics['local_hits'] += 1
+                    return value
+                del self._entries[key]
+
+        if self.use_shared_cache:
+            value = cache.get(key)
+            if value is not None:
+                self._store_local(key, value)
+                self._count('shared_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: str):
+        self._store_local(key, value)
+        if self.use_shared_cache:
+            cache.set(key, value, self.ttl)
+        self._count('stores')
+
+    def _store_local(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Métricas de acerto/erro do cache"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['local_entries'] = len(self._entries)
+        hits = metrics['local_hits'] + metrics['shared_hits']
+        lookups = hits + metrics['misses']
+        metrics['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return metrics
+
+
+ai_response_cache = AIResponseCache(
+    max_entries=getattr(settings, 'AI_CACHE_MAX_ENTRIES', 1000),
+    ttl=getattr(settings, 'AI_CACHE_TTL', 7 * 24 * 3600),
+    use_shared_cache=getattr(settings, 'AI_CACHE_SHARED', True),
+)
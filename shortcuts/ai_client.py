@@ -0,0 +1,324 @@
+"""
+Cliente Gemini compartilhado pelo processo.
+
+``AIService`` é instanciado a cada requisição; o cliente não. Há um
+``GeminiClient`` por chave de API (o backend falso usa um próprio, com um
+modelo local no lugar do SDK), criado na primeira chamada, que:
+
+- configura o SDK e cria os ``GenerativeModel`` uma única vez;
+- limita as chamadas simultâneas por worker com um semáforo (excedentes são
+  rejeitadas após ``AI_CLIENT_ACQUIRE_TIMEOUT``);
+- aplica timeout por chamada (o SDK fixado não aceita ``request_options``,
+  então a chamada roda em um pool próprio e o semáforo só é liberado quando
+  ela realmente termina);
+- abre o circuito após falhas consecutivas, falhando imediatamente até
+  ``AI_CIRCUIT_RESET_TIMEOUT`` e então liberando uma chamada de teste.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AIServiceError(Exception):
+    """Falha ao obter resposta da IA (erro da API ou resposta vazia)"""
+
+
+class AICircuitOpenError(AIServiceError):
+    """Chamada recusada porque o circuito está aberto"""
+
+
+class AIConcurrencyLimitError(AIServiceError):
+    """Chamada recusada por excesso de chamadas simultâneas"""
+
+
+class AITimeoutError(AIServiceError):
+    """A chamada excedeu o tempo limite"""
+
+
+class CircuitBreaker:
+    """Circuito fechado → aberto após falhas consecutivas → meio-aberto após o tempo de espera"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._outage_started = None
+        self._retry_at = 0.0
+        self._open_seconds = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode seguir (no meio-aberto, apenas uma por vez)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self._retry_at:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                self._open_seconds += time.monotonic() - self._outage_started
+                self._outage_started = None
+                self._probe_in_flight = False
+                self.state = self.CLOSED
+                logger.info("Circuito da IA fechado")
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                now = time.monotonic()
+                if self._outage_started is None:
+                    self._outage_started = now
+                    logger.warning(f"Circuito da IA aberto após {self.consecutive_failures} falhas consecutivas")
+                self.state = self.OPEN
+                self._retry_at = now + self.reset_timeout
+                self._probe_in_flight = False
+
+    def cancel(self):
+        """Desiste de uma chamada liberada por allow() sem contá-la como sucesso ou falha"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def open_seconds(self) -> float:
+        """Tempo total (s) com o circuito aberto ou meio-aberto"""
+        with self._lock:
+            current = time.monotonic() - self._outage_started if self._outage_started is not None else 0.0
+            return self._open_seconds + current
+
+
+class GeminiClient:
+    """Acesso ao Gemini com limite de concorrência, timeout e circuit breaker"""
+
+    def __init__(self, api_key: str, max_concurrency: int = 4, acquire_timeout: float = 2.0,
+                 call_timeout: float = 15.0, breaker: CircuitBreaker = None, model_factory=None):
+        """
+        Args:
+            model_factory: Cria o modelo a partir do nome (padrão: ``genai.GenerativeModel``);
+                usado pelo backend falso para substituir o SDK
+        """
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.call_timeout = call_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._models = {}
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+        self._lock = threading.Lock()
+        self._metrics = {
+            'in_flight': 0,
+            'calls': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'short_circuited': 0,
+        }
+
+        if model_factory is None:
+            genai.configure(api_key=api_key)
+            model_factory = genai.GenerativeModel
+        self._model_factory = model_factory
+
+    def _count(self, metric: str, delta: int = 1):
+        with self._lock:
+            self._metrics[metric] += delta
+
+    def get_model(self, model_name: str):
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = self._model_factory(model_name)
+            return model
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise AICircuitOpenError("Serviço de IA temporariamente indisponível (circuito aberto)")
+
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            self._count('rejected')
+            self.breaker.cancel()
+            raise AIConcurrencyLimitError("Limite de chamadas simultâneas à IA atingido")
+
+        self._count('in_flight')
+        self._count('calls')
+
+    def _submit(self, fn, *args, **kwargs):
+        """Executa no pool do cliente; a vaga do semáforo é liberada quando a chamada termina"""
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _abandon(self, submitted: bool, settled: bool):
+        """Libera o que uma tentativa interrompida ainda segura (vaga do semáforo e sonda do meio-aberto)"""
+        if not submitted:
+            self._release()
+        if not settled:
+            # Não conta como sucesso nem falha, mas nunca deixa o circuito preso no meio-aberto
+            self.breaker.cancel()
+
+    def _fail(self, timeout: bool = False):
+        if timeout:
+            self._count('timeouts')
+        self._count('failures')
+        self.breaker.record_failure()
+
+    def generate(self, model_name: str, prompt: str, generation_config=None):
+        """
+        Gera conteúdo respeitando o limite de concorrência, o timeout e o circuito
+
+        Raises:
+            AICircuitOpenError, AIConcurrencyLimitError, AITimeoutError ou AIServiceError
+        """
+        self._acquire()
+        submitted = settled = False
+        try:
+            model = self.get_model(model_name)
+            future = self._submit(model.generate_content, prompt, generation_config=generation_config)
+            submitted = True
+
+            try:
+                response = future.result(timeout=self.call_timeout)
+            except FutureTimeoutError:
+                settled = True
+                self._fail(timeout=True)
+                raise AITimeoutError(f"A IA não respondeu em {self.call_timeout:.0f}s")
+            except Exception as e:
+                settled = True
+                self._fail()
+                raise AIServiceError(str(e)) from e
+
+            settled = True
+            self.breaker.record_success()
+            return response
+        finally:
+            self._abandon(submitted, settled)
+
+    def stream(self, model_name: str, prompt: str, generation_config=None):
+        """
+        Gera conteúdo em partes, entregando o texto de cada uma assim que chega
+
+        O timeout vale para o intervalo entre partes (inclusive até a primeira).
+        """
+        self._acquire()
+        submitted = settled = False
+        chunks = queue.Queue()
+        try:
+            model = self.get_model(model_name)
+
+            def produce():
+                try:
+                    for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+                        text = chunk.text
+                        if text:
+                            chunks.put(('chunk', text))
+                    chunks.put(('done', None))
+                except Exception as e:
+                    chunks.put(('error', e))
+
+            self._submit(produce)
+            submitted = True
+
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=self.call_timeout)
+                except queue.Empty:
+                    settled = True
+                    self._fail(timeout=True)
+                    raise AITimeoutError(f"A IA não respondeu em {self.call_timeout:.0f}s")
+
+                if kind == 'chunk':
+                    yield value
+                elif kind == 'error':
+                    settled = True
+                    self._fail()
+                    raise AIServiceError(str(value)) from value
+                else:
+                    settled = True
+                    self.breaker.record_success()
+                    return
+        finally:
+            # Inclui o consumidor que desistiu no meio (cliente desconectou)
+            self._abandon(submitted, settled)
+
+    def _release(self):
+        self._count('in_flight', -1)
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        """Contadores do cliente e estado do circuito"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics.update({
+            'max_concurrency': self.max_concurrency,
+            'circuit_state': self.breaker.state,
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'open_circuit_seconds': round(self.breaker.open_seconds(), 3),
+        })
+        return metrics
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str, model_factory=None) -> GeminiClient:
+    """Cliente compartilhado para a chave de API, criado na primeira chamada"""
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = GeminiClient(
+                api_key,
+                max_concurrency=getattr(settings, 'AI_CLIENT_MAX_CONCURRENCY', 4),
+                acquire_timeout=getattr(settings, 'AI_CLIENT_ACQUIRE_TIMEOUT', 2.0),
+                call_timeout=getattr(settings, 'AI_CLIENT_TIMEOUT', 15.0),
+                breaker=CircuitBreaker(
+                    failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 5),
+                    reset_timeout=getattr(settings, 'AI_CIRCUIT_RESET_TIMEOUT', 30.0),
+                ),
+                model_factory=model_factory,
+            )
+            _clients[api_key] = client
+            logger.info(f"Cliente Gemini inicializado (concorrência máxima {client.max_concurrency})")
+        return client
+
+
+def get_clients_stats() -> list:
+    """Contadores dos clientes já criados neste processo"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [client.stats() for client in clients]
+
+
+def reset_clients():
+    """Descarta os clientes criados (usado em testes e ao trocar a configuração)"""
+    with _clients_lock:
+        for client in _clients.values():
+            client._executor.shutdown(wait=False)
+        _clients.clear()
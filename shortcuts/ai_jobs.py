@@ -0,0 +1,256 @@
+"""
+Fila de expansões por IA persistida no banco.
+
+As views apenas enfileiram um ``AIJob`` e respondem na hora com o conteúdo já
+disponível (expandido anteriormente ou estático); o comando ``run_ai_worker``
+processa a fila. Cada tarefa é reservada com um ``UPDATE`` condicional
+(``status='pending'``), o que permite vários workers em paralelo sem depender
+de ``SELECT ... FOR UPDATE SKIP LOCKED``.
+
+Falhas da IA são registradas no ``AIEnhancementLog`` e reagendadas com backoff
+exponencial; após ``max_attempts`` a tarefa é descartada (dead letter).
+Com ``AI_JOBS_ASYNC=False`` a tarefa é processada na própria requisição.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from users.quota import release_ai_requests, reserve_ai_requests
+
+from .models import AIEnhancementLog, AIJob
+from .services import AIService, AIServiceError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def enqueue_enhancement(shortcut, user, bypass_cache: bool = False) -> AIJob:
+    """Enfileira a expansão do atalho, reaproveitando uma tarefa equivalente ainda ativa"""
+    existing = AIJob.objects.filter(
+        shortcut=shortcut,
+        status__in=ACTIVE_STATUSES,
+        bypass_cache=bypass_cache,
+        original_content=shortcut.content
+    ).order_by('-created_at').first()
+    if existing:
+        return existing
+
+    return AIJob.objects.create(
+        user=user,
+        shortcut=shortcut,
+        bypass_cache=bypass_cache,
+        original_content=shortcut.content,
+        max_attempts=getattr(settings, 'AI_JOBS_MAX_ATTEMPTS', 3)
+    )
+
+
+def submit_enhancement(shortcut, user, bypass_cache: bool = False) -> AIJob:
+    """Enfileira a expansão; no modo síncrono já a processa antes de retornar"""
+    job = enqueue_enhancement(shortcut, user, bypass_cache)
+
+    if not getattr(settings, 'AI_JOBS_ASYNC', True) and job.status == 'pending':
+        claimed = claim_job(job.pk, 'inline')
+        if claimed:
+            return run_job(claimed)
+
+    return job
+
+
+def submit_regenerations(user, shortcuts) -> dict:
+    """
+    Enfileira a regeneração (ignorando o cache) dos atalhos ``ai_enhanced``
+
+    Só entram na fila quantos atalhos couberem na cota restante do usuário;
+    a cota de cada tarefa é reservada quando o worker a processa.
+
+    Returns:
+        Dict com ``requested``, ``skipped_quota`` e ``jobs``
+    """
+    shortcuts = [shortcut for shortcut in shortcuts if shortcut.expansion_type == 'ai_enhanced']
+    profile = user.profile
+    if profile.max_ai_requests == -1:
+        allowed = len(shortcuts)
+    else:
+        allowed = max(0, profile.max_ai_requests - profile.ai_requests_used)
+
+    return {
+        'requested': len(shortcuts),
+        'skipped_quota': max(0, len(shortcuts) - allowed),
+        'jobs': [submit_enhancement(shortcut, user, bypass_cache=True) for shortcut in shortcuts[:allowed]],
+    }
+
+
+def claim_job(job_id, worker_id: str):
+    """Reserva a tarefa para o worker; retorna None se outro worker chegou antes"""
+    now = timezone.now()
+    claimed = AIJob.objects.filter(pk=job_id, status='pending').update(
+        status='running',
+        locked_by=worker_id,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+        updated_at=now
+    )
+    if not claimed:
+        return None
+    return AIJob.objects.select_related('shortcut', 'user__profile').get(pk=job_id)
+
+
+def claim_jobs(worker_id: str, limit: int) -> list:
+    """Reserva até ``limit`` tarefas prontas para execução, das mais antigas para as mais novas"""
+    if limit <= 0:
+        return []
+
+    candidates = AIJob.objects.filter(
+        status='pending',
+        run_after__lte=timezone.now()
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:limit * 2]
+
+    jobs = []
+    for job_id in candidates:
+        job = claim_job(job_id, worker_id)
+        if job:
+            jobs.append(job)
+            if len(jobs) >= limit:
+                break
+    return jobs
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter (em segundos) para a próxima tentativa"""
+    base = getattr(settings, 'AI_JOBS_RETRY_BASE_DELAY', 30)
+    cap = getattr(settings, 'AI_JOBS_RETRY_MAX_DELAY', 900)
+    delay = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def run_job(job: AIJob) -> AIJob:
+    """Processa uma tarefa já reservada e grava o resultado"""
+    shortcut = job.shortcut
+
+    # Reserva antes de chamar a IA; devolvida se a chamada falhar ou vier do cache
+    reservation = reserve_ai_requests(job.user_id)
+    if reservation is None:
+        _finish(job, 'failed', error_message='Limite de uso de IA atingido')
+        return job
+
+    ai_service = AIService()
+    start_time = time.time()
+    try:
+        enhanced_content, from_cache = ai_service.enhance_text_cached(
+            job.original_content,
+            shortcut.ai_prompt,
+            bypass_cache=job.bypass_cache,
+            raise_errors=True
+        )
+    except AIServiceError as e:
+        release_ai_requests(reservation)
+        _record_failure(job, ai_service, e, time.time() - start_time)
+        return job
+
+    processing_time = time.time() - start_time
+
+    # Salva o log e mantém a cota consumida apenas se a IA foi realmente chamada
+    if enhanced_content != job.original_content and not from_cache:
+        AIEnhancementLog.objects.create(
+            shortcut=shortcut,
+            job=job,
+            original_content=job.original_content,
+            enhanced_content=enhanced_content,
+            ai_model_used=ai_service.model_name,
+            processing_time=processing_time,
+            attempt=job.attempts
+        )
+    else:
+        release_ai_requests(reservation)
+
+    # Salva conteúdo expandido no atalho
+    if enhanced_content != job.original_content and enhanced_content != shortcut.expanded_content:
+        shortcut.expanded_content = enhanced_content
+        shortcut.save(update_fields=['expanded_content', 'updated_at'])
+
+    _finish(job, 'succeeded', result=enhanced_content)
+    return job
+
+
+def _finish(job: AIJob, status: str, result: str = '', error_message: str = ''):
+    job.status = status
+    job.result = result
+    job.error_message = error_message
+    job.locked_by = ''
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'result', 'error_message', 'locked_by', 'locked_at', 'finished_at', 'updated_at'
+    ])
+
+
+def _record_failure(job: AIJob, ai_service: AIService, error: Exception, processing_time: float):
+    """Registra a falha e reagenda a tarefa ou a descarta após a última tentativa"""
+    dead = job.attempts >= job.max_attempts
+
+    AIEnhancementLog.objects.create(
+        shortcut=job.shortcut,
+        job=job,
+        original_content=job.original_content,
+        enhanced_content='',
+        ai_model_used=ai_service.model_name,
+        processing_time=processing_time,
+        status='dead_letter' if dead else 'retry',
+        attempt=job.attempts,
+        error_message=str(error)
+    )
+
+    if dead:
+        logger.error(f"Tarefa IA {job.pk} descartada após {job.attempts} tentativas: {error}")
+        _finish(job, 'dead', error_message=str(error))
+        return
+
+    delay = retry_delay(job.attempts)
+    logger.warning(f"Tarefa IA {job.pk} falhou (tentativa {job.attempts}), nova tentativa em {delay:.0f}s: {error}")
+    job.status = 'pending'
+    job.error_message = str(error)
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=[
+        'status', 'error_message', 'run_after', 'locked_by', 'locked_at', 'updated_at'
+    ])
+
+
+def requeue_stale_jobs(timeout: int = None) -> int:
+    """
+    Devolve à fila tarefas presas em execução (worker interrompido)
+
+    Returns:
+        Quantidade de tarefas liberadas
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'AI_JOBS_STALE_TIMEOUT', 600)
+    now = timezone.now()
+    stale = AIJob.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=timeout))
+
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='dead',
+        error_message='Worker interrompido durante a execução',
+        locked_by='',
+        locked_at=None,
+        finished_at=now,
+        updated_at=now
+    )
+    requeued = stale.update(
+        status='pending',
+        locked_by='',
+        locked_at=None,
+        run_after=now,
+        updated_at=now
+    )
+
+    if dead or requeued:
+        logger.warning(f"Tarefas IA presas: {requeued} reagendadas, {dead} descartadas")
+    return dead + requeued
@@ -0,0 +1,141 @@
+"""
+Regeneração por IA transmitida por server-sent events.
+
+O texto é enviado ao cliente em eventos ``token`` assim que o Gemini o gera;
+ao final do stream o resultado é gravado no atalho e no ``AIEnhancementLog``
+e um evento ``done`` traz o texto completo e as métricas (incluindo o tempo
+até o primeiro token). A cota é reservada antes de abrir o stream e devolvida
+se a geração falhar, se o cliente desconectar antes do primeiro token ou se o
+stream for fechado sem ser lido.
+"""
+import json
+import logging
+import time
+
+from rest_framework.renderers import BaseRenderer
+
+from users.quota import release_ai_requests
+
+from .models import AIEnhancementLog
+from .services import AIService, AIServiceError
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Formata um evento no padrão text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Aceita ``Accept: text/event-stream``; respostas de erro viram um evento ``error``"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data if isinstance(data, dict) else {'error': data}).encode(self.charset)
+
+
+class RegenerationStream:
+    """
+    Iterador dos eventos de uma regeneração com a cota já reservada
+
+    O ``StreamingHttpResponse`` chama ``close`` ao encerrar a resposta. Um
+    gerador fechado antes da primeira leitura não executa o próprio
+    ``finally``, então a cota de um stream que nunca foi lido (cliente que
+    desconectou antes do primeiro evento) é devolvida aqui.
+    """
+
+    def __init__(self, shortcut, reservation):
+        self.reservation = reservation
+        self._started = False
+        self._events = _regeneration_events(shortcut, reservation)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._started = True
+        return next(self._events)
+
+    def close(self):
+        if not self._started:
+            self._started = True
+            release_ai_requests(self.reservation)
+        self._events.close()
+
+
+def stream_regeneration(shortcut, reservation) -> RegenerationStream:
+    """Eventos SSE da regeneração do atalho com a cota já reservada (ver ``_regeneration_events``)"""
+    return RegenerationStream(shortcut, reservation)
+
+
+def _regeneration_events(shortcut, reservation):
+    """
+    Gera os eventos SSE da regeneração do atalho com a cota já reservada
+
+    Eventos: ``start``, ``token`` (``text``), ``done`` (``enhanced_content``,
+    ``processing_time``, ``time_to_first_token``) ou ``error`` (``error`` e o
+    ``content`` disponível para uso). Se o cliente desconectar antes do fim, a
+    cota é devolvida quando nenhum token chegou a ser gerado; com a geração
+    já em andamento ela fica consumida e o resultado parcial é descartado.
+    """
+    ai_service = AIService()
+    start_time = time.time()
+    time_to_first_token = None
+    parts = []
+    settled = False
+
+    try:
+        yield sse_event('start', {'shortcut_id': shortcut.id, 'model': ai_service.model_name})
+
+        try:
+            for chunk in ai_service.enhance_text_stream(shortcut.content, shortcut.ai_prompt):
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+                parts.append(chunk)
+                yield sse_event('token', {'text': chunk})
+        except AIServiceError as e:
+            logger.error(f"Erro na regeneração por streaming do atalho {shortcut.id}: {e}")
+            release_ai_requests(reservation)
+            settled = True
+            yield sse_event('error', {
+                'error': str(e),
+                'content': shortcut.expanded_content or shortcut.content
+            })
+            return
+
+        processing_time = time.time() - start_time
+        enhanced_content = ''.join(parts).strip()
+
+        AIEnhancementLog.objects.create(
+            shortcut=shortcut,
+            original_content=shortcut.content,
+            enhanced_content=enhanced_content,
+            ai_model_used=ai_service.model_name,
+            processing_time=processing_time
+        )
+        if enhanced_content != shortcut.expanded_content:
+            shortcut.expanded_content = enhanced_content
+            shortcut.save(update_fields=['expanded_content', 'updated_at'])
+        settled = True
+
+        first_token = f'{time_to_first_token:.2f}s' if time_to_first_token is not None else 'nenhum token'
+        logger.info(
+            f"Atalho {shortcut.id} regenerado por streaming em {processing_time:.2f}s "
+            f"(primeiro token: {first_token})"
+        )
+        yield sse_event('done', {
+            'enhanced_content': enhanced_content,
+            'processing_time': round(processing_time, 3),
+            'time_to_first_token': round(time_to_first_token, 3) if time_to_first_token is not None else None,
+        })
+    finally:
+        # Cliente desconectado (GeneratorExit) ou erro inesperado antes de gravar o resultado
+        if not settled:
+            if not parts:
+                release_ai_requests(reservation)
+            logger.warning(
+                f"Regeneração por streaming do atalho {shortcut.id} interrompida após {len(parts)} trechos"
+            )
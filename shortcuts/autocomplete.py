@@ -0,0 +1,212 @@
+"""
+Índice de autocomplete por usuário (gatilhos, títulos e nomes de categorias).
+
+O índice guarda as chaves normalizadas (minúsculas, sem acentos) em uma lista
+ordenada: buscas por prefixo são resolvidas com ``bisect`` e buscas por
+trecho (infixo) com ``str.find`` sobre todas as chaves concatenadas, ambas
+sem consultar o banco.
+
+Os índices ficam em memória no processo. Uma versão por usuário guardada no
+cache do Django é trocada sempre que um atalho ou categoria muda; na próxima
+consulta o índice daquele usuário é recompilado. A versão só chega aos outros
+workers se o cache for compartilhado (Redis ou banco, ver ``CACHES``); com o
+LocMemCache do desenvolvimento cada processo enxerga apenas as próprias
+alterações, e fora de DEBUG a verificação ``core.E001`` impede essa configuração.
+"""
+import logging
+import threading
+import unicodedata
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from .models import Category, Shortcut
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'shortcuts:autocomplete:version:{user_id}'
+
+SEPARATOR = '\n'
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower().strip()
+
+
+def _preview(text: str, length: int = 100) -> str:
+    return text[:length] + '...' if len(text) > length else text
+
+
+class AutocompleteIndex:
+    """Lista ordenada de chaves normalizadas apontando para as sugestões"""
+
+    def __init__(self, suggestions, terms):
+        """
+        Args:
+            suggestions: Lista de dicts no formato retornado pela API
+            terms: Lista de listas com os termos indexados de cada sugestão
+        """
+        self.suggestions = suggestions
+
+        keys = sorted(
+            (normalize(term), position)
+            for position, item_terms in enumerate(terms)
+            for term in item_terms
+            if term and normalize(term)
+        )
+        self._keys = [key for key, _ in keys]
+        self._refs = [position for _, position in keys]
+
+        self._offsets = []
+        offset = 0
+        for key in self._keys:
+            self._offsets.append(offset)
+            offset += len(key) + len(SEPARATOR)
+        self._haystack = SEPARATOR.join(self._keys)
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Retorna sugestões cujo termo começa com a busca e, em seguida, as que a contêm"""
+        query = normalize(query).replace(SEPARATOR, ' ')
+        if not query or limit <= 0:
+            return []
+
+        found = []
+        seen = set()
+
+        def collect(position):
+            if position not in seen:
+                seen.add(position)
+                found.append(dict(self.suggestions[position]))
+
+        # Prefixo: faixa contígua da lista ordenada
+        index = bisect_left(self._keys, query)
+        while index < len(self._keys) and len(found) < limit and self._keys[index].startswith(query):
+            collect(self._refs[index])
+            index += 1
+
+        # Infixo: varredura em C sobre todas as chaves concatenadas
+        start = 0
+        while len(found) < limit:
+            match = self._haystack.find(query, start)
+            if match == -1:
+                break
+            index = bisect_right(self._offsets, match) - 1
+            collect(self._refs[index])
+            start = self._offsets[index + 1] if index + 1 < len(self._offsets) else len(self._haystack)
+
+        return found
+
+
+def build_indexes(user) -> dict:
+    """Monta os índices de atalhos ativos e de categorias do usuário"""
+    suggestions = []
+    terms = []
+
+    shortcuts = Shortcut.objects.filter(user=user, is_active=True).select_related('category').only(
+        'id', 'trigger', 'title', 'content', 'category__name'
+    )
+    for shortcut in shortcuts:
+        suggestions.append({
+            'text': shortcut.title,
+            'type': 'shortcut',
+            'description': _preview(shortcut.content),
+            'trigger': shortcut.trigger,
+            'category': shortcut.category.name if shortcut.category else None,
+            'url': f'/shortcuts/{shortcut.id}/',
+        })
+        terms.append([shortcut.trigger, shortcut.trigger.lstrip('/'), shortcut.title])
+    shortcut_index = AutocompleteIndex(suggestions, terms)
+
+    suggestions = []
+    terms = []
+    for category in Category.objects.filter(user=user).only('id', 'name', 'description', 'color'):
+        suggestions.append({
+            'text': category.name,
+            'type': 'category',
+            'description': _preview(category.description) if category.description else f'Categoria: {category.name}',
+            'color': category.color,
+            'url': f'/shortcuts/category/{category.id}/',
+        })
+        terms.append([category.name])
+
+    return {
+        'shortcut': shortcut_index,
+        'category': AutocompleteIndex(suggestions, terms),
+    }
+
+
+def get_index_version(user_id) -> str:
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user_index(user_id) -> str:
+    """Força a recompilação do índice do usuário (em todos os processos com cache compartilhado)"""
+    version = uuid.uuid4().hex
+    cache.set(VERSION_CACHE_KEY.format(user_id=user_id), version, None)
+    return version
+
+
+class AutocompleteIndexCache:
+    """Cache LRU em processo dos índices por usuário, validado pela versão no cache do Django"""
+
+    def __init__(self, max_users: int = 128):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user) -> dict:
+        version = get_index_version(user.pk)
+
+        with self._lock:
+            entry = self._entries.get(user.pk)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(user.pk)
+                return entry[1]
+
+        indexes = build_indexes(user)
+        logger.debug(
+            f"Índice de autocomplete recompilado para usuário {user.pk} "
+            f"({len(indexes['shortcut'])} atalhos, {len(indexes['category'])} categorias)"
+        )
+
+        with self._lock:
+            self._entries[user.pk] = (version, indexes)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        return indexes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+index_cache = AutocompleteIndexCache()
+
+
+def autocomplete(user, query: str, limit: int = 10, suggestion_type: str = None) -> list:
+    """
+    Sugestões de autocomplete para o usuário
+
+    Args:
+        suggestion_type: 'shortcut' ou 'category'; sem tipo, atalhos vêm antes das categorias
+    """
+    indexes = index_cache.get(user)
+    if suggestion_type:
+        return indexes[suggestion_type].search(query, limit)
+
+    found = indexes['shortcut'].search(query, limit)
+    return found + indexes['category'].search(query, limit - len(found))
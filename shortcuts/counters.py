@@ -0,0 +1,229 @@
+"""
+Contadores desnormalizados de atalhos por usuário e por categoria.
+
+``UserProfile`` guarda o total de atalhos, os ativos e o total de usos;
+``Category`` guarda o total e os ativos. Todos são atualizados com
+``F() + delta`` (atômico no banco, sem passar de zero) a partir dos sinais do modelo, das ações em
+lote e da gravação de usos. O comando ``reconcile_counters`` recalcula os
+valores do zero e corrige eventuais divergências. As alterações em lote (que
+não disparam sinais) também descartam o snapshot de estatísticas do usuário.
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from users.models import UserProfile
+from users.stats import invalidate_user_stats
+
+from .models import Category, Shortcut
+
+logger = logging.getLogger(__name__)
+
+
+def _increments(**deltas) -> dict:
+    # Decrementos param em zero: um total que já divergiu não fica negativo
+    return {
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+
+
+def adjust_user_counters(user_id, total: int = 0, active: int = 0, uses: int = 0):
+    """Soma os deltas aos contadores do perfil do usuário"""
+    updates = _increments(shortcuts_total=total, shortcuts_active=active, total_shortcuts_used=uses)
+    if updates:
+        UserProfile.objects.filter(user_id=user_id).update(**updates)
+
+
+def adjust_category_counters(category_id, total: int = 0, active: int = 0):
+    """Soma os deltas aos contadores da categoria"""
+    updates = _increments(shortcuts_total=total, shortcuts_active=active)
+    if category_id and updates:
+        Category.objects.filter(pk=category_id).update(**updates)
+
+
+def shortcut_saved(shortcut, created: bool, previous=None):
+    """
+    Aplica os deltas de um atalho criado ou alterado
+
+    Args:
+        previous: Tupla (is_active, category_id) antes da alteração
+    """
+    active = 1 if shortcut.is_active else 0
+
+    if created:
+        adjust_user_counters(shortcut.user_id, total=1, active=active)
+        adjust_category_counters(shortcut.category_id, total=1, active=active)
+        return
+
+    if previous is None:
+        return
+
+    was_active, previous_category_id = previous
+    was_active = 1 if was_active else 0
+
+    if active != was_active:
+        adjust_user_counters(shortcut.user_id, active=active - was_active)
+
+    if previous_category_id != shortcut.category_id:
+        adjust_category_counters(previous_category_id, total=-1, active=-was_active)
+        adjust_category_counters(shortcut.category_id, total=1, active=active)
+    elif active != was_active:
+        adjust_category_counters(shortcut.category_id, active=active - was_active)
+
+
+def shortcut_deleted(shortcut):
+    """Aplica os deltas de um atalho excluído (seus usos também saem do total)"""
+    active = 1 if shortcut.is_active else 0
+    adjust_user_counters(shortcut.user_id, total=-1, active=-active, uses=-shortcut.use_count)
+    adjust_category_counters(shortcut.category_id, total=-1, active=-active)
+
+
+def usage_recorded(uses_by_user: dict):
+    """Soma usos gravados em lote ao total de cada usuário"""
+    for user_id, uses in uses_by_user.items():
+        adjust_user_counters(user_id, uses=uses)
+        invalidate_user_stats(user_id)
+
+
+def set_shortcuts_active(queryset, is_active: bool) -> int:
+    """
+    Ativa/desativa os atalhos do queryset atualizando os contadores
+
+    Returns:
+        Quantidade de atalhos que mudaram de estado
+    """
+    with transaction.atomic():
+        rows = list(
+            queryset.exclude(is_active=is_active)
+            .select_for_update()
+            .values_list('id', 'user_id', 'category_id')
+        )
+        if not rows:
+            return 0
+
+        Shortcut.objects.filter(pk__in=[row[0] for row in rows]).update(
+            is_active=is_active,
+            updated_at=timezone.now()
+        )
+
+        sign = 1 if is_active else -1
+        for user_id, count in Counter(row[1] for row in rows).items():
+            adjust_user_counters(user_id, active=sign * count)
+            invalidate_user_stats(user_id)
+        for category_id, count in Counter(row[2] for row in rows).items():
+            adjust_category_counters(category_id, active=sign * count)
+
+    return len(rows)
+
+
+def move_shortcuts_to_category(queryset, category) -> int:
+    """Move os atalhos do queryset para a categoria atualizando os contadores"""
+    with transaction.atomic():
+        rows = list(
+            queryset.exclude(category=category)
+            .select_for_update()
+            .values_list('id', 'category_id', 'is_active')
+        )
+        if not rows:
+            return 0
+
+        Shortcut.objects.filter(pk__in=[row[0] for row in rows]).update(
+            category=category,
+            updated_at=timezone.now()
+        )
+
+        moved = defaultdict(lambda: [0, 0])
+        for _, category_id, active in rows:
+            moved[category_id][0] += 1
+            moved[category_id][1] += 1 if active else 0
+        for category_id, (total, active) in moved.items():
+            adjust_category_counters(category_id, total=-total, active=-active)
+        adjust_category_counters(
+            category.pk,
+            total=len(rows),
+            active=sum(1 for _, _, active in rows if active)
+        )
+        invalidate_user_stats(category.user_id)
+
+    return len(rows)
+
+
+def get_shortcuts_by_category(user, total_shortcuts: int) -> dict:
+    """Quantidade de atalhos por nome de categoria (``None`` para os sem categoria)"""
+    by_category = dict(
+        Category.objects.filter(user=user, shortcuts_total__gt=0)
+        .values_list('name', 'shortcuts_total')
+    )
+    uncategorized = total_shortcuts - sum(by_category.values())
+    if uncategorized > 0:
+        by_category[None] = uncategorized
+    return by_category
+
+
+def reconcile_counters(fix: bool = True) -> list:
+    """
+    Recalcula os contadores a partir dos atalhos e retorna as divergências
+
+    Returns:
+        Lista de dicts com ``model``, ``id``, ``field``, ``stored`` e ``actual``
+    """
+    counts = {
+        'shortcuts_total': Count('id'),
+        'shortcuts_active': Count('id', filter=Q(is_active=True)),
+    }
+    drift = []
+
+    actual_by_user = {
+        row.pop('user_id'): row
+        for row in Shortcut.objects.values('user_id').annotate(
+            total_shortcuts_used=Sum('use_count'), **counts
+        ).order_by()
+    }
+    profiles = UserProfile.objects.values(
+        'user_id', 'shortcuts_total', 'shortcuts_active', 'total_shortcuts_used'
+    )
+    for profile in profiles.iterator():
+        actual = actual_by_user.get(profile['user_id'], {})
+        _compare('UserProfile', profile['user_id'], profile, actual, drift)
+
+    actual_by_category = {
+        row.pop('category_id'): row
+        for row in Shortcut.objects.filter(category__isnull=False)
+        .values('category_id').annotate(**counts).order_by()
+    }
+    categories = Category.objects.values('id', 'shortcuts_total', 'shortcuts_active')
+    for category in categories.iterator():
+        actual = actual_by_category.get(category['id'], {})
+        _compare('Category', category['id'], category, actual, drift)
+
+    if fix and drift:
+        with transaction.atomic():
+            for item in drift:
+                if item['model'] == 'UserProfile':
+                    UserProfile.objects.filter(user_id=item['id']).update(**{item['field']: item['actual']})
+                    invalidate_user_stats(item['id'])
+                else:
+                    Category.objects.filter(pk=item['id']).update(**{item['field']: item['actual']})
+        logger.warning(f"{len(drift)} contadores divergentes corrigidos")
+
+    return drift
+
+
+def _compare(model_name, object_id, stored, actual, drift):
+    for field, value in stored.items():
+        if field in ('user_id', 'id'):
+            continue
+        expected = actual.get(field) or 0
+        if value != expected:
+            drift.append({
+                'model': model_name,
+                'id': object_id,
+                'field': field,
+                'stored': value,
+                'actual': expected,
+            })
@@ -0,0 +1,200 @@
+"""
+Expansão em lote de gatilhos usando um autômato Aho-Corasick por usuário.
+
+O autômato é compilado a partir dos atalhos ativos do usuário e mantido em
+memória no processo. Ele só é recompilado quando a assinatura dos atalhos
+(quantidade e maior ``updated_at``) muda, de modo que o custo da expansão
+depende apenas do tamanho do texto e não da quantidade de atalhos.
+"""
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from django.db.models import Count, Max
+
+from .models import Shortcut
+
+logger = logging.getLogger(__name__)
+
+
+def _is_word_char(char: str) -> bool:
+    """Caracteres que fazem parte de um gatilho (além da barra inicial)"""
+    return char.isalnum() or char in '-_'
+
+
+class TriggerAutomaton:
+    """Autômato Aho-Corasick compilado a partir dos gatilhos de um usuário"""
+
+    def __init__(self, shortcuts):
+        self.shortcuts = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [None]
+        self._dict_link = [0]
+
+        for shortcut in shortcuts:
+            if shortcut.trigger:
+                self.shortcuts[shortcut.trigger] = shortcut
+                self._add(shortcut.trigger)
+
+        self._build_links()
+
+    def __len__(self):
+        return len(self.shortcuts)
+
+    def _add(self, trigger: str):
+        node = 0
+        for char in trigger:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._dict_link.append(0)
+                self._goto[node][char] = next_node
+            node = next_node
+        self._terminal[node] = trigger
+
+    def _build_links(self):
+        """Calcula os links de falha e de dicionário (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(char, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._dict_link[child] = (
+                    fail if self._terminal[fail] is not None else self._dict_link[fail]
+                )
+                queue.append(child)
+
+    def find_matches(self, text: str) -> list:
+        """
+        Encontra os gatilhos presentes no texto
+
+        Usa a regra "mais à esquerda, mais longo" e ignora ocorrências que não
+        estejam delimitadas (ex: ``//em`` dentro de ``//email`` ou de uma URL).
+
+        Returns:
+            Lista de tuplas (início, fim, gatilho) sem sobreposição
+        """
+        if not self.shortcuts:
+            return []
+
+        longest_at = {}
+        node = 0
+        text_length = len(text)
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+
+            end = position + 1
+            if end < text_length and _is_word_char(text[end]):
+                continue
+
+            match_node = node if self._terminal[node] is not None else self._dict_link[node]
+            while match_node:
+                trigger = self._terminal[match_node]
+                start = end - len(trigger)
+                if start == 0 or not (_is_word_char(text[start - 1]) or text[start - 1] in '/:'):
+                    current = longest_at.get(start)
+                    if current is None or len(trigger) > len(current[0]):
+                        longest_at[start] = (trigger, end)
+                match_node = self._dict_link[match_node]
+
+        matches = []
+        cursor = 0
+        for start in sorted(longest_at):
+            if start < cursor:
+                continue
+            trigger, end = longest_at[start]
+            matches.append((start, end, trigger))
+            cursor = end
+        return matches
+
+    def expand(self, text: str) -> dict:
+        """Substitui todos os gatilhos do texto pelo conteúdo processado"""
+        parts = []
+        matches = []
+        rendered = {}
+        cursor = 0
+
+        for start, end, trigger in self.find_matches(text):
+            shortcut = self.shortcuts[trigger]
+            if trigger not in rendered:
+                rendered[trigger] = shortcut.get_processed_content()
+            parts.append(text[cursor:start])
+            parts.append(rendered[trigger])
+            cursor = end
+            matches.append({
+                'shortcut_id': shortcut.id,
+                'trigger': trigger,
+                'start': start,
+                'end': end,
+            })
+
+        parts.append(text[cursor:])
+        return {'text': ''.join(parts), 'matches': matches}
+
+
+class TriggerAutomatonCache:
+    """Cache LRU em processo dos autômatos compilados por usuário"""
+
+    def __init__(self, max_users: int = 256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_signature(user) -> tuple:
+        """Assinatura que muda sempre que um atalho do usuário é criado, alterado ou removido"""
+        data = Shortcut.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            last_update=Max('updated_at')
+        )
+        return data['total'], data['last_update']
+
+    def get(self, user) -> TriggerAutomaton:
+        """Retorna o autômato do usuário, recompilando apenas se necessário"""
+        signature = self.get_signature(user)
+
+        with self._lock:
+            entry = self._entries.get(user.pk)
+            if entry and entry[0] == signature:
+                self._entries.move_to_end(user.pk)
+                return entry[1]
+
+        shortcuts = Shortcut.objects.filter(user=user, is_active=True).select_related('user')
+        automaton = TriggerAutomaton(shortcuts)
+        logger.debug(f"Autômato de gatilhos recompilado para usuário {user.pk} ({len(automaton)} gatilhos)")
+
+        with self._lock:
+            self._entries[user.pk] = (signature, automaton)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        return automaton
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+automaton_cache = TriggerAutomatonCache()
+
+
+def expand_text_for_user(user, text: str) -> dict:
+    """Expande todos os gatilhos de um texto usando os atalhos do usuário"""
+    return automaton_cache.get(user).expand(text)
+
+
+def expand_texts_for_user(user, texts) -> list:
+    """Expande vários textos com o mesmo autômato (uma verificação de assinatura por lote)"""
+    automaton = automaton_cache.get(user)
+    return [automaton.expand(text) for text in texts]
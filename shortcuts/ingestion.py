@@ -0,0 +1,175 @@
+"""
+Ingestão em lote dos eventos de uso de atalhos.
+
+O endpoint ``use`` apenas enfileira o evento em um buffer em memória do
+processo. Uma thread em segundo plano descarrega o buffer a cada poucos
+segundos (ou quando ele enche): os registros de ``ShortcutUsage`` são
+inseridos com ``bulk_create`` e os contadores recebem um único
+``UPDATE ... SET use_count = use_count + n`` por atalho, o que é atômico no
+banco e não perde incrementos entre requisições ou workers concorrentes. Os
+totais diários (``shortcuts.rollups``) são atualizados na mesma transação.
+
+O buffer (``core.buffers.BatchBuffer``) é limitado
+(``SHORTCUT_USAGE_QUEUE_SIZE``): com o banco fora do ar os eventos novos são
+descartados e contados em ``dropped`` em vez de acumularem na memória do
+worker.
+"""
+import atexit
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.buffers import BatchBuffer
+
+from .counters import usage_recorded
+from .models import Shortcut, ShortcutUsage
+from .rollups import add_daily_usage
+
+CONTEXT_MAX_LENGTH = ShortcutUsage._meta.get_field('context').max_length
+
+
+class UsageEvent(NamedTuple):
+    """Uso de um atalho ainda não persistido"""
+    shortcut_id: int
+    user_id: int
+    used_at: object
+    context: str = ''
+
+
+def apply_usage_events(events) -> int:
+    """
+    Persiste eventos de uso em lote
+
+    Insere todos os ``ShortcutUsage`` com ``bulk_create`` e aplica um
+    ``UPDATE`` com ``F('use_count') + n`` por atalho. Eventos de atalhos que
+    já foram excluídos são descartados.
+
+    Returns:
+        Quantidade de eventos gravados
+    """
+    events = list(events)
+    if not events:
+        return 0
+
+    existing = set(
+        Shortcut.objects.filter(
+            pk__in={event.shortcut_id for event in events}
+        ).values_list('pk', flat=True)
+    )
+    return _write_usage_events([event for event in events if event.shortcut_id in existing])
+
+
+def _write_usage_events(events) -> int:
+    if not events:
+        return 0
+
+    deltas = defaultdict(lambda: [0, None])
+    uses_by_user = defaultdict(int)
+    daily = defaultdict(int)
+    for event in events:
+        uses_by_user[event.user_id] += 1
+        daily[(event.shortcut_id, event.user_id, timezone.localtime(event.used_at).date())] += 1
+        delta = deltas[event.shortcut_id]
+        delta[0] += 1
+        if delta[1] is None or event.used_at > delta[1]:
+            delta[1] = event.used_at
+
+    with transaction.atomic():
+        ShortcutUsage.objects.bulk_create(
+            [
+                ShortcutUsage(
+                    shortcut_id=event.shortcut_id,
+                    user_id=event.user_id,
+                    used_at=event.used_at,
+                    context=(event.context or '')[:CONTEXT_MAX_LENGTH],
+                )
+                for event in events
+            ],
+            batch_size=500
+        )
+        for shortcut_id, (count, last_used) in deltas.items():
+            Shortcut.objects.filter(pk=shortcut_id).update(
+                use_count=F('use_count') + count,
+                last_used=Greatest(Coalesce('last_used', Value(last_used)), Value(last_used))
+            )
+        add_daily_usage(daily)
+        usage_recorded(uses_by_user)
+
+    return len(events)
+
+
+class UsageBuffer(BatchBuffer):
+    """Buffer limitado em processo dos eventos de uso, descarregado por uma thread em segundo plano"""
+
+    thread_name = 'shortcut-usage-flusher'
+    label = 'eventos de uso'
+
+    def write(self, batch: list) -> int:
+        return apply_usage_events(batch)
+
+
+usage_buffer = UsageBuffer(
+    flush_interval=getattr(settings, 'SHORTCUT_USAGE_FLUSH_INTERVAL', 2.0),
+    batch_size=getattr(settings, 'SHORTCUT_USAGE_BUFFER_SIZE', 500),
+    max_size=getattr(settings, 'SHORTCUT_USAGE_QUEUE_SIZE', 10000),
+)
+
+atexit.register(usage_buffer.flush)
+
+
+def record_usage(shortcut, user, context: str = '', used_at=None):
+    """
+    Registra o uso de um atalho
+
+    Com ``SHORTCUT_USAGE_BUFFERED`` ativo o evento é apenas enfileirado;
+    caso contrário é gravado imediatamente (útil em testes e scripts).
+    """
+    event = UsageEvent(shortcut.pk, user.pk, used_at or timezone.now(), context or '')
+    if getattr(settings, 'SHORTCUT_USAGE_BUFFERED', True):
+        usage_buffer.add(event)
+    else:
+        apply_usage_events([event])
+    return event
+
+
+def record_usage_batch(user, items) -> dict:
+    """
+    Registra de uma vez vários usos enviados pelo cliente (ex: fila offline da extensão)
+
+    A posse dos atalhos é validada com uma única consulta; usos de atalhos
+    inexistentes ou de outro usuário são devolvidos em ``rejected``.
+
+    Args:
+        items: Lista de dicts com ``shortcut_id`` e, opcionalmente, ``used_at`` e ``context``
+    """
+    now = timezone.now()
+    owned = set(
+        Shortcut.objects.filter(
+            user=user,
+            pk__in={item['shortcut_id'] for item in items}
+        ).values_list('pk', flat=True)
+    )
+
+    events = []
+    rejected = set()
+    for item in items:
+        if item['shortcut_id'] not in owned:
+            rejected.add(item['shortcut_id'])
+            continue
+        used_at = item.get('used_at') or now
+        events.append(UsageEvent(
+            item['shortcut_id'],
+            user.pk,
+            min(used_at, now),
+            item.get('context') or ''
+        ))
+
+    return {
+        'recorded': _write_usage_events(events),
+        'rejected': sorted(rejected),
+    }
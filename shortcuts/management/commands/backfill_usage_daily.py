@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from shortcuts.rollups import backfill_usage_daily, usage_history_start, window_start
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os totais diários de uso (ShortcutUsageDaily) a partir do histórico de usos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Apenas este usuário (username)')
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Apenas os últimos N dias (padrão: todo o histórico ainda não apagado pela retenção)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Linhas gravadas por lote',
+        )
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            try:
+                user_id = User.objects.get(username=options['user']).pk
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário '{options['user']}' não encontrado")
+
+        since = None
+        if options['days']:
+            since = window_start(options['days'])
+
+        start = usage_history_start()
+        if start is None:
+            self.stdout.write('⏭️  Nenhum uso registrado: os totais diários foram mantidos')
+            return
+        if since is None or since < start:
+            self.stdout.write(f'ℹ️  Histórico bruto completo a partir de {start:%Y-%m-%d}; os dias anteriores são mantidos')
+
+        self.stdout.write('📊 Recalculando totais diários de uso...')
+        written = backfill_usage_daily(user_id=user_id, since=since, batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'✅ {written} totais diários gravados'))
@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from shortcuts.ai_cache import ai_response_cache
+from shortcuts.services import AIService, AIServiceError
+
+WORDS = [
+    'email', 'proposta', 'orcamento', 'reuniao', 'cliente', 'suporte', 'fatura',
+    'contrato', 'agradecimento', 'cobranca', 'entrega', 'pedido', 'relatorio',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mede latência, rejeições e acertos de cache das expansões por IA (use com AI_BACKEND=fake)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', help='Backend a usar (padrão: AI_BACKEND)')
+        parser.add_argument('--requests', type=int, default=200, help='Quantidade de expansões')
+        parser.add_argument('--concurrency', type=int, default=16, help='Expansões simultâneas')
+        parser.add_argument(
+            '--distinct', type=int, default=50,
+            help='Textos distintos (repetições exercitam o cache)',
+        )
+
+    def handle(self, *args, **options):
+        if options['backend']:
+            with override_settings(AI_BACKEND=options['backend']):
+                self.run(options)
+        else:
+            self.run(options)
+
+    def run(self, options):
+        random.seed(42)
+        texts = [
+            f'{random.choice(WORDS)} {random.choice(WORDS)} {number}'
+            for number in range(max(1, options['distinct']))
+        ]
+        ai_service = AIService()
+        self.stdout.write(
+            f"🤖 Backend {ai_service.backend.name} ({ai_service.model_name}): "
+            f"{options['requests']} expansões, {options['concurrency']} simultâneas"
+        )
+        cache_before = ai_response_cache.stats()
+
+        def enhance(_):
+            start = time.perf_counter()
+            try:
+                _, from_cache = ai_service.enhance_text_cached(random.choice(texts), raise_errors=True)
+                outcome = 'cache' if from_cache else 'ok'
+            except AIServiceError as e:
+                outcome = type(e).__name__
+            return outcome, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+            results = list(executor.map(enhance, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        timings = sorted(timing for outcome, timing in results if outcome in ('ok', 'cache'))
+
+        self.stdout.write(f"Tempo total: {elapsed:.2f}s ({len(results) / elapsed:.1f} expansões/s)")
+        for outcome, count in outcomes.most_common():
+            self.stdout.write(f"  {outcome}: {count}")
+        if timings:
+            for name, value in (
+                ('p50', statistics.median(timings)),
+                ('p95', timings[max(0, int(len(timings) * 0.95) - 1)]),
+                ('p99', timings[max(0, int(len(timings) * 0.99) - 1)]),
+                ('max', timings[-1]),
+            ):
+                self.stdout.write(f"{name}: {value:.1f} ms")
+
+        cache_after = ai_response_cache.stats()
+        hits = sum(cache_after[key] - cache_before[key] for key in ('local_hits', 'shared_hits'))
+        self.stdout.write(f"Acertos de cache: {hits}")
+        self.stdout.write(f"Cliente: {ai_service.backend.stats()}")
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído'))
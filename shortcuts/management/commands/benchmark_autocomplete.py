@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from shortcuts.autocomplete import autocomplete, index_cache, invalidate_user_index
+from shortcuts.models import Category, Shortcut
+
+WORDS = [
+    'email', 'proposta', 'orcamento', 'reuniao', 'cliente', 'suporte', 'fatura',
+    'contrato', 'agradecimento', 'boasvindas', 'cobranca', 'entrega', 'pedido',
+    'assinatura', 'relatorio', 'feedback', 'convite', 'lembrete', 'resposta', 'visita',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência do autocomplete com um usuário de teste com muitos atalhos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shortcuts', type=int, default=10000, help='Quantidade de atalhos do usuário de teste')
+        parser.add_argument('--categories', type=int, default=50, help='Quantidade de categorias')
+        parser.add_argument('--queries', type=int, default=2000, help='Quantidade de consultas medidas')
+        parser.add_argument('--threshold-ms', type=float, default=5.0, help='Limite aceitável para o p99 (ms)')
+        parser.add_argument('--keep', action='store_true', help='Mantém os dados gerados no banco')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+
+        with transaction.atomic():
+            user = self.seed(options['shortcuts'], options['categories'])
+            results = self.measure(user, options['queries'])
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        index_cache.clear()
+
+        self.stdout.write(f"Índice compilado em {results['build_ms']:.1f} ms")
+        for name in ('p50', 'p95', 'p99', 'max'):
+            self.stdout.write(f"{name}: {results[name]:.3f} ms")
+
+        if results['p99'] > options['threshold_ms']:
+            raise CommandError(
+                f"p99 de {results['p99']:.3f} ms acima do limite de {options['threshold_ms']} ms"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Latência dentro do limite'))
+
+    def seed(self, shortcut_count, category_count):
+        """Cria o usuário de teste com atalhos e categorias"""
+        user = User.objects.create_user(username=f'autocomplete_benchmark_{int(time.time())}')
+
+        categories = Category.objects.bulk_create([
+            Category(user=user, name=f'{random.choice(WORDS).title()} {number}')
+            for number in range(category_count)
+        ])
+
+        shortcuts = []
+        for number in range(shortcut_count):
+            first, second = random.sample(WORDS, 2)
+            shortcuts.append(Shortcut(
+                user=user,
+                trigger=f'//{first}-{second}-{number}',
+                title=f'{first.title()} de {second} {number}',
+                content=f'Texto de {first} sobre {second}. ' * 5,
+                category=random.choice(categories) if categories else None,
+            ))
+        Shortcut.objects.bulk_create(shortcuts, batch_size=1000)
+
+        # bulk_create não dispara sinais
+        invalidate_user_index(user.pk)
+        self.stdout.write(f"Usuário de teste criado com {shortcut_count} atalhos e {category_count} categorias")
+        return user
+
+    def measure(self, user, query_count):
+        start = time.perf_counter()
+        autocomplete(user, 'warmup')
+        build_ms = (time.perf_counter() - start) * 1000
+
+        queries = []
+        for _ in range(query_count):
+            word = random.choice(WORDS)
+            size = random.randint(2, len(word))
+            if random.random() < 0.5:
+                queries.append(word[:size])
+            else:
+                offset = random.randint(0, len(word) - 2)
+                queries.append(word[offset:offset + size])
+
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            autocomplete(user, query, 5, 'shortcut')
+            autocomplete(user, query, 5, 'category')
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        return {
+            'build_ms': build_ms,
+            'p50': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95) - 1],
+            'p99': timings[int(len(timings) * 0.99) - 1],
+            'max': timings[-1],
+        }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from shortcuts.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de atalhos por usuário e categoria e reporta divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas reporta as divergências, sem corrigir',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drift = reconcile_counters(fix=not dry_run)
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('✅ Nenhuma divergência encontrada'))
+            return
+
+        for item in drift:
+            self.stdout.write(
+                f"{item['model']} #{item['id']} {item['field']}: "
+                f"armazenado={item['stored']} real={item['actual']} "
+                f"(diferença {item['stored'] - item['actual']:+d})"
+            )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(drift)} divergências encontradas (nada foi alterado)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(drift)} divergências corrigidas'))
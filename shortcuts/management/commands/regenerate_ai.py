@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from shortcuts.ai_bulk import regenerate_shortcuts
+from shortcuts.models import Shortcut
+
+
+class Command(BaseCommand):
+    help = 'Regenera com IA o conteúdo expandido dos atalhos ai_enhanced de um usuário'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Usuário dono dos atalhos')
+        parser.add_argument(
+            '--category',
+            type=int,
+            help='Apenas atalhos desta categoria (id)',
+        )
+        parser.add_argument(
+            '--ids',
+            type=int,
+            nargs='+',
+            help='Apenas os atalhos com estes ids',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Chamadas simultâneas à IA (padrão: AI_BULK_MAX_WORKERS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Atalhos gravados por lote',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['username']}' não encontrado")
+
+        shortcuts = Shortcut.objects.filter(user=user, expansion_type='ai_enhanced').order_by('id')
+        if options['category']:
+            shortcuts = shortcuts.filter(category_id=options['category'])
+        if options['ids']:
+            shortcuts = shortcuts.filter(id__in=options['ids'])
+
+        shortcuts = list(shortcuts)
+        self.stdout.write(f'🤖 Regenerando {len(shortcuts)} atalhos de {user.username}...')
+
+        totals = {'regenerated': 0, 'failed': 0, 'skipped_quota': 0}
+        batch_size = max(1, options['batch_size'])
+        for start in range(0, len(shortcuts), batch_size):
+            summary = regenerate_shortcuts(user, shortcuts[start:start + batch_size], options['workers'])
+            for key in totals:
+                totals[key] += summary[key]
+            for error in summary['errors']:
+                self.stderr.write(self.style.ERROR(f"❌ Atalho #{error['shortcut_id']}: {error['error']}"))
+            self.stdout.write(f"  {min(start + batch_size, len(shortcuts))}/{len(shortcuts)} processados")
+
+            if summary['skipped_quota']:
+                # Sem cota, os lotes seguintes também seriam ignorados
+                totals['skipped_quota'] += max(0, len(shortcuts) - (start + batch_size))
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totals['regenerated']} regenerados, {totals['failed']} falhas, "
+            f"{totals['skipped_quota']} sem cota"
+        ))
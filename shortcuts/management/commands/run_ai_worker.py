@@ -0,0 +1,90 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from shortcuts.ai_jobs import claim_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de expansões por IA (AIJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=getattr(settings, 'AI_WORKER_CONCURRENCY', 2),
+            help='Quantidade de tarefas processadas em paralelo',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'AI_WORKER_POLL_INTERVAL', 2.0),
+            help='Intervalo (s) entre consultas à fila quando ela está vazia',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa as tarefas prontas e encerra',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+
+        self.stdout.write(f'🤖 Worker de IA {worker_id} iniciado (concorrência {concurrency})')
+        processed = 0
+        running = set()
+        last_stale_check = 0.0
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-worker') as executor:
+            try:
+                while not self._stopping:
+                    close_old_connections()
+
+                    if time.monotonic() - last_stale_check > 60:
+                        requeue_stale_jobs()
+                        last_stale_check = time.monotonic()
+
+                    jobs = claim_jobs(worker_id, concurrency - len(running))
+                    for job in jobs:
+                        running.add(executor.submit(self._process, job))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self._stopping = True
+
+            if running:
+                self.stdout.write(f'⏳ Aguardando {len(running)} tarefas em andamento...')
+                processed += len(wait(running).done)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Worker encerrado ({processed} tarefas processadas)'))
+
+    def _process(self, job):
+        try:
+            job = run_job(job)
+            self.stdout.write(f'Tarefa #{job.pk}: {job.status}')
+        except Exception as e:
+            # A tarefa continua em execução e é devolvida à fila por requeue_stale_jobs
+            self.stderr.write(self.style.ERROR(f'❌ Erro inesperado na tarefa #{job.pk}: {e}'))
+        finally:
+            connection.close()
+
+    def _stop(self, signum, frame):
+        self._stopping = True
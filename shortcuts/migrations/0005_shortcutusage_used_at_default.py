@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0004_sync_tombstone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shortcutusage',
+            name='used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,104 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+POSTGRES_FORWARD = [
+    'ALTER TABLE shortcuts_shortcut ADD COLUMN search_vector tsvector',
+    """
+    CREATE FUNCTION shortcuts_shortcut_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW."trigger", '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.content, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER shortcuts_shortcut_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF "trigger", title, content ON shortcuts_shortcut
+    FOR EACH ROW EXECUTE FUNCTION shortcuts_shortcut_search_vector_update()
+    """,
+    'UPDATE shortcuts_shortcut SET title = title',
+    'CREATE INDEX shortcuts_shortcut_search_vector_gin ON shortcuts_shortcut USING GIN (search_vector)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP TRIGGER IF EXISTS shortcuts_shortcut_search_vector_trigger ON shortcuts_shortcut',
+    'DROP FUNCTION IF EXISTS shortcuts_shortcut_search_vector_update()',
+    'ALTER TABLE shortcuts_shortcut DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE shortcuts_shortcut_fts USING fts5(
+        "trigger", title, content,
+        content='shortcuts_shortcut', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER shortcuts_shortcut_fts_insert AFTER INSERT ON shortcuts_shortcut BEGIN
+        INSERT INTO shortcuts_shortcut_fts(rowid, "trigger", title, content)
+        VALUES (new.id, new."trigger", new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER shortcuts_shortcut_fts_delete AFTER DELETE ON shortcuts_shortcut BEGIN
+        INSERT INTO shortcuts_shortcut_fts(shortcuts_shortcut_fts, rowid, "trigger", title, content)
+        VALUES ('delete', old.id, old."trigger", old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER shortcuts_shortcut_fts_update AFTER UPDATE OF "trigger", title, content ON shortcuts_shortcut BEGIN
+        INSERT INTO shortcuts_shortcut_fts(shortcuts_shortcut_fts, rowid, "trigger", title, content)
+        VALUES ('delete', old.id, old."trigger", old.title, old.content);
+        INSERT INTO shortcuts_shortcut_fts(rowid, "trigger", title, content)
+        VALUES (new.id, new."trigger", new.title, new.content);
+    END
+    """,
+    "INSERT INTO shortcuts_shortcut_fts(shortcuts_shortcut_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS shortcuts_shortcut_fts_insert',
+    'DROP TRIGGER IF EXISTS shortcuts_shortcut_fts_delete',
+    'DROP TRIGGER IF EXISTS shortcuts_shortcut_fts_update',
+    'DROP TABLE IF EXISTS shortcuts_shortcut_fts',
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        try:
+            _execute(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite compilado sem FTS5: a busca usa icontains
+            _execute(schema_editor, SQLITE_REVERSE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0005_shortcutusage_used_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
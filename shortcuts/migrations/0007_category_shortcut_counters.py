@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_counters(apps, schema_editor):
+    Category = apps.get_model('shortcuts', 'Category')
+    Shortcut = apps.get_model('shortcuts', 'Shortcut')
+    UserProfile = apps.get_model('users', 'UserProfile')
+
+    counts = {'total': Count('id'), 'active': Count('id', filter=Q(is_active=True))}
+
+    rows = Shortcut.objects.filter(category__isnull=False).values('category_id').annotate(**counts)
+    for row in rows:
+        Category.objects.filter(pk=row['category_id']).update(
+            shortcuts_total=row['total'],
+            shortcuts_active=row['active']
+        )
+
+    # Perfis sem atalhos também saem do zero (total_shortcuts_used podia estar desatualizado)
+    UserProfile.objects.update(shortcuts_total=0, shortcuts_active=0, total_shortcuts_used=0)
+    rows = Shortcut.objects.values('user_id').annotate(uses=Sum('use_count'), **counts)
+    for row in rows:
+        UserProfile.objects.filter(user_id=row['user_id']).update(
+            shortcuts_total=row['total'],
+            shortcuts_active=row['active'],
+            total_shortcuts_used=row['uses'] or 0
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0006_shortcut_search_index'),
+        ('users', '0008_profile_shortcut_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='shortcuts_active',
+            field=models.IntegerField(default=0, verbose_name='Atalhos Ativos'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='shortcuts_total',
+            field=models.IntegerField(default=0, verbose_name='Total de Atalhos'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0007_category_shortcut_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aienhancementlog',
+            name='attempt',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Tentativa'),
+        ),
+        migrations.AddField(
+            model_name='aienhancementlog',
+            name='error_message',
+            field=models.TextField(blank=True, verbose_name='Erro'),
+        ),
+        migrations.AddField(
+            model_name='aienhancementlog',
+            name='status',
+            field=models.CharField(choices=[('success', 'Sucesso'), ('retry', 'Nova Tentativa Agendada'), ('dead_letter', 'Descartado')], default='success', max_length=20, verbose_name='Status'),
+        ),
+        migrations.CreateModel(
+            name='AIJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em Execução'), ('succeeded', 'Concluída'), ('failed', 'Falhou'), ('dead', 'Descartada')], default='pending', max_length=20, verbose_name='Status')),
+                ('bypass_cache', models.BooleanField(default=False, verbose_name='Ignorar Cache')),
+                ('original_content', models.TextField(verbose_name='Conteúdo Original')),
+                ('result', models.TextField(blank=True, verbose_name='Resultado')),
+                ('error_message', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de Tentativas')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar Após')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('shortcut', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_jobs', to='shortcuts.shortcut')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa de IA',
+                'verbose_name_plural': 'Tarefas de IA',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aienhancementlog',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='logs', to='shortcuts.aijob'),
+        ),
+        migrations.AddIndex(
+            model_name='aijob',
+            index=models.Index(fields=['status', 'run_after'], name='shortcuts_a_status_d12af9_idx'),
+        ),
+    ]
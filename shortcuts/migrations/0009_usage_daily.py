@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0008_ai_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortcutUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Usos')),
+                ('shortcut', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='shortcuts.shortcut')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shortcut_usage_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Uso Diário de Atalho',
+                'verbose_name_plural': 'Usos Diários de Atalhos',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', 'date'], name='usage_daily_user_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shortcut', 'date'), name='unique_shortcut_usage_daily')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+SEARCH_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION shortcuts_shortcut_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', {normalize}(coalesce(NEW."trigger", ''))), 'A') ||
+            setweight(to_tsvector('simple', {normalize}(coalesce(NEW.title, ''))), 'B') ||
+            setweight(to_tsvector('simple', {normalize}(coalesce(NEW.content, ''))), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+# Gatilho, título e conteúdo indexados sem acentos; a busca aplica unaccent ao tsquery
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    SEARCH_VECTOR_FUNCTION.format(normalize='unaccent'),
+    'UPDATE shortcuts_shortcut SET title = title',
+]
+
+POSTGRES_REVERSE = [
+    SEARCH_VECTOR_FUNCTION.format(normalize=''),
+    'UPDATE shortcuts_shortcut SET title = title',
+]
+
+
+def _execute(schema_editor, statements):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def add_unaccent(apps, schema_editor):
+    _execute(schema_editor, POSTGRES_FORWARD)
+
+
+def remove_unaccent(apps, schema_editor):
+    _execute(schema_editor, POSTGRES_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0009_usage_daily'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_unaccent, remove_unaccent),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+BATCH_SIZE = 1000
+
+
+def backfill_usage_daily(apps, schema_editor):
+    ShortcutUsage = apps.get_model('shortcuts', 'ShortcutUsage')
+    ShortcutUsageDaily = apps.get_model('shortcuts', 'ShortcutUsageDaily')
+
+    # Com totais já gravados (ingestão ou comando backfill_usage_daily) o recálculo fica para o comando
+    if ShortcutUsageDaily.objects.exists():
+        return
+
+    rows = (
+        ShortcutUsage.objects.annotate(day=TruncDate('used_at'))
+        .values('shortcut_id', 'user_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(ShortcutUsageDaily(
+            shortcut_id=row['shortcut_id'], user_id=row['user_id'], date=row['day'], count=row['total']
+        ))
+        if len(batch) >= BATCH_SIZE:
+            ShortcutUsageDaily.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ShortcutUsageDaily.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortcuts', '0010_shortcut_search_unaccent'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_usage_daily, migrations.RunPython.noop),
+    ]
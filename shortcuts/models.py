@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.utils import timezone
 
+from .templating import render_shortcut
+
 
 class Category(models.Model):
     """Categoria para organizar os atalhos"""
@@ -9,6 +13,8 @@ class Category(models.Model):
     description = models.TextField(blank=True, verbose_name="Descrição")
     color = models.CharField(max_length=7, default="#007bff", verbose_name="Cor")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
+    shortcuts_total = models.IntegerField(default=0, verbose_name="Total de Atalhos")
+    shortcuts_active = models.IntegerField(default=0, verbose_name="Atalhos Ativos")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -109,27 +115,29 @@ class Shortcut(models.Model):
 
     def increment_usage(self):
         """Incrementa o contador de uso e atualiza último uso"""
+        now = timezone.now()
+        Shortcut.objects.filter(pk=self.pk).update(
+            use_count=models.F('use_count') + 1,
+            last_used=now
+        )
         self.use_count += 1
-        self.last_used = timezone.now()
-        self.save(update_fields=['use_count', 'last_used'])
+        self.last_used = now
+
+        from .counters import adjust_user_counters
+        adjust_user_counters(self.user_id, uses=1)
 
     def get_processed_content(self):
         """Retorna o conteúdo processado baseado no tipo de expansão"""
         if self.expansion_type == 'ai_enhanced' and self.expanded_content:
             return self.expanded_content
         elif self.expansion_type == 'dynamic':
-            # Aqui seria implementada a lógica de substituição de variáveis
             return self.process_dynamic_content()
         else:
             return self.content
 
-    def process_dynamic_content(self):
-        """Processa conteúdo dinâmico substituindo variáveis"""
-        content = self.content
-        for key, value in self.variables.items():
-            placeholder = f"{{{key}}}"
-            content = content.replace(placeholder, str(value))
-        return content
+    def process_dynamic_content(self, extra_variables=None):
+        """Processa conteúdo dinâmico substituindo variáveis (template pré-compilado)"""
+        return render_shortcut(self, extra_variables)
 
 
 class ShortcutUsage(models.Model):
@@ -140,7 +148,7 @@ class ShortcutUsage(models.Model):
         related_name="usage_history"
     )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    used_at = models.DateTimeField(auto_now_add=True)
+    used_at = models.DateTimeField(default=timezone.now)
     context = models.CharField(
         max_length=200,
         blank=True,
@@ -157,17 +165,65 @@ class ShortcutUsage(models.Model):
         return f"{self.shortcut.trigger} usado em {self.used_at}"
 
 
+class ShortcutUsageDaily(models.Model):
+    """Total diário de usos por atalho (consolidado a partir do ShortcutUsage)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='shortcut_usage_daily')
+    shortcut = models.ForeignKey(
+        Shortcut,
+        on_delete=models.CASCADE,
+        related_name="daily_usage"
+    )
+    date = models.DateField(verbose_name="Data")
+    count = models.PositiveIntegerField(default=0, verbose_name="Usos")
+
+    class Meta:
+        verbose_name = "Uso Diário de Atalho"
+        verbose_name_plural = "Usos Diários de Atalhos"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['shortcut', 'date'], name='unique_shortcut_usage_daily'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date'], name='usage_daily_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.shortcut.trigger} em {self.date}: {self.count}"
+
+
 class AIEnhancementLog(models.Model):
     """Log das expansões feitas pela IA"""
+
+    STATUS_CHOICES = [
+        ('success', 'Sucesso'),
+        ('retry', 'Nova Tentativa Agendada'),
+        ('dead_letter', 'Descartado'),
+    ]
+
     shortcut = models.ForeignKey(
         Shortcut,
         on_delete=models.CASCADE,
         related_name="ai_logs"
     )
+    job = models.ForeignKey(
+        'AIJob',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="logs"
+    )
     original_content = models.TextField(verbose_name="Conteúdo Original")
     enhanced_content = models.TextField(verbose_name="Conteúdo Expandido")
     ai_model_used = models.CharField(max_length=100, verbose_name="Modelo IA Usado")
     processing_time = models.FloatField(verbose_name="Tempo de Processamento (s)")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='success',
+        verbose_name="Status"
+    )
+    attempt = models.PositiveSmallIntegerField(default=1, verbose_name="Tentativa")
+    error_message = models.TextField(blank=True, verbose_name="Erro")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -177,3 +233,165 @@ class AIEnhancementLog(models.Model):
 
     def __str__(self):
         return f"IA Log para {self.shortcut.trigger} em {self.created_at}"
+
+
+class AIJob(models.Model):
+    """Tarefa de expansão por IA processada em segundo plano pelo run_ai_worker"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('running', 'Em Execução'),
+        ('succeeded', 'Concluída'),
+        ('failed', 'Falhou'),
+        ('dead', 'Descartada'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="ai_jobs"
+    )
+    shortcut = models.ForeignKey(
+        Shortcut,
+        on_delete=models.CASCADE,
+        related_name="ai_jobs"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name="Status"
+    )
+    bypass_cache = models.BooleanField(default=False, verbose_name="Ignorar Cache")
+    original_content = models.TextField(verbose_name="Conteúdo Original")
+    result = models.TextField(blank=True, verbose_name="Resultado")
+    error_message = models.TextField(blank=True, verbose_name="Último Erro")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Máximo de Tentativas")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Executar Após")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tarefa de IA"
+        verbose_name_plural = "Tarefas de IA"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"Tarefa IA #{self.pk} ({self.status}) para {self.shortcut.trigger}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed', 'dead')
+
+
+class SyncTombstone(models.Model):
+    """Registro de exclusões usado na sincronização incremental da extensão"""
+
+    OBJECT_TYPES = [
+        ('shortcut', 'Atalho'),
+        ('category', 'Categoria'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="sync_tombstones"
+    )
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Registro de Exclusão"
+        verbose_name_plural = "Registros de Exclusão"
+        ordering = ['-deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.object_type} #{self.object_id} excluído em {self.deleted_at}"
+
+
+def _is_user_deletion(origin):
+    """Verifica se a exclusão foi disparada pela remoção do próprio usuário"""
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+@receiver(post_delete, sender=Shortcut)
+def record_shortcut_tombstone(sender, instance, origin=None, **kwargs):
+    """Registra a exclusão de um atalho para a sincronização incremental"""
+    if not _is_user_deletion(origin):
+        SyncTombstone.objects.create(
+            user_id=instance.user_id,
+            object_type='shortcut',
+            object_id=instance.pk
+        )
+
+
+@receiver(post_delete, sender=Category)
+def record_category_tombstone(sender, instance, origin=None, **kwargs):
+    """Registra a exclusão de uma categoria para a sincronização incremental"""
+    if not _is_user_deletion(origin):
+        SyncTombstone.objects.create(
+            user_id=instance.user_id,
+            object_type='category',
+            object_id=instance.pk
+        )
+
+
+@receiver([post_save, post_delete], sender=Shortcut)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_autocomplete_index(sender, instance, signal=None, **kwargs):
+    """Invalida os índices de autocomplete e de gatilhos do dono do atalho/categoria"""
+    if sender is Shortcut:
+        from .triggers import record_trigger_change
+        record_trigger_change(instance, deleted=signal is post_delete)
+        return
+
+    from .autocomplete import invalidate_user_index
+    invalidate_user_index(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Shortcut)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=ShortcutUsage)
+def invalidate_user_stats_snapshot(sender, instance, **kwargs):
+    """Descarta o snapshot de estatísticas do dono do registro"""
+    from users.stats import invalidate_user_stats
+    invalidate_user_stats(instance.user_id)
+
+
+@receiver(pre_save, sender=Shortcut)
+def remember_shortcut_counter_state(sender, instance, update_fields=None, **kwargs):
+    """Guarda o estado anterior (ativo/categoria) para calcular os deltas dos contadores"""
+    instance._counter_previous = None
+    if instance.pk is None or instance._state.adding:
+        return
+    if update_fields is not None and not {'is_active', 'category'} & set(update_fields):
+        return
+    instance._counter_previous = Shortcut.objects.filter(pk=instance.pk).values_list(
+        'is_active', 'category_id'
+    ).first()
+
+
+@receiver(post_save, sender=Shortcut)
+def update_counters_on_shortcut_save(sender, instance, created, **kwargs):
+    """Atualiza os contadores do usuário e da categoria"""
+    from .counters import shortcut_saved
+    shortcut_saved(instance, created, getattr(instance, '_counter_previous', None))
+
+
+@receiver(post_delete, sender=Shortcut)
+def update_counters_on_shortcut_delete(sender, instance, origin=None, **kwargs):
+    """Atualiza os contadores do usuário e da categoria"""
+    if not _is_user_deletion(origin):
+        from .counters import shortcut_deleted
+        shortcut_deleted(instance)
@@ -0,0 +1,168 @@
+"""
+Consolidação diária dos usos de atalhos (``ShortcutUsageDaily``).
+
+A ingestão em lote soma cada descarga do buffer aos totais de
+(atalho, dia): as linhas que faltam são criadas com ``bulk_create`` e os
+totais recebem ``UPDATE ... SET count = count + n``, agrupados por valor de
+``n``. Dashboards e estatísticas leem apenas esta tabela, com uma consulta
+agrupada cada, então o custo não cresce com o histórico do usuário.
+
+``backfill_usage_daily`` (comando ``backfill_usage_daily``) recalcula os
+totais a partir do ``ShortcutUsage``, só nos dias em que o histórico bruto
+ainda está completo; a migração 0011 faz o primeiro preenchimento com o
+histórico existente.
+
+Períodos de "últimos N dias" sempre incluem hoje e começam em
+``window_start(N)``, tanto nos gráficos quanto nos rankings.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import ShortcutUsage, ShortcutUsageDaily
+
+logger = logging.getLogger(__name__)
+
+
+def add_daily_usage(deltas: dict):
+    """
+    Soma usos aos totais diários
+
+    Args:
+        deltas: Dict ``{(shortcut_id, user_id, data): usos}``
+    """
+    if not deltas:
+        return
+
+    ShortcutUsageDaily.objects.bulk_create(
+        [
+            ShortcutUsageDaily(shortcut_id=shortcut_id, user_id=user_id, date=day, count=0)
+            for shortcut_id, user_id, day in deltas
+        ],
+        ignore_conflicts=True,
+        batch_size=500
+    )
+
+    # Um UPDATE por (dia, incremento): em geral poucos valores distintos por descarga
+    groups = defaultdict(list)
+    for (shortcut_id, _, day), count in deltas.items():
+        groups[(day, count)].append(shortcut_id)
+    for (day, count), shortcut_ids in groups.items():
+        ShortcutUsageDaily.objects.filter(date=day, shortcut_id__in=shortcut_ids).update(
+            count=F('count') + count
+        )
+
+
+def usage_history_start():
+    """
+    Primeiro dia com o histórico bruto (``ShortcutUsage``) completo
+
+    A retenção (``core.retention``) apaga os usos mais antigos que o prazo da
+    política ``shortcut_usage``; o dia do corte fica incompleto. None se não
+    houver nenhum uso gravado.
+    """
+    from core.retention import get_policies
+
+    first = ShortcutUsage.objects.aggregate(first=Min('used_at'))['first']
+    if first is None:
+        return None
+    start = timezone.localdate(first)
+    keep_days = next(policy.keep_days for policy in get_policies() if policy.name == 'shortcut_usage')
+    if keep_days > 0:
+        start = max(start, timezone.localdate() - timedelta(days=keep_days - 1))
+    return start
+
+
+def backfill_usage_daily(user_id=None, since=None, batch_size: int = 1000) -> int:
+    """
+    Recalcula os totais diários a partir do ``ShortcutUsage``
+
+    ``since`` nunca vai antes de ``usage_history_start()``: os totais dos
+    dias cujos usos já foram apagados pela retenção são mantidos.
+
+    Args:
+        user_id: Apenas este usuário (padrão: todos)
+        since: Apenas a partir desta data (padrão: todo o histórico disponível)
+
+    Returns:
+        Quantidade de linhas diárias gravadas
+    """
+    start = usage_history_start()
+    if start is None:
+        return 0
+    since = max(since, start) if since is not None else start
+
+    usages = ShortcutUsage.objects.filter(used_at__date__gte=since)
+    daily = ShortcutUsageDaily.objects.filter(date__gte=since)
+    if user_id is not None:
+        usages = usages.filter(user_id=user_id)
+        daily = daily.filter(user_id=user_id)
+
+    rows = (
+        usages.annotate(day=TruncDate('used_at'))
+        .values('shortcut_id', 'user_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        daily.delete()
+        written = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(ShortcutUsageDaily(
+                shortcut_id=row['shortcut_id'], user_id=row['user_id'], date=row['day'], count=row['total']
+            ))
+            if len(batch) >= batch_size:
+                ShortcutUsageDaily.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            ShortcutUsageDaily.objects.bulk_create(batch)
+            written += len(batch)
+
+    logger.info(f"Totais diários de uso recalculados: {written} linhas")
+    return written
+
+
+def window_start(days: int):
+    """Primeiro dia dos últimos ``days`` dias, incluindo hoje (``days=1`` é só hoje)"""
+    return timezone.localdate() - timedelta(days=max(days, 1) - 1)
+
+
+def get_daily_usage(user, days: int) -> dict:
+    """Usos por dia nos últimos ``days`` dias (incluindo hoje), com zero nos dias sem uso"""
+    start = window_start(days)
+    totals = dict(
+        ShortcutUsageDaily.objects.filter(user=user, date__gte=start)
+        .values('date')
+        .annotate(total=Sum('count'))
+        .values_list('date', 'total')
+    )
+    return {start + timedelta(days=offset): totals.get(start + timedelta(days=offset), 0) for offset in range(days)}
+
+
+def get_monthly_usage(user, since) -> dict:
+    """Usos por mês (primeiro dia do mês → total) a partir de ``since``"""
+    return dict(
+        ShortcutUsageDaily.objects.filter(user=user, date__gte=since)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(total=Sum('count'))
+        .values_list('month', 'total')
+    )
+
+
+def count_shortcuts_used_since(user, since) -> int:
+    """Quantidade de atalhos distintos usados a partir da data"""
+    return (
+        ShortcutUsageDaily.objects.filter(user=user, date__gte=since)
+        .values('shortcut_id')
+        .distinct()
+        .count()
+    )
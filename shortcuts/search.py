@@ -0,0 +1,164 @@
+"""
+Busca textual dos atalhos.
+
+Cada banco usa o índice que tem disponível:
+
+- PostgreSQL: coluna ``search_vector`` (tsvector, sem acentos via
+  ``unaccent``) com índice GIN, mantida por um trigger do banco a cada
+  INSERT/UPDATE;
+- SQLite: tabela virtual FTS5 ``shortcuts_shortcut_fts`` sincronizada por
+  triggers (desenvolvimento);
+- demais casos: ``icontains`` sem índice.
+
+A consulta usa só o índice, que casa termos pelo início da palavra. O
+``icontains`` é uma segunda consulta, feita apenas quando o índice não
+encontra nada (trechos no meio de uma palavra) ou quando algum termo é
+curto demais para o prefixo (``MIN_TERM_LENGTH``).
+
+A relevância segue o peso dos campos: gatilho > título > conteúdo. O
+queryset retornado recebe a anotação ``search_rank``.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'shortcuts_shortcut'
+FTS_TABLE = 'shortcuts_shortcut_fts'
+
+# Pesos do bm25 para (gatilho, título, conteúdo)
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Termos menores que isto casariam com prefixos demais no índice
+MIN_TERM_LENGTH = 3
+
+
+def get_search_terms(query: str) -> list:
+    """Quebra a busca em termos (apenas letras, dígitos e _), sem duplicados"""
+    terms = []
+    for term in TERM_PATTERN.findall(query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:10]
+
+
+def contains_filter(query: str) -> Q:
+    """Trecho da busca em qualquer um dos campos (sem índice)"""
+    return Q(trigger__icontains=query) | Q(title__icontains=query) | Q(content__icontains=query)
+
+
+class SearchBackend:
+    """Busca simples com icontains (sem índice)"""
+
+    def index_or_contains(self, queryset, query: str, indexed):
+        """Resultados do índice; o ``icontains`` só roda se o índice não encontrar nada"""
+        if indexed.exists():
+            return indexed
+        return SearchBackend.search(self, queryset, query)
+
+    def search(self, queryset, query: str):
+        query = query.strip()
+        if not query:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        return queryset.filter(contains_filter(query)).annotate(
+            search_rank=Case(
+                When(trigger__icontains=query, then=Value(3)),
+                When(title__icontains=query, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField()
+            )
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Busca com tsvector + GIN (pesos A/B/C para gatilho/título/conteúdo)"""
+
+    def search(self, queryset, query: str):
+        terms = get_search_terms(query)
+        if not terms or min(len(term) for term in terms) < MIN_TERM_LENGTH:
+            return super().search(queryset, query)
+
+        # Os mesmos acentos removidos pelo trigger (migração 0010)
+        ts_query = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f'"{TABLE}"."search_vector" @@ to_tsquery(\'simple\', unaccent(%s))',
+            [ts_query],
+            output_field=BooleanField()
+        )
+        indexed = queryset.filter(matches).annotate(
+            search_rank=RawSQL(
+                f'ts_rank("{TABLE}"."search_vector", to_tsquery(\'simple\', unaccent(%s)))',
+                [ts_query],
+                output_field=FloatField()
+            )
+        )
+        return self.index_or_contains(queryset, query, indexed)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Busca com a tabela FTS5 (ranking bm25 ponderado)"""
+
+    def __init__(self):
+        self._available = None
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            self._available = FTS_TABLE in connection.introspection.table_names()
+            if not self._available:
+                logger.warning(f"Tabela {FTS_TABLE} não encontrada; usando busca sem índice")
+        return self._available
+
+    def search(self, queryset, query: str):
+        terms = get_search_terms(query)
+        if not terms or min(len(term) for term in terms) < MIN_TERM_LENGTH or not self.is_available():
+            return super().search(queryset, query)
+
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        matches = RawSQL(
+            f'"{TABLE}"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match],
+            output_field=BooleanField()
+        )
+        indexed = queryset.filter(matches).annotate(
+            search_rank=RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{TABLE}"."id")',
+                [match],
+                output_field=FloatField()
+            )
+        )
+        return self.index_or_contains(queryset, query, indexed)
+
+
+_backend = None
+
+
+def get_search_backend() -> SearchBackend:
+    """Retorna o backend de busca configurado (SHORTCUT_SEARCH_BACKEND) ou o adequado ao banco"""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'SHORTCUT_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = SearchBackend()
+    return _backend
+
+
+def search_shortcuts(queryset, query: str):
+    """Filtra o queryset pela busca textual, anotando ``search_rank``"""
+    return get_search_backend().search(queryset, query)
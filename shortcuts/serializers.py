@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Category, Shortcut, ShortcutUsage, AIEnhancementLog
+from .models import Category, Shortcut, ShortcutUsage, AIEnhancementLog, AIJob
+from .triggers import find_trigger_conflicts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,9 +17,7 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_shortcuts_count(self, obj):
-        if hasattr(obj, 'shortcuts_count'):
-            return obj.shortcuts_count
-        return obj.shortcuts.filter(is_active=True).count()
+        return obj.shortcuts_active
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
@@ -118,6 +118,14 @@ class ShortcutSerializer(serializers.ModelSerializer):
 
         return value.lower()
 
+    def validate_trigger_conflicts(self, trigger):
+        """Rejeita gatilhos iguais ou ambíguos (prefixo) em relação aos do usuário"""
+        user = self.context['request'].user
+        exclude_id = self.instance.pk if self.instance else None
+        for conflict in find_trigger_conflicts(user, trigger, exclude_id):
+            if conflict['blocking']:
+                raise serializers.ValidationError({'trigger': conflict['message']})
+
     def validate_category(self, value):
         """Valida se a categoria pertence ao usuário"""
         if value and value.user != self.context['request'].user:
@@ -162,10 +170,10 @@ class ShortcutCreateSerializer(ShortcutSerializer):
                 f"Limite de {user.profile.max_shortcuts} atalhos atingido"
             )
 
-        # Verifica se o gatilho já existe para este usuário
+        # Verifica colisões com os gatilhos do usuário (índice em memória)
         trigger = attrs.get('trigger')
-        if trigger and Shortcut.objects.filter(user=user, trigger=trigger).exists():
-            raise serializers.ValidationError({"trigger": "Este gatilho já existe"})
+        if trigger:
+            self.validate_trigger_conflicts(trigger)
 
         return attrs
 
@@ -179,6 +187,12 @@ class ShortcutUpdateSerializer(ShortcutSerializer):
             'is_active', 'ai_prompt', 'variables', 'url_context'
         ]
 
+    def validate(self, attrs):
+        trigger = attrs.get('trigger')
+        if trigger and trigger != self.instance.trigger:
+            self.validate_trigger_conflicts(trigger)
+        return attrs
+
 
 class ShortcutUsageSerializer(serializers.ModelSerializer):
     shortcut_trigger = serializers.CharField(source='shortcut.trigger', read_only=True)
@@ -201,11 +215,25 @@ class AIEnhancementLogSerializer(serializers.ModelSerializer):
         model = AIEnhancementLog
         fields = [
             'id', 'shortcut_trigger', 'original_content', 'enhanced_content',
-            'ai_model_used', 'processing_time', 'created_at'
+            'ai_model_used', 'processing_time', 'status', 'attempt',
+            'error_message', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
 
+class AIJobSerializer(serializers.ModelSerializer):
+    shortcut_trigger = serializers.CharField(source='shortcut.trigger', read_only=True)
+
+    class Meta:
+        model = AIJob
+        fields = [
+            'id', 'shortcut', 'shortcut_trigger', 'status', 'result',
+            'error_message', 'attempts', 'max_attempts', 'run_after',
+            'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
 class ShortcutSearchSerializer(serializers.Serializer):
     """Serializer para busca de atalhos"""
     query = serializers.CharField(max_length=200, required=False)
@@ -223,8 +251,22 @@ class ShortcutSearchSerializer(serializers.Serializer):
             'last_used', '-last_used',
             'created_at', '-created_at'
         ],
-        required=False,
-        default='-last_used'
+        required=False
+    )
+
+
+class ShortcutSuggestionSerializer(serializers.Serializer):
+    """Serializer para sugestões de novos atalhos"""
+    text = serializers.CharField(max_length=20000, required=False, allow_blank=True, default='')
+    max_suggestions = serializers.IntegerField(min_value=1, max_value=10, default=5)
+
+
+class ShortcutImportSerializer(serializers.Serializer):
+    """Serializer para importação de atalhos em lote"""
+    shortcuts = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=getattr(settings, 'SHORTCUT_IMPORT_MAX_ITEMS', 500)
     )
 
 
@@ -233,12 +275,54 @@ class ShortcutStatsSerializer(serializers.Serializer):
     total_shortcuts = serializers.IntegerField()
     active_shortcuts = serializers.IntegerField()
     total_uses = serializers.IntegerField()
-    most_used_shortcut = ShortcutSerializer(read_only=True)
-    recent_shortcuts = ShortcutSerializer(many=True, read_only=True)
+    # Já serializados com ShortcutSerializer no snapshot (users.stats)
+    most_used_shortcut = serializers.DictField(allow_null=True)
+    recent_shortcuts = serializers.ListField(child=serializers.DictField())
     shortcuts_by_category = serializers.DictField()
     shortcuts_by_type = serializers.DictField()
 
 
+class ExpandTextSerializer(serializers.Serializer):
+    """Serializer para expansão de gatilhos em um ou vários textos"""
+    text = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        trim_whitespace=False,
+        max_length=100000
+    )
+    texts = serializers.ListField(
+        child=serializers.CharField(allow_blank=True, trim_whitespace=False, max_length=100000),
+        required=False,
+        max_length=100
+    )
+
+    def validate(self, attrs):
+        if ('text' in attrs) == ('texts' in attrs):
+            raise serializers.ValidationError("Informe 'text' ou 'texts'")
+        return attrs
+
+
+class RenderBatchSerializer(serializers.Serializer):
+    """Serializer para renderizar um atalho com vários conjuntos de variáveis"""
+    variable_sets = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        max_length=1000
+    )
+
+
+class UsageEventSerializer(serializers.Serializer):
+    """Serializer para um uso de atalho registrado pelo cliente"""
+    shortcut_id = serializers.IntegerField()
+    used_at = serializers.DateTimeField(required=False)
+    context = serializers.CharField(required=False, allow_blank=True, max_length=200)
+
+
+class UsageBatchSerializer(serializers.Serializer):
+    """Serializer para registro de vários usos em uma requisição"""
+    events = UsageEventSerializer(many=True, allow_empty=False, max_length=1000)
+
+
 class BulkShortcutActionSerializer(serializers.Serializer):
     """Serializer para ações em lote nos atalhos"""
     shortcut_ids = serializers.ListField(
@@ -246,7 +330,7 @@ class BulkShortcutActionSerializer(serializers.Serializer):
         min_length=1
     )
     action = serializers.ChoiceField(choices=[
-        'activate', 'deactivate', 'delete', 'change_category'
+        'activate', 'deactivate', 'delete', 'change_category', 'regenerate_ai'
     ])
     category_id = serializers.IntegerField(required=False)
 
@@ -255,4 +339,10 @@ class BulkShortcutActionSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "category_id é obrigatório para a ação 'change_category'"
             )
+        max_regenerate = getattr(settings, 'AI_BULK_MAX_SHORTCUTS', 100)
+        if attrs['action'] == 'regenerate_ai' and len(attrs['shortcut_ids']) > max_regenerate:
+            raise serializers.ValidationError(
+                f"Máximo de {max_regenerate} atalhos por regeneração em lote "
+                f"(use o comando regenerate_ai para volumes maiores)"
+            )
         return attrs
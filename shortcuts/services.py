@@ -1,99 +1,121 @@
-import google.generativeai as genai
 import logging
 from django.conf import settings
-from typing import Optional
-import time
+from typing import Iterator, Optional, Tuple
+
+from users.quota import release_ai_requests, reserve_ai_requests
+
+from .ai_backends import get_backend
+from .ai_cache import ai_response_cache, make_cache_key
+from .ai_client import AIServiceError
+from .suggestions import suggest_local
 
 logger = logging.getLogger(__name__)
 
 
 class AIService:
-    """Serviço para expansão de texto usando IA (Google Gemini)"""
+    """Serviço para expansão de texto usando IA (backend definido em AI_BACKEND)"""
 
     def __init__(self):
-        self.api_key = getattr(settings, 'GEMINI_API_KEY', '')
-        self.model_name = "gemini-1.5-flash"
-        self.max_tokens = 500
-        self.temperature = 0.7
-
-        if not self.api_key:
-            logger.warning("Gemini API key não configurada")
-            self.model = None
-        else:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(self.model_name)
-                logger.info(f"AIService inicializado com sucesso usando {self.model_name}")
-            except Exception as e:
-                logger.error(f"Erro ao inicializar AIService: {e}")
-                self.model = None
-
-    def enhance_text(self, content: str, custom_prompt: str = "") -> str:
+        self.backend = get_backend()
+        self.model_name = self.backend.model_name
+        self.max_tokens = self.backend.max_tokens
+        self.temperature = self.backend.temperature
+
+    @property
+    def is_configured(self) -> bool:
+        return self.backend.configured
+
+    def enhance_text(self, content: str, custom_prompt: str = "", bypass_cache: bool = False) -> str:
         """
         Expande um texto usando IA
 
         Args:
             content: Texto original a ser expandido
             custom_prompt: Prompt customizado para instrução específica
+            bypass_cache: Ignora respostas em cache (regeneração explícita)
 
         Returns:
             Texto expandido pela IA
         """
-        if not self.api_key or not self.model:
+        return self.enhance_text_cached(content, custom_prompt, bypass_cache)[0]
+
+    def enhance_text_cached(self, content: str, custom_prompt: str = "",
+                            bypass_cache: bool = False, raise_errors: bool = False) -> Tuple[str, bool]:
+        """
+        Expande um texto usando o cache de respostas quando possível
+
+        Args:
+            raise_errors: Lança AIServiceError em vez de devolver o conteúdo original
+
+        Returns:
+            Tupla (texto expandido, veio do cache)
+        """
+        if not self.is_configured:
             logger.warning("AIService não configurado - retornando conteúdo original")
-            return content
+            return content, False
 
+        use_cache = getattr(settings, 'AI_CACHE_ENABLED', True)
+        cache_key = self._cache_key(content, custom_prompt)
+
+        if use_cache and not bypass_cache:
+            cached = ai_response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Texto expandido obtido do cache")
+                return cached, True
+
+        enhanced_content = self._generate_enhancement(content, custom_prompt, raise_errors)
+        if use_cache and enhanced_content is not None:
+            ai_response_cache.set(cache_key, enhanced_content)
+
+        return (enhanced_content if enhanced_content is not None else content), False
+
+    def enhance_text_stream(self, content: str, custom_prompt: str = "") -> Iterator[str]:
+        """
+        Expande um texto entregando as partes à medida que o modelo as gera
+
+        Não consulta o cache (uso em regeneração), mas grava nele o texto final.
+
+        Raises:
+            AIServiceError: Falha da API, timeout ou resposta vazia
+        """
+        if not self.is_configured:
+            raise AIServiceError("API key não configurada")
+
+        parts = []
+        for chunk in self.backend.enhance_stream(content, custom_prompt):
+            parts.append(chunk)
+            yield chunk
+
+        enhanced_content = ''.join(parts).strip()
+        if not enhanced_content:
+            raise AIServiceError("Resposta vazia do modelo")
+
+        logger.info(f"Texto expandido (streaming) com sucesso usando {self.model_name}")
+        if getattr(settings, 'AI_CACHE_ENABLED', True):
+            ai_response_cache.set(self._cache_key(content, custom_prompt), enhanced_content)
+
+    def _cache_key(self, content: str, custom_prompt: str) -> str:
+        return make_cache_key(
+            self.model_name, self.temperature, self.max_tokens,
+            self.backend.base_prompt, custom_prompt, content
+        )
+
+    def _generate_enhancement(self, content: str, custom_prompt: str,
+                              raise_errors: bool = False) -> Optional[str]:
+        """Chama o backend; retorna None (ou lança AIServiceError) quando não houve resposta válida"""
         try:
-            # Constrói o prompt
-            base_prompt = self._build_base_prompt()
-
-            if custom_prompt:
-                full_prompt = f"{base_prompt}\n\nInstruções específicas: {custom_prompt}\n\nTexto a expandir: {content}"
-            else:
-                full_prompt = f"{base_prompt}\n\nTexto a expandir: {content}"
-
-            # Configura os parâmetros de geração
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=self.max_tokens,
-                temperature=self.temperature,
-                candidate_count=1
-            )
-
-            # Faz a chamada para a API
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=generation_config
-            )
-
-            if response.candidates and response.candidates[0].content:
-                enhanced_content = response.candidates[0].content.parts[0].text.strip()
-                logger.info(f"Texto expandido com sucesso usando {self.model_name}")
-                return enhanced_content
-            else:
-                logger.warning("Resposta vazia do modelo - retornando conteúdo original")
-                return content
+            enhanced_content = self.backend.enhance(content, custom_prompt)
+            logger.info(f"Texto expandido com sucesso usando {self.model_name}")
+            return enhanced_content
 
         except Exception as e:
             logger.error(f"Erro ao expandir texto com IA: {str(e)}")
-            # Em caso de erro, retorna o conteúdo original
-            return content
-
-    def _build_base_prompt(self) -> str:
-        """Constrói o prompt base para expansão de texto"""
-        return """
-Sua tarefa é expandir e melhorar o texto fornecido mantendo o contexto e a intenção original.
-
-Diretrizes:
-1. Mantenha o tom e estilo do texto original
-2. Adicione detalhes relevantes e úteis
-3. Melhore a clareza e profissionalismo
-4. Se for um email, torne-o mais cordial e completo
-5. Se for código, adicione comentários e melhore a estrutura
-6. Se for uma resposta, torne-a mais informativa
-7. Mantenha a linguagem apropriada para o contexto
-
-O texto expandido deve ser natural e fluido.
-        """.strip()
+            if raise_errors:
+                if isinstance(e, AIServiceError):
+                    raise
+                raise AIServiceError(str(e)) from e
+            # Em caso de erro, o chamador usa o conteúdo original
+            return None
 
     def generate_email_template(self, purpose: str, tone: str = "profissional") -> str:
         """
@@ -106,45 +128,11 @@ O texto expandido deve ser natural e fluido.
         Returns:
             Template de email gerado
         """
-        if not self.api_key:
+        if not self.is_configured:
             return self._get_fallback_email_template(purpose)
 
         try:
-            prompt = f"""
-Gere um template de email em português para o seguinte propósito: {purpose}
-Tom desejado: {tone}
-
-O template deve incluir:
-- Assunto sugerido
-- Saudação apropriada
-- Corpo do email com placeholders para personalização (ex: {{nome}}, {{empresa}})
-- Fechamento adequado
-- Assinatura com placeholder
-
-Formato:
-Assunto: [assunto aqui]
-
-[corpo do email aqui]
-
-Seja conciso mas completo.
-            """
-
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=400,
-                temperature=0.6,
-                candidate_count=1
-            )
-
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
-
-            if response.candidates and response.candidates[0].content:
-                return response.candidates[0].content.parts[0].text.strip()
-            else:
-                return self._get_fallback_email_template(purpose)
-
+            return self.backend.generate_email_template(purpose, tone)
         except Exception as e:
             logger.error(f"Erro ao gerar template de email: {e}")
             return self._get_fallback_email_template(purpose)
@@ -211,80 +199,48 @@ Atenciosamente,
 {assinatura}
         """.strip())
 
-    def suggest_shortcuts(self, text: str, max_suggestions: int = 5) -> list:
+    def suggest_shortcuts(self, text: str, max_suggestions: int = 5, user=None) -> list:
         """
         Sugere possíveis atalhos baseados em um texto
 
+        As frases repetidas no texto e no histórico do usuário são analisadas
+        localmente; a IA só é chamada (consumindo a cota do usuário) quando a
+        confiança local fica abaixo de ``AI_SUGGESTIONS_MIN_CONFIDENCE``.
+
         Args:
             text: Texto para analisar
             max_suggestions: Máximo de sugestões a retornar
+            user: Dono do histórico e da cota (opcional)
 
         Returns:
             Lista de sugestões de atalhos
         """
-        if not self.api_key:
-            return self._get_fallback_suggestions(text)
-
-        try:
-            prompt = f"""
-Analise o seguinte texto e sugira {max_suggestions} possíveis atalhos (triggers) que poderiam ser criados.
-
-Texto: {text}
-
-Para cada sugestão, forneça:
-1. Trigger (começando com //)
-2. Título descritivo
-3. Breve explicação do uso
-
-Formato da resposta:
-//trigger1 - Título 1 - Explicação 1
-//trigger2 - Título 2 - Explicação 2
-...
+        local = suggest_local(user, text, max_suggestions)
+        suggestions = local['suggestions']
 
-Os triggers devem ser curtos, memoráveis e descritivos.
-            """
+        min_confidence = getattr(settings, 'AI_SUGGESTIONS_MIN_CONFIDENCE', 0.6)
+        if local['confidence'] >= min_confidence or not text.strip() or not self.is_configured:
+            return suggestions or self._get_fallback_suggestions(text)
 
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=300,
-                temperature=0.8,
-                candidate_count=1
-            )
-
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
-
-            if response.candidates and response.candidates[0].content:
-                suggestions_text = response.candidates[0].content.parts[0].text.strip()
-                return self._parse_suggestions(suggestions_text)
-            else:
-                return self._get_fallback_suggestions(text)
+        reservation = None
+        if user is not None:
+            reservation = reserve_ai_requests(user.pk)
+            if reservation is None:
+                return suggestions or self._get_fallback_suggestions(text)
 
+        try:
+            ai_suggestions = self.backend.suggest_shortcuts(text, max_suggestions - len(suggestions))
         except Exception as e:
             logger.error(f"Erro ao gerar sugestões de atalhos: {e}")
-            return self._get_fallback_suggestions(text)
-
-    def _parse_suggestions(self, suggestions_text: str) -> list:
-        """Parse das sugestões de atalhos retornadas pela IA"""
-        suggestions = []
-        lines = suggestions_text.split('\n')
-
-        for line in lines:
-            if line.strip() and line.startswith('//'):
-                parts = line.split(' - ')
-                if len(parts) >= 3:
-                    trigger = parts[0].strip()
-                    title = parts[1].strip()
-                    description = ' - '.join(parts[2:]).strip()
-
-                    suggestions.append({
-                        'trigger': trigger,
-                        'title': title,
-                        'description': description
-                    })
+            release_ai_requests(reservation)
+            return suggestions or self._get_fallback_suggestions(text)
 
-        return suggestions
+        triggers = {suggestion['trigger'] for suggestion in suggestions}
+        for suggestion in ai_suggestions:
+            if suggestion['trigger'] not in triggers and len(suggestions) < max_suggestions:
+                suggestions.append({**suggestion, 'source': 'ai'})
+                triggers.add(suggestion['trigger'])
+        return suggestions or self._get_fallback_suggestions(text)
 
     def _get_fallback_suggestions(self, text: str) -> list:
         """Sugestões de fallback quando a IA não está disponível"""
@@ -318,35 +274,20 @@ Os triggers devem ser curtos, memoráveis e descritivos.
     def check_api_status(self) -> dict:
         """Verifica o status da API e configuração"""
         status_info = {
-            'api_configured': bool(self.api_key),
+            'backend': self.backend.name,
+            'api_configured': self.is_configured,
             'model': self.model_name,
             'api_accessible': False,
-            'error': None
+            'error': None,
+            'cache': ai_response_cache.stats(),
         }
 
-        if not self.api_key:
+        if not self.is_configured:
             status_info['error'] = 'API key não configurada'
-            return status_info
-
-        try:
-            # Testa a API com uma requisição simples
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=1,
-                temperature=0.1,
-                candidate_count=1
-            )
-
-            response = self.model.generate_content(
-                "test",
-                generation_config=generation_config
-            )
-
-            if response.candidates:
-                status_info['api_accessible'] = True
-            else:
-                status_info['error'] = 'Resposta vazia da API'
-
-        except Exception as e:
-            status_info['error'] = str(e)
+        else:
+            health = self.backend.health()
+            status_info['api_accessible'] = health['accessible']
+            status_info['error'] = health['error']
 
-        return status_info
\ No newline at end of file
+        status_info['client'] = self.backend.stats()
+        return status_info
@@ -0,0 +1,254 @@
+"""
+Sugestões de atalhos calculadas localmente, sem chamar a IA.
+
+Frases frequentes (n-gramas de 2 a 6 palavras, sem atravessar pontuação) são
+contadas no texto colado, no conteúdo dos atalhos do usuário e nos contextos
+do ``ShortcutUsage``. A contagem do histórico fica em memória no processo
+(``PhraseCounter`` por usuário) e é incremental: a cada consulta só os usos
+novos (``id`` acima da marca d'água) são lidos; o conteúdo dos atalhos é
+recontado apenas quando a versão do índice de autocomplete muda (guardada no
+cache compartilhado, como no autocomplete).
+
+As frases são ordenadas pelo texto que economizariam (ocorrências × tamanho)
+e cada sugestão traz um gatilho sem conflito bloqueante (igual ou prefixo)
+com os gatilhos do usuário e com as demais sugestões. ``confidence`` (0 a 1)
+indica se as frases se repetem o suficiente; abaixo de
+``AI_SUGGESTIONS_MIN_CONFIDENCE`` o ``AIService`` complementa com a IA.
+"""
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from django.conf import settings
+
+from .autocomplete import get_index_version, normalize
+from .models import Shortcut, ShortcutUsage
+from .triggers import TriggerIndex
+
+logger = logging.getLogger(__name__)
+
+MIN_WORDS = 2
+MAX_WORDS = 6
+MAX_TEXT_LENGTH = 20000
+
+# Gatilhos sugeridos respeitam o mínimo do serializer
+MIN_TRIGGER_LENGTH = 4
+MAX_TRIGGER_SUFFIX = 99
+
+SEGMENT_RE = re.compile(r'[.!?;:\n\r\t()\[\]{}"]+')
+WORD_RE = re.compile(r"[\w@'-]+")
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas', 'de', 'do', 'da', 'dos', 'das',
+    'e', 'ou', 'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'pra', 'com', 'sem',
+    'que', 'se', 'ao', 'aos', 'como', 'mas', 'mais', 'muito', 'me', 'te', 'lhe',
+    'eu', 'voce', 'ele', 'ela', 'nos', 'eles', 'elas', 'seu', 'sua', 'meu', 'minha',
+    'the', 'of', 'and', 'to', 'in', 'for', 'on', 'is', 'it', 'you', 'i',
+}
+
+
+def iter_phrases(text: str):
+    """Gera tuplas (frase normalizada, frase original) de cada n-grama do texto"""
+    for segment in SEGMENT_RE.split((text or '')[:MAX_TEXT_LENGTH]):
+        words = WORD_RE.findall(segment)
+        keys = [normalize(word) for word in words]
+        for start in range(len(words)):
+            # Frases não começam nem terminam com palavras vazias
+            if keys[start] in STOPWORDS:
+                continue
+            for size in range(MIN_WORDS, min(MAX_WORDS, len(words) - start) + 1):
+                end = start + size
+                if keys[end - 1] in STOPWORDS:
+                    continue
+                yield ' '.join(keys[start:end]), ' '.join(words[start:end])
+
+
+class PhraseCounter:
+    """Contagem incremental de frases com limite de tamanho (descarta as mais raras)"""
+
+    def __init__(self, max_phrases: int = 5000):
+        self.max_phrases = max_phrases
+        self.counts = Counter()
+        self.samples = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, text: str, weight: int = 1):
+        for key, original in iter_phrases(text):
+            self.counts[key] += weight
+            self.samples.setdefault(key, original)
+        if len(self.counts) > self.max_phrases:
+            self._prune()
+
+    def _prune(self):
+        keep = dict(self.counts.most_common(self.max_phrases // 2))
+        self.counts = Counter(keep)
+        self.samples = {key: self.samples[key] for key in keep}
+
+
+class UserPhraseStats:
+    """Frases do histórico de um usuário e as chaves já cobertas por atalhos"""
+
+    def __init__(self, version, max_phrases: int):
+        self.version = version
+        self.phrases = PhraseCounter(max_phrases)
+        self.usage_watermark = 0
+        self.covered = set()
+        self.triggers = set()
+
+
+class SuggestionStatsCache:
+    """Cache LRU em processo das estatísticas por usuário"""
+
+    def __init__(self, max_users: int = 64):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user) -> UserPhraseStats:
+        version = get_index_version(user.pk)
+
+        with self._lock:
+            stats = self._entries.get(user.pk)
+            if stats is not None:
+                self._entries.move_to_end(user.pk)
+
+        if stats is None or stats.version != version:
+            stats = self._build(user, version)
+
+        # Incremental: apenas os usos registrados desde a última consulta
+        new_usages = list(
+            ShortcutUsage.objects.filter(user=user, id__gt=stats.usage_watermark)
+            .exclude(context='')
+            .order_by('id')
+            .values_list('id', 'context')[:getattr(settings, 'AI_SUGGESTIONS_MAX_USAGES', 5000)]
+        )
+        if new_usages:
+            with self._lock:
+                for _, context in new_usages:
+                    stats.phrases.add(context)
+                stats.usage_watermark = new_usages[-1][0]
+
+        with self._lock:
+            self._entries[user.pk] = stats
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        return stats
+
+    def _build(self, user, version) -> UserPhraseStats:
+        stats = UserPhraseStats(version, getattr(settings, 'AI_SUGGESTIONS_MAX_PHRASES', 5000))
+        shortcuts = Shortcut.objects.filter(user=user).values_list('trigger', 'title', 'content')
+        for trigger, title, content in shortcuts:
+            stats.phrases.add(content)
+            stats.triggers.add(trigger.lower())
+            stats.covered.update({normalize(title), normalize(content)})
+        logger.debug(f"Estatísticas de sugestões recompiladas para usuário {user.pk} ({len(stats.phrases)} frases)")
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+stats_cache = SuggestionStatsCache()
+
+
+def make_trigger(phrase_key: str, index: TriggerIndex) -> Optional[str]:
+    """
+    Gatilho curto a partir das palavras da frase (ex: //bom-dia) sem conflito bloqueante no ``index``
+
+    Conflitos de prefixo contam (``SHORTCUT_TRIGGER_BLOCKING_CONFLICTS``): um
+    ``//bom`` existente impede ``//bom-dia`` e qualquer sufixo dele, então
+    também são tentadas as palavras juntas (``//bomdia``), as iniciais
+    (``//bd``) e ``//atalho``, cada forma com sufixos numéricos.
+
+    Returns:
+        O gatilho, ou None se nenhuma forma estiver livre
+    """
+    blocking_types = getattr(settings, 'SHORTCUT_TRIGGER_BLOCKING_CONFLICTS', ('exact', 'prefix'))
+    words = [word for word in re.split(r'[^a-z0-9]+', phrase_key) if word and word not in STOPWORDS]
+    roots = []
+    if words:
+        roots.append('//' + '-'.join(word[:6] for word in words[:2]))
+        roots.append('//' + ''.join(word[:6] for word in words[:2]))
+        roots.append('//' + ''.join(word[0] for word in words[:4]))
+    roots.append('//atalho')
+
+    for root in dict.fromkeys(root for root in roots if len(root) >= MIN_TRIGGER_LENGTH):
+        for suffix in range(1, MAX_TRIGGER_SUFFIX + 1):
+            trigger = root if suffix == 1 else f'{root}{suffix}'
+            if not any(conflict['type'] in blocking_types for conflict in index.conflicts(trigger)):
+                return trigger
+    return None
+
+
+def suggest_local(user, text: str = '', max_suggestions: int = 5) -> dict:
+    """
+    Sugere atalhos a partir de frases repetidas no texto e no histórico do usuário
+
+    Returns:
+        Dict com ``suggestions`` (``trigger``, ``title``, ``description``,
+        ``content``, ``occurrences``, ``source``) e ``confidence``
+    """
+    stats = stats_cache.get(user) if user is not None else None
+    history = stats.phrases.counts if stats else Counter()
+    covered = stats.covered if stats else set()
+
+    text_counts = Counter()
+    samples = {}
+    for key, original in iter_phrases(text):
+        text_counts[key] += 1
+        samples.setdefault(key, original)
+
+    if text_counts:
+        candidates = {key: count + history.get(key, 0) for key, count in text_counts.items()}
+    else:
+        candidates = dict(history.most_common(max_suggestions * 20))
+        samples = stats.phrases.samples if stats else {}
+
+    min_occurrences = getattr(settings, 'AI_SUGGESTIONS_MIN_OCCURRENCES', 2)
+    ranked = sorted(
+        (key for key, count in candidates.items() if count >= min_occurrences and key not in covered),
+        key=lambda key: (candidates[key] * len(key), len(key)),
+        reverse=True
+    )
+
+    # Gatilhos do usuário e os já sugeridos nesta resposta
+    taken = TriggerIndex(enumerate(stats.triggers if stats else (), start=1))
+    selected = []
+    for key in ranked:
+        # Evita frases contidas em outra já sugerida (e vice-versa)
+        if any(key in chosen or chosen in key for chosen in selected):
+            continue
+        selected.append(key)
+        if len(selected) >= max_suggestions:
+            break
+
+    suggestions = []
+    for key in selected:
+        trigger = make_trigger(key, taken)
+        if trigger is None:
+            continue
+        taken.add(-len(suggestions) - 1, trigger)
+        content = samples.get(key, key)
+        suggestions.append({
+            'trigger': trigger,
+            'title': content[:1].upper() + content[1:60],
+            'description': f'Frase repetida {candidates[key]} vezes',
+            'content': content,
+            'occurrences': candidates[key],
+            'source': 'local',
+        })
+
+    # Cada vaga vale 1 quando a frase se repete o bastante para compensar o atalho
+    confident_count = getattr(settings, 'AI_SUGGESTIONS_CONFIDENT_OCCURRENCES', 3)
+    confidence = sum(
+        min(1.0, suggestion['occurrences'] / confident_count) for suggestion in suggestions
+    ) / max(1, max_suggestions)
+
+    return {'suggestions': suggestions, 'confidence': round(confidence, 3)}
@@ -0,0 +1,90 @@
+"""
+Sincronização incremental de atalhos e categorias para a extensão Chrome.
+
+O cliente envia o cursor recebido na sincronização anterior e recebe apenas
+o que foi criado, alterado ou excluído desde então. O cursor é opaco
+(assinado) e carrega o instante em que a consulta anterior foi feita.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Category, Shortcut, SyncTombstone
+
+CURSOR_SALT = 'shortcuts.sync'
+
+# Margem para alterações cujo commit ocorreu depois do timestamp gravado
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+
+class InvalidCursor(Exception):
+    """Cursor de sincronização inválido ou adulterado"""
+
+
+def encode_cursor(moment) -> str:
+    return signing.dumps({'t': moment.isoformat()}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor: str):
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        moment = parse_datetime(data['t'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if moment is None:
+        raise InvalidCursor(cursor)
+    return moment
+
+
+def get_tombstone_retention() -> timedelta:
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def get_changes(user, cursor: str = None) -> dict:
+    """
+    Retorna as alterações desde o cursor informado
+
+    Sem cursor, ou com um cursor mais antigo que a retenção dos registros de
+    exclusão, devolve um snapshot completo (``full=True``) e o cliente deve
+    substituir todo o seu estado local.
+    """
+    now = timezone.now()
+    since = decode_cursor(cursor) if cursor else None
+    full = since is None or since < now - get_tombstone_retention()
+
+    shortcuts = Shortcut.objects.filter(user=user).select_related('category')
+    categories = Category.objects.filter(user=user)
+    deleted = {'shortcuts': [], 'categories': []}
+
+    if not full:
+        window_start = since - CURSOR_OVERLAP
+        shortcuts = shortcuts.filter(updated_at__gte=window_start)
+        categories = categories.filter(updated_at__gte=window_start)
+
+        tombstones = SyncTombstone.objects.filter(
+            user=user,
+            deleted_at__gte=window_start
+        ).values_list('object_type', 'object_id')
+        for object_type, object_id in tombstones:
+            if object_type == 'shortcut':
+                deleted['shortcuts'].append(object_id)
+            else:
+                deleted['categories'].append(object_id)
+
+    return {
+        'cursor': encode_cursor(now),
+        'full': full,
+        'shortcuts': shortcuts.order_by('id'),
+        'categories': categories.order_by('id'),
+        'deleted': deleted,
+    }
+
+
+def prune_tombstones(older_than=None) -> int:
+    """Remove registros de exclusão mais antigos que a retenção configurada"""
+    cutoff = timezone.now() - (older_than or get_tombstone_retention())
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
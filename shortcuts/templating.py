@@ -0,0 +1,172 @@
+"""
+Compilador de templates para atalhos dinâmicos.
+
+O conteúdo é analisado uma única vez em uma lista de segmentos (trechos
+literais e variáveis) e o resultado fica em cache por ``(shortcut.id,
+updated_at)``. A renderização é um único ``join`` sobre os segmentos.
+
+Sintaxe aceita: ``{variavel}`` e ``{{ variavel }}`` (a mesma da extensão).
+Variáveis sem valor são mantidas no texto como estavam.
+"""
+import re
+import threading
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+
+from django.utils import timezone
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}|\{([^{}\s]+)\}')
+
+
+class CompiledTemplate:
+    """Template pré-compilado em segmentos literais e variáveis"""
+
+    __slots__ = ('segments', 'variable_names')
+
+    def __init__(self, source: str):
+        segments = []
+        cursor = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > cursor:
+                segments.append((False, source[cursor:match.start()]))
+            name = match.group(1) or match.group(2)
+            segments.append((True, (name, match.group(0))))
+            cursor = match.end()
+        if cursor < len(source):
+            segments.append((False, source[cursor:]))
+
+        self.segments = tuple(segments)
+        self.variable_names = frozenset(value[0] for is_var, value in segments if is_var)
+
+    def render(self, variables: Mapping) -> str:
+        """Renderiza o template com as variáveis informadas"""
+        parts = []
+        for is_var, value in self.segments:
+            if not is_var:
+                parts.append(value)
+                continue
+            name, raw = value
+            try:
+                parts.append(str(variables[name]))
+            except KeyError:
+                parts.append(raw)
+        return ''.join(parts)
+
+
+class BuiltinVariables(Mapping):
+    """Variáveis embutidas (data, hora, usuário) calculadas apenas quando usadas"""
+
+    def __init__(self, user=None):
+        self._user = user
+        self._values = {}
+        self._now = None
+
+    def _get_now(self):
+        if self._now is None:
+            self._now = timezone.localtime()
+        return self._now
+
+    def _get_user(self):
+        user = self._user() if callable(self._user) else self._user
+        if user is None:
+            raise KeyError('user')
+        return user
+
+    _PROVIDERS = {
+        'date.today': lambda self: self._get_now().strftime('%d/%m/%Y'),
+        'date.time': lambda self: self._get_now().strftime('%H:%M'),
+        'date.year': lambda self: self._get_now().strftime('%Y'),
+        'date.month': lambda self: self._get_now().strftime('%m'),
+        'date.day': lambda self: self._get_now().strftime('%d'),
+        'user.name': lambda self: self._get_user().get_full_name() or self._get_user().username,
+        'user.first_name': lambda self: self._get_user().first_name or self._get_user().username,
+        'user.username': lambda self: self._get_user().username,
+        'user.email': lambda self: self._get_user().email,
+    }
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            provider = self._PROVIDERS.get(name)
+            if provider is None:
+                raise KeyError(name)
+            self._values[name] = provider(self)
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._PROVIDERS)
+
+    def __len__(self):
+        return len(self._PROVIDERS)
+
+
+class TemplateCache:
+    """Cache LRU em processo de templates compilados"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, source: str) -> CompiledTemplate:
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                return template
+
+        template = CompiledTemplate(source)
+
+        with self._lock:
+            self._entries[key] = template
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+template_cache = TemplateCache()
+
+
+def get_template_source(shortcut) -> str:
+    """Texto base usado como template de um atalho"""
+    if shortcut.expansion_type == 'ai_enhanced' and shortcut.expanded_content:
+        return shortcut.expanded_content
+    return shortcut.content
+
+
+def get_compiled_template(shortcut) -> CompiledTemplate:
+    """Retorna o template compilado de um atalho, usando o cache quando possível"""
+    source = get_template_source(shortcut)
+    if shortcut.pk is None or shortcut.updated_at is None:
+        return CompiledTemplate(source)
+    return template_cache.get((shortcut.pk, shortcut.updated_at), source)
+
+
+def build_context(shortcut, extra_variables=None, builtins=None) -> ChainMap:
+    """
+    Monta o contexto de renderização
+
+    A prioridade é: variáveis informadas na chamada, variáveis do atalho e,
+    por fim, as variáveis embutidas.
+    """
+    if builtins is None:
+        builtins = BuiltinVariables(user=lambda: shortcut.user)
+    return ChainMap(extra_variables or {}, shortcut.variables or {}, builtins)
+
+
+def render_shortcut(shortcut, extra_variables=None) -> str:
+    """Renderiza um atalho com as variáveis informadas"""
+    return get_compiled_template(shortcut).render(build_context(shortcut, extra_variables))
+
+
+def render_shortcut_batch(shortcut, variable_sets) -> list:
+    """Renderiza um atalho contra vários conjuntos de variáveis (mala direta)"""
+    template = get_compiled_template(shortcut)
+    builtins = BuiltinVariables(user=lambda: shortcut.user)
+    return [
+        template.render(build_context(shortcut, variables, builtins))
+        for variables in variable_sets
+    ]
@@ -1,3 +1,1172 @@
-from django.test import TestCase
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.utils import timezone
+from users.quota import reserve_ai_requests
+from .models import AIEnhancementLog, AIJob, Category, Shortcut, ShortcutUsage, ShortcutUsageDaily, SyncTombstone
+from .ai_cache import AIResponseCache, ai_response_cache
+from .ai_client import (
+    AICircuitOpenError, AIConcurrencyLimitError, AITimeoutError, CircuitBreaker, GeminiClient, reset_clients
+)
+from .ai_jobs import claim_job, claim_jobs, enqueue_enhancement, run_job
+from .ai_stream import stream_regeneration
+from .autocomplete import autocomplete, index_cache
+from .counters import reconcile_counters
+from .expansion import TriggerAutomaton, automaton_cache
+from .ingestion import UsageBuffer, UsageEvent, apply_usage_events
+from .rollups import get_daily_usage
+from .search import SearchBackend, get_search_backend, search_shortcuts
+from .services import AIService, AIServiceError
+from .suggestions import stats_cache, suggest_local
+from .templating import CompiledTemplate, render_shortcut_batch
+from .triggers import TriggerIndex, trigger_index_cache
 
-# Create your tests here.
+
+class TriggerAutomatonTest(TestCase):
+    """Testes para o autômato de expansão de gatilhos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.email = Shortcut.objects.create(
+            user=self.user, trigger='//email', title='Email', content='Olá, tudo bem?'
+        )
+        self.em = Shortcut.objects.create(
+            user=self.user, trigger='//em', title='Em', content='Em breve'
+        )
+
+    def test_longest_match_wins(self):
+        """Testa que o gatilho mais longo é escolhido"""
+        automaton = TriggerAutomaton([self.email, self.em])
+        result = automaton.expand('//email e //em.')
+
+        self.assertEqual(result['text'], 'Olá, tudo bem? e Em breve.')
+        self.assertEqual([m['trigger'] for m in result['matches']], ['//email', '//em'])
+
+    def test_ignores_partial_words_and_urls(self):
+        """Testa que gatilhos não delimitados não são expandidos"""
+        automaton = TriggerAutomaton([self.email, self.em])
+
+        self.assertEqual(automaton.find_matches('//emails'), [])
+        self.assertEqual(automaton.find_matches('https://em'), [])
+
+    def test_cache_rebuilds_on_change(self):
+        """Testa que o autômato é recompilado quando um atalho muda"""
+        automaton_cache.clear()
+        first = automaton_cache.get(self.user)
+        self.assertIs(first, automaton_cache.get(self.user))
+
+        self.em.content = 'Novo conteúdo'
+        self.em.save()
+
+        second = automaton_cache.get(self.user)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.expand('//em')['text'], 'Novo conteúdo')
+
+
+class ExpandTextAPITest(APITestCase):
+    """Testes para o endpoint de expansão em lote"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Shortcut.objects.create(user=self.user, trigger='//oi', title='Oi', content='Olá!')
+        Shortcut.objects.create(
+            user=self.user, trigger='//tchau', title='Tchau', content='Até logo', is_active=False
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_expand_batch(self):
+        """Testa a expansão de vários textos em uma requisição"""
+        response = self.client.post(
+            reverse('shortcuts:expand-text'),
+            {'texts': ['//oi mundo', '//tchau']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['text'], 'Olá! mundo')
+        self.assertEqual(response.data['results'][1]['text'], '//tchau')
+
+    def test_batch_resolves_automaton_once(self):
+        """Testa que o tamanho do lote não muda o número de consultas"""
+        automaton_cache.clear()
+
+        def queries(texts):
+            with CaptureQueriesContext(connection) as captured:
+                self.client.post(reverse('shortcuts:expand-text'), {'texts': texts}, format='json')
+            return len(captured)
+
+        queries(['//oi'])
+        self.assertEqual(queries(['//oi mundo'] * 50), queries(['//oi']))
+
+    def test_requires_text(self):
+        """Testa que é necessário informar text ou texts"""
+        response = self.client.post(reverse('shortcuts:expand-text'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TemplateEngineTest(TestCase):
+    """Testes para o compilador de templates dinâmicos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123', first_name='Ana'
+        )
+        self.shortcut = Shortcut.objects.create(
+            user=self.user,
+            trigger='//proposta',
+            title='Proposta',
+            content='Olá {nome}, segue a proposta da {empresa}. Att, {{ user.first_name }}',
+            expansion_type='dynamic',
+            variables={'empresa': 'Symplifika'}
+        )
+
+    def test_compile_segments(self):
+        """Testa a separação do conteúdo em trechos literais e variáveis"""
+        template = CompiledTemplate('Oi {nome}!')
+        self.assertEqual(template.variable_names, {'nome'})
+        self.assertEqual(template.render({'nome': 'Ana'}), 'Oi Ana!')
+        self.assertEqual(template.render({}), 'Oi {nome}!')
+
+    def test_processed_content_uses_builtins(self):
+        """Testa variáveis do atalho e variáveis embutidas"""
+        self.assertEqual(
+            self.shortcut.get_processed_content(),
+            'Olá {nome}, segue a proposta da Symplifika. Att, Ana'
+        )
+
+    def test_render_batch(self):
+        """Testa a renderização com vários conjuntos de variáveis"""
+        results = render_shortcut_batch(self.shortcut, [{'nome': 'João'}, {'nome': 'Maria', 'empresa': 'ACME'}])
+        self.assertEqual(results[0], 'Olá João, segue a proposta da Symplifika. Att, Ana')
+        self.assertEqual(results[1], 'Olá Maria, segue a proposta da ACME. Att, Ana')
+
+    def test_render_batch_api(self):
+        """Testa o endpoint de renderização em lote"""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('shortcuts:shortcut-render-batch', args=[self.shortcut.id]),
+            {'variable_sets': [{'nome': 'João'}]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 1)
+
+
+class ShortcutChangesAPITest(APITestCase):
+    """Testes para a sincronização incremental com registros de exclusão"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name='Trabalho')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//oi', title='Oi', content='Olá!', category=self.category
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('shortcuts:shortcut-changes')
+
+    def test_full_sync_without_cursor(self):
+        """Testa que a primeira sincronização retorna tudo"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['shortcuts']), 1)
+        self.assertEqual(len(response.data['categories']), 1)
+        self.assertTrue(response.data['cursor'])
+
+    def test_incremental_sync_returns_tombstones(self):
+        """Testa que exclusões aparecem na sincronização seguinte"""
+        cursor = self.client.get(self.url).data['cursor']
+        shortcut_id = self.shortcut.id
+        self.shortcut.delete()
+
+        response = self.client.get(self.url, {'since': cursor})
+
+        self.assertFalse(response.data['full'])
+        self.assertEqual(response.data['deleted']['shortcuts'], [shortcut_id])
+
+    def test_invalid_cursor(self):
+        """Testa que cursores adulterados são rejeitados"""
+        response = self.client.get(self.url, {'since': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_deletion_does_not_record_tombstones(self):
+        """Testa que a exclusão da conta não gera registros de exclusão"""
+        self.user.delete()
+        self.assertFalse(SyncTombstone.objects.exists())
+
+
+class UsageIngestionTest(APITestCase):
+    """Testes para a gravação em lote dos usos de atalhos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//oi', title='Oi', content='Olá!'
+        )
+
+    def test_buffer_flush_aggregates_counts(self):
+        """Testa que o buffer grava os usos e soma os contadores em lote"""
+        buffer = UsageBuffer(threaded=False)
+        now = timezone.now()
+        for minutes in (3, 1, 2):
+            buffer.add(
+                UsageEvent(self.shortcut.id, self.user.id, now - timedelta(minutes=minutes), 'gmail')
+            )
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len(buffer), 0)
+
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.use_count, 3)
+        self.assertEqual(self.shortcut.last_used, now - timedelta(minutes=1))
+        self.assertEqual(ShortcutUsage.objects.filter(shortcut=self.shortcut).count(), 3)
+
+    def test_flush_skips_deleted_shortcuts(self):
+        """Testa que usos de atalhos excluídos são descartados"""
+        buffer = UsageBuffer(threaded=False)
+        buffer.add(UsageEvent(self.shortcut.id + 1000, self.user.id, timezone.now()))
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_full_buffer_drops_and_counts(self):
+        """Testa que o buffer é limitado e conta os eventos descartados"""
+        buffer = UsageBuffer(batch_size=2, max_size=3, threaded=False)
+        now = timezone.now()
+        for _ in range(3):
+            buffer.add(UsageEvent(self.shortcut.id, self.user.id, now))
+        self.assertFalse(buffer.add(UsageEvent(self.shortcut.id, self.user.id, now)))
+
+        self.assertEqual(buffer.stats(), {'pending': 3, 'written': 0, 'dropped': 1})
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(buffer.stats(), {'pending': 0, 'written': 3, 'dropped': 1})
+
+    @override_settings(SHORTCUT_USAGE_BUFFERED=False)
+    def test_use_endpoint(self):
+        """Testa o endpoint de uso em modo síncrono"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse('shortcuts:shortcut-use', args=[self.shortcut.id]),
+            {'context': 'gmail'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['use_count'], 1)
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.use_count, 1)
+        self.assertEqual(ShortcutUsage.objects.get().context, 'gmail')
+
+    def test_use_batch_endpoint(self):
+        """Testa o registro de vários usos em uma requisição"""
+        other_user = User.objects.create_user(username='outro', password='testpass123')
+        other_shortcut = Shortcut.objects.create(
+            user=other_user, trigger='//oi', title='Oi', content='Olá!'
+        )
+        self.client.force_authenticate(user=self.user)
+        used_at = timezone.now() - timedelta(hours=2)
+
+        response = self.client.post(
+            reverse('shortcuts:shortcut-use-batch'),
+            {'events': [
+                {'shortcut_id': self.shortcut.id, 'used_at': used_at.isoformat(), 'context': 'offline'},
+                {'shortcut_id': self.shortcut.id},
+                {'shortcut_id': other_shortcut.id},
+            ]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recorded'], 2)
+        self.assertEqual(response.data['rejected'], [other_shortcut.id])
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.use_count, 2)
+        self.assertEqual(ShortcutUsage.objects.filter(context='offline').get().used_at, used_at)
+
+
+class ShortcutSearchTest(APITestCase):
+    """Testes para a busca textual de atalhos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.by_content = Shortcut.objects.create(
+            user=self.user, trigger='//ola', title='Saudação', content='Segue o orçamento solicitado'
+        )
+        self.by_title = Shortcut.objects.create(
+            user=self.user, trigger='//valores', title='Orçamento padrão', content='Valores em anexo'
+        )
+        self.by_trigger = Shortcut.objects.create(
+            user=self.user, trigger='//orcamento', title='Proposta', content='Conforme combinado'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_ranking_trigger_title_content(self):
+        """Testa a ordem de relevância gatilho > título > conteúdo com o índice e sem ele"""
+        expected = [
+            Shortcut.objects.create(user=self.user, trigger='//contrato', title='Modelo', content='Em anexo'),
+            Shortcut.objects.create(user=self.user, trigger='//modelo', title='Contrato padrão', content='Em anexo'),
+            Shortcut.objects.create(user=self.user, trigger='//anexo', title='Anexo', content='Segue o contrato'),
+        ]
+        for backend in (get_search_backend(), SearchBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                queryset = backend.search(Shortcut.objects.filter(user=self.user), 'contrato')
+                self.assertEqual(list(queryset.order_by('-search_rank')), expected)
+
+        ranked = search_shortcuts(Shortcut.objects.filter(user=self.user), 'orçamento').order_by('-search_rank')
+        self.assertEqual(list(ranked), [self.by_trigger, self.by_title, self.by_content])
+
+    def test_infix_and_short_terms(self):
+        """Testa que trechos no meio da palavra e termos curtos caem no icontains"""
+        queryset = Shortcut.objects.filter(user=self.user)
+        self.assertEqual(set(search_shortcuts(queryset, 'amento')), {self.by_trigger, self.by_title, self.by_content})
+        self.assertEqual(list(search_shortcuts(queryset, 'va')), [self.by_title])
+
+    def test_index_hits_skip_contains(self):
+        """Testa que, com resultados no índice, a busca não faz varredura com icontains"""
+        results = search_shortcuts(Shortcut.objects.filter(user=self.user), 'orcamento')
+        self.assertTrue(results.exists())
+        self.assertNotIn('LIKE', str(results.query).upper())
+
+    def test_index_follows_updates(self):
+        """Testa que o índice acompanha alterações e exclusões"""
+        self.by_content.content = 'Texto novo'
+        self.by_content.save()
+        self.by_title.delete()
+
+        results = search_shortcuts(Shortcut.objects.filter(user=self.user), 'orcamento')
+        self.assertEqual(list(results), [self.by_trigger])
+
+    def test_search_endpoint_keeps_filters_and_ordering(self):
+        """Testa filtros e ordenação explícita junto com a busca"""
+        self.by_title.is_active = False
+        self.by_title.save()
+
+        response = self.client.post(
+            reverse('shortcuts:shortcut-search'),
+            {'query': 'orça', 'order_by': 'trigger'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([item['trigger'] for item in results], ['//ola', '//orcamento'])
+
+
+class AutocompleteTest(APITestCase):
+    """Testes para o índice de autocomplete"""
+
+    def setUp(self):
+        index_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.category = Category.objects.create(user=self.user, name='Orçamentos')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//email-boasvindas', title='Boas-vindas', content='Olá!',
+            category=self.category
+        )
+
+    def test_prefix_and_infix(self):
+        """Testa buscas por prefixo, por trecho e sem acentos"""
+        self.assertEqual(autocomplete(self.user, 'ema', suggestion_type='shortcut')[0]['trigger'], '//email-boasvindas')
+        self.assertEqual(autocomplete(self.user, 'vindas', suggestion_type='shortcut')[0]['text'], 'Boas-vindas')
+        self.assertEqual(autocomplete(self.user, 'orcam', suggestion_type='category')[0]['text'], 'Orçamentos')
+        self.assertEqual(autocomplete(self.user, 'xyz'), [])
+
+    def test_index_invalidated_on_change(self):
+        """Testa que alterações em atalhos atualizam o índice"""
+        self.assertEqual(len(autocomplete(self.user, 'suporte')), 0)
+
+        Shortcut.objects.create(user=self.user, trigger='//suporte', title='Suporte', content='Ajuda')
+        self.assertEqual(len(autocomplete(self.user, 'suporte')), 1)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.post(
+            reverse('shortcuts:shortcut-bulk-action'),
+            {'shortcut_ids': [self.shortcut.id], 'action': 'deactivate'},
+            format='json'
+        )
+        self.assertEqual(autocomplete(self.user, 'boas', suggestion_type='shortcut'), [])
+
+    def test_suggestions_api(self):
+        """Testa o endpoint de sugestões de busca"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:search-suggestions'), {'q': 'boas'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['suggestions'][0]['trigger'], '//email-boasvindas')
+
+
+class ShortcutCountersTest(APITestCase):
+    """Testes para os contadores desnormalizados de atalhos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.work = Category.objects.create(user=self.user, name='Trabalho')
+        self.personal = Category.objects.create(user=self.user, name='Pessoal')
+        self.first = Shortcut.objects.create(
+            user=self.user, trigger='//um', title='Um', content='1', category=self.work
+        )
+        self.second = Shortcut.objects.create(
+            user=self.user, trigger='//dois', title='Dois', content='2', category=self.work
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def assertCounters(self, total, active, work, personal):
+        self.user.profile.refresh_from_db()
+        self.work.refresh_from_db()
+        self.personal.refresh_from_db()
+        self.assertEqual((self.user.profile.shortcuts_total, self.user.profile.shortcuts_active), (total, active))
+        self.assertEqual((self.work.shortcuts_total, self.work.shortcuts_active), work)
+        self.assertEqual((self.personal.shortcuts_total, self.personal.shortcuts_active), personal)
+
+    def test_create_update_delete(self):
+        """Testa os contadores em criação, alteração e exclusão"""
+        self.assertCounters(2, 2, (2, 2), (0, 0))
+
+        self.first.is_active = False
+        self.first.category = self.personal
+        self.first.save()
+        self.assertCounters(2, 1, (1, 1), (1, 0))
+
+        self.first.delete()
+        self.assertCounters(1, 1, (1, 1), (0, 0))
+        self.assertEqual(reconcile_counters(), [])
+
+    def test_decrements_stop_at_zero(self):
+        """Testa que um total já divergente não fica negativo na exclusão"""
+        Shortcut.objects.filter(pk=self.first.pk).update(use_count=5)
+        self.first.refresh_from_db()
+        self.first.delete()
+
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_shortcuts_used, 0)
+
+    def test_bulk_actions(self):
+        """Testa os contadores nas ações em lote"""
+        url = reverse('shortcuts:shortcut-bulk-action')
+        ids = [self.first.id, self.second.id]
+
+        self.client.post(url, {'shortcut_ids': ids, 'action': 'deactivate'}, format='json')
+        self.assertCounters(2, 0, (2, 0), (0, 0))
+
+        self.client.post(url, {'shortcut_ids': ids, 'action': 'activate'}, format='json')
+        self.client.post(
+            url, {'shortcut_ids': [self.first.id], 'action': 'change_category', 'category_id': self.personal.id},
+            format='json'
+        )
+        self.assertCounters(2, 2, (1, 1), (1, 1))
+        self.assertEqual(reconcile_counters(), [])
+
+    @override_settings(SHORTCUT_USAGE_BUFFERED=False)
+    def test_usage_and_reconciliation(self):
+        """Testa o total de usos e a correção de divergências"""
+        self.client.post(reverse('shortcuts:shortcut-use', args=[self.first.id]), format='json')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.total_shortcuts_used, 1)
+
+        Category.objects.filter(pk=self.work.pk).update(shortcuts_total=10)
+        drift = reconcile_counters()
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(drift[0]['actual'], 2)
+        self.assertEqual(reconcile_counters(), [])
+
+
+class AIResponseCacheTest(APITestCase):
+    """Testes para o cache de respostas da IA"""
+
+    def setUp(self):
+        cache.clear()
+        ai_response_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//ia', title='IA', content='Oi',
+            expansion_type='ai_enhanced', ai_prompt='Seja cordial'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_lru_ttl_and_metrics(self):
+        """Testa a expiração, o descarte LRU e as métricas"""
+        cache = AIResponseCache(max_entries=2, ttl=60, use_shared_cache=False)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')
+        cache.set('c', '3')
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), '1')
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['local_hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+        expired = AIResponseCache(ttl=0, use_shared_cache=False)
+        expired.set('a', '1')
+        self.assertIsNone(expired.get('a'))
+
+    @override_settings(GEMINI_API_KEY='test-key', SHORTCUT_USAGE_BUFFERED=False, AI_JOBS_ASYNC=False)
+    def test_cache_hits_do_not_consume_quota(self):
+        """Testa que respostas em cache não consomem a cota de IA"""
+        url = reverse('shortcuts:shortcut-use', args=[self.shortcut.id])
+        with mock.patch.object(AIService, '_generate_enhancement', return_value='Olá, tudo bem?') as generate:
+            first = self.client.post(url, format='json')
+            second = self.client.post(url, format='json')
+
+        self.assertEqual(first.data['content'], 'Olá, tudo bem?')
+        self.assertEqual(second.data['content'], 'Olá, tudo bem?')
+        self.assertEqual(generate.call_count, 1)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 1)
+
+    @override_settings(GEMINI_API_KEY='test-key', AI_JOBS_ASYNC=False)
+    def test_regenerate_bypasses_cache(self):
+        """Testa que a regeneração explícita ignora o cache"""
+        url = reverse('shortcuts:shortcut-regenerate-ai', args=[self.shortcut.id])
+        with mock.patch.object(AIService, '_generate_enhancement', side_effect=['Versão 1', 'Versão 2']):
+            self.client.post(url, format='json')
+            response = self.client.post(url, format='json')
+
+        self.assertEqual(response.data['enhanced_content'], 'Versão 2')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 2)
+
+
+@override_settings(GEMINI_API_KEY='test-key', SHORTCUT_USAGE_BUFFERED=False)
+class AIJobQueueTest(APITestCase):
+    """Testes para a fila de expansões por IA"""
+
+    def setUp(self):
+        cache.clear()
+        ai_response_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//ia', title='IA', content='Oi',
+            expansion_type='ai_enhanced', ai_prompt='Seja cordial'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_use_enqueues_and_status_endpoint(self):
+        """Testa que o uso enfileira a tarefa e responde com o conteúdo atual"""
+        response = self.client.post(reverse('shortcuts:shortcut-use', args=[self.shortcut.id]), format='json')
+
+        self.assertEqual(response.data['content'], 'Oi')
+        self.assertEqual(response.data['ai_job']['status'], 'pending')
+        job_id = response.data['ai_job']['id']
+
+        # Usos seguidos reaproveitam a tarefa pendente
+        again = self.client.post(reverse('shortcuts:shortcut-use', args=[self.shortcut.id]), format='json')
+        self.assertEqual(again.data['ai_job']['id'], job_id)
+
+        with mock.patch.object(AIService, '_generate_enhancement', return_value='Olá, tudo bem?'):
+            for job in claim_jobs('test', 10):
+                run_job(job)
+
+        status_response = self.client.get(reverse('shortcuts:ai-jobs-detail', args=[job_id]))
+        self.assertEqual(status_response.data['status'], 'succeeded')
+        self.assertEqual(status_response.data['result'], 'Olá, tudo bem?')
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.expanded_content, 'Olá, tudo bem?')
+
+    def test_regenerate_returns_accepted(self):
+        """Testa que a regeneração responde 202 com o id da tarefa"""
+        response = self.client.post(reverse('shortcuts:shortcut-regenerate-ai', args=[self.shortcut.id]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(AIJob.objects.get(pk=response.data['job_id']).bypass_cache)
+
+    def test_claim_is_exclusive(self):
+        """Testa que uma tarefa só pode ser reservada por um worker"""
+        job = enqueue_enhancement(self.shortcut, self.user)
+
+        self.assertIsNotNone(claim_job(job.pk, 'worker-1'))
+        self.assertIsNone(claim_job(job.pk, 'worker-2'))
+        self.assertEqual(claim_jobs('worker-2', 10), [])
+
+    def test_retry_with_backoff_then_dead_letter(self):
+        """Testa o reagendamento com backoff e o descarte após a última tentativa"""
+        job = enqueue_enhancement(self.shortcut, self.user)
+        job.max_attempts = 2
+        job.save()
+
+        with mock.patch.object(AIService, '_generate_enhancement', side_effect=AIServiceError('timeout')):
+            job = run_job(claim_job(job.pk, 'test'))
+            self.assertEqual(job.status, 'pending')
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(claim_jobs('test', 10), [])
+
+            AIJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = run_job(claim_job(job.pk, 'test'))
+
+        self.assertEqual(job.status, 'dead')
+        self.assertEqual(
+            list(AIEnhancementLog.objects.filter(job=job).order_by('attempt').values_list('status', flat=True)),
+            ['retry', 'dead_letter']
+        )
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 0)
+
+
+@override_settings(GEMINI_API_KEY='test-key')
+class RunAIWorkerCommandTest(TransactionTestCase):
+    """Testes para o comando run_ai_worker"""
+
+    def test_processes_queue_concurrently(self):
+        """Testa que o worker processa todas as tarefas prontas e encerra com --once"""
+        cache.clear()
+        ai_response_cache.clear()
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        for index in range(4):
+            shortcut = Shortcut.objects.create(
+                user=user, trigger=f'//ia{index}', title='IA', content=f'Oi {index}',
+                expansion_type='ai_enhanced', ai_prompt='Seja cordial'
+            )
+            enqueue_enhancement(shortcut, user)
+
+        with mock.patch.object(AIService, '_generate_enhancement', return_value='Olá!'):
+            call_command('run_ai_worker', '--once', '--concurrency', '2', stdout=StringIO())
+
+        self.assertEqual(AIJob.objects.filter(status='succeeded').count(), 4)
+
+
+class FakeModel:
+    """Modelo falso que responde, falha ou demora conforme configurado"""
+
+    def __init__(self, error=None, delay=0.0, chunks=('ok',)):
+        self.error = error
+        self.delay = delay
+        self.chunks = chunks
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        if stream:
+            return iter([SimpleNamespace(text=text) for text in self.chunks])
+        return 'ok'
+
+
+class GeminiClientTest(TestCase):
+    """Testes para o cliente Gemini compartilhado"""
+
+    def make_client(self, model, **kwargs):
+        client = GeminiClient('test-key', **kwargs)
+        client._models['fake'] = model
+        return client
+
+    def test_circuit_opens_and_recovers(self):
+        """Testa que o circuito abre após falhas seguidas, falha rápido e fecha após um teste bem-sucedido"""
+        model = FakeModel(error=RuntimeError('503'))
+        client = self.make_client(model, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                client.generate('fake', 'oi')
+        with self.assertRaises(AICircuitOpenError):
+            client.generate('fake', 'oi')
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(client.stats()['circuit_state'], 'open')
+
+        time.sleep(0.06)
+        model.error = None
+        self.assertEqual(client.generate('fake', 'oi'), 'ok')
+        stats = client.stats()
+        self.assertEqual(stats['circuit_state'], 'closed')
+        self.assertEqual(stats['short_circuited'], 1)
+        self.assertGreater(stats['open_circuit_seconds'], 0)
+
+    def test_probe_released_when_model_setup_fails(self):
+        """Testa que uma falha antes da chamada no meio-aberto não prende o circuito"""
+        client = self.make_client(FakeModel(error=RuntimeError('503')), max_concurrency=1,
+                                  breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+        with self.assertRaises(AIServiceError):
+            client.generate('fake', 'oi')
+        time.sleep(0.02)
+
+        with mock.patch.object(client, 'get_model', side_effect=RuntimeError('modelo')):
+            with self.assertRaises(RuntimeError):
+                client.generate('fake', 'oi')
+            with self.assertRaises(RuntimeError):
+                list(client.stream('fake', 'oi'))
+
+        client._models['fake'] = FakeModel()
+        self.assertEqual(client.generate('fake', 'oi'), 'ok')
+        self.assertEqual(client.stats()['circuit_state'], 'closed')
+        self.assertEqual(client.stats()['in_flight'], 0)
+
+    def test_concurrency_limit_and_timeout(self):
+        """Testa a rejeição acima do limite de concorrência e o timeout por chamada"""
+        client = self.make_client(
+            FakeModel(delay=0.3), max_concurrency=1, acquire_timeout=0.01, call_timeout=0.05
+        )
+
+        with self.assertRaises(AITimeoutError):
+            client.generate('fake', 'oi')
+        # A chamada que estourou o timeout continua ocupando a vaga até terminar
+        self.assertEqual(client.stats()['in_flight'], 1)
+        with self.assertRaises(AIConcurrencyLimitError):
+            client.generate('fake', 'oi')
+        self.assertEqual(client.stats()['rejected'], 1)
+
+
+@override_settings(GEMINI_API_KEY='test-key')
+class BulkAIRegenerationTest(APITestCase):
+    """Testes para a regeneração em lote pela IA"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.max_ai_requests = 3
+        self.user.profile.save()
+        self.shortcuts = [
+            Shortcut.objects.create(
+                user=self.user, trigger=f'//ia{index}', title='IA', content=f'Oi {index}',
+                expansion_type='ai_enhanced', ai_prompt='Seja cordial'
+            )
+            for index in range(4)
+        ]
+        self.static = Shortcut.objects.create(user=self.user, trigger='//fixo', title='Fixo', content='Fixo')
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_action_enqueues_within_quota(self):
+        """Testa que a regeneração em lote enfileira tarefas até o limite da cota"""
+        def fake_generate(content, custom_prompt, raise_errors=False):
+            if content == 'Oi 1':
+                raise AIServiceError('timeout')
+            return content.upper()
+
+        ids = [shortcut.id for shortcut in self.shortcuts] + [self.static.id]
+        with mock.patch.object(AIService, '_generate_enhancement', side_effect=fake_generate):
+            response = self.client.post(
+                reverse('shortcuts:shortcut-bulk-action'),
+                {'shortcut_ids': ids, 'action': 'regenerate_ai'},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data['requested'], 4)
+            self.assertEqual(response.data['skipped_quota'], 1)
+            self.assertEqual(
+                sorted(AIJob.objects.filter(bypass_cache=True).values_list('id', flat=True)),
+                sorted(response.data['job_ids'])
+            )
+
+            for job in claim_jobs('test', 10):
+                run_job(job)
+
+        self.assertEqual(
+            list(Shortcut.objects.filter(expanded_content__gt='').order_by('id').values_list('expanded_content', flat=True)),
+            ['OI 0', 'OI 2']
+        )
+        self.assertEqual(AIEnhancementLog.objects.filter(status='success').count(), 2)
+
+        # A cota da chamada que falhou é devolvida
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 2)
+
+    def test_command_for_category(self):
+        """Testa o comando regenerate_ai filtrando por categoria"""
+        category = Category.objects.create(user=self.user, name='Vendas')
+        Shortcut.objects.filter(pk=self.shortcuts[0].pk).update(category=category)
+
+        with mock.patch.object(AIService, '_generate_enhancement', return_value='Olá!'):
+            call_command('regenerate_ai', 'testuser', '--category', str(category.id), stdout=StringIO())
+
+        self.assertEqual(Shortcut.objects.filter(expanded_content='Olá!').count(), 1)
+
+
+@override_settings(GEMINI_API_KEY='test-key')
+class StreamingRegenerationTest(APITestCase):
+    """Testes para a regeneração por IA via server-sent events"""
+
+    def setUp(self):
+        reset_clients()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//ia', title='IA', content='Oi',
+            expansion_type='ai_enhanced', ai_prompt='Seja cordial'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('shortcuts:shortcut-regenerate-ai-stream', args=[self.shortcut.id])
+
+    def stream(self, model):
+        with mock.patch.object(GeminiClient, 'get_model', return_value=model):
+            response = self.client.post(self.url, HTTP_ACCEPT='text/event-stream')
+            body = b''.join(response.streaming_content).decode()
+        return response, body
+
+    def test_streams_tokens_and_persists_result(self):
+        """Testa o envio dos tokens e a gravação do texto final"""
+        response, body = self.stream(FakeModel(chunks=['Olá, ', 'tudo ', 'bem?']))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(body.count('event: token'), 3)
+        self.assertIn('event: done', body)
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.expanded_content, 'Olá, tudo bem?')
+        self.assertEqual(AIEnhancementLog.objects.filter(shortcut=self.shortcut).count(), 1)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 1)
+
+    def test_failure_releases_quota(self):
+        """Testa que uma falha envia o evento de erro e devolve a cota"""
+        response, body = self.stream(FakeModel(error=RuntimeError('503')))
+
+        self.assertIn('event: error', body)
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.expanded_content, '')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 0)
+
+    def test_disconnect_settles_quota(self):
+        """Testa a cota quando o cliente desconecta antes e depois do primeiro token"""
+        with mock.patch.object(GeminiClient, 'get_model', return_value=FakeModel(chunks=['Olá, ', 'tudo bem?'])):
+            for tokens_sent, expected_used in ((0, 0), (1, 1)):
+                events = stream_regeneration(self.shortcut, reserve_ai_requests(self.user.pk))
+                for _ in range(1 + tokens_sent):
+                    next(events)
+                events.close()
+
+                self.user.profile.refresh_from_db()
+                self.assertEqual(self.user.profile.ai_requests_used, expected_used)
+
+        self.shortcut.refresh_from_db()
+        self.assertEqual(self.shortcut.expanded_content, '')
+
+    def test_unread_stream_releases_quota(self):
+        """Testa que a cota volta quando a resposta é fechada sem o stream ser lido"""
+        with mock.patch.object(GeminiClient, 'get_model', return_value=FakeModel()) as get_model:
+            response = self.client.post(self.url, HTTP_ACCEPT='text/event-stream')
+            self.user.profile.refresh_from_db()
+            self.assertEqual(self.user.profile.ai_requests_used, 1)
+
+            # Como o cliente de teste: sem fechar a conexão do banco no request_finished
+            request_finished.disconnect(close_old_connections)
+            try:
+                response.close()
+            finally:
+                request_finished.connect(close_old_connections)
+        self.assertFalse(get_model.called)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.ai_requests_used, 0)
+
+
+FAKE_BACKEND_SETTINGS = {
+    'AI_BACKEND': 'fake',
+    'AI_FAKE_LATENCY': {'distribution': 'fixed', 'ms': 0},
+    'AI_FAKE_TOKENS_PER_SECOND': 0,
+    'AI_FAKE_ERROR_RATE': 0.0,
+    'AI_FAKE_OUTPUT_TOKENS': 20,
+}
+
+
+@override_settings(**FAKE_BACKEND_SETTINGS)
+class FakeAIBackendTest(TestCase):
+    """Testes para o backend de IA falso"""
+
+    def setUp(self):
+        cache.clear()
+        ai_response_cache.clear()
+        reset_clients()
+
+    def test_deterministic_enhancement_and_status(self):
+        """Testa que o backend falso responde de forma determinística e reporta status"""
+        service = AIService()
+        first = service.enhance_text('Bom dia', 'Seja cordial', bypass_cache=True)
+        second = service.enhance_text('Bom dia', 'Seja cordial', bypass_cache=True)
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('Bom dia'))
+        self.assertEqual(len(first.split()), 20)
+        self.assertEqual(''.join(service.enhance_text_stream('Bom dia', 'Seja cordial')), first)
+
+        status_info = service.check_api_status()
+        self.assertEqual(status_info['backend'], 'fake')
+        self.assertTrue(status_info['api_accessible'])
+        self.assertEqual(status_info['client']['calls'], 4)
+
+    @override_settings(AI_FAKE_ERROR_RATE=1.0)
+    def test_simulated_errors_fall_back(self):
+        """Testa que erros simulados usam os fallbacks e contam para o circuito"""
+        service = AIService()
+
+        self.assertEqual(service.enhance_text('Bom dia'), 'Bom dia')
+        with self.assertRaises(AIServiceError):
+            service.enhance_text_cached('Bom dia', raise_errors=True)
+        self.assertEqual(service.suggest_shortcuts('obrigado')[0]['trigger'], '//agradec')
+        self.assertEqual(service.backend.stats()['failures'], 3)
+
+
+@override_settings(**FAKE_BACKEND_SETTINGS)
+class LocalSuggestionTest(APITestCase):
+    """Testes para as sugestões locais de atalhos"""
+
+    def setUp(self):
+        cache.clear()
+        stats_cache.clear()
+        reset_clients()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//bom-dia', title='Bom dia', content='Bom dia, tudo bem?'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_repeated_phrases_skip_ai(self):
+        """Testa que frases repetidas geram sugestões sem chamar a IA"""
+        text = (
+            'Segue em anexo a proposta comercial. Qualquer dúvida estou à disposição. '
+            'Segue em anexo a proposta comercial revisada. Qualquer dúvida estou à disposição. '
+            'Segue em anexo a proposta comercial final. Qualquer dúvida estou à disposição.'
+        )
+        with mock.patch('shortcuts.ai_backends.FakeBackend.suggest_shortcuts') as ai_suggest:
+            response = self.client.post(
+                reverse('shortcuts:shortcut-suggest'), {'text': text, 'max_suggestions': 2}, format='json'
+            )
+
+        ai_suggest.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        suggestions = response.data['suggestions']
+        self.assertEqual(
+            [suggestion['content'] for suggestion in suggestions],
+            ['Segue em anexo a proposta comercial', 'Qualquer dúvida estou à disposição']
+        )
+        self.assertEqual(suggestions[0]['trigger'], '//segue-anexo')
+        self.assertEqual(suggestions[0]['occurrences'], 3)
+        self.assertEqual(self.user.profile.ai_requests_used, 0)
+
+    def test_suggested_trigger_avoids_prefix_conflicts(self):
+        """Testa que o gatilho sugerido não conflita por prefixo com um existente e pode ser criado"""
+        Shortcut.objects.create(user=self.user, trigger='//segue', title='Segue', content='Segue abaixo')
+        text = 'Segue em anexo a proposta. ' * 3
+
+        trigger = suggest_local(self.user, text, max_suggestions=1)['suggestions'][0]['trigger']
+        self.assertFalse(trigger.startswith('//segue'))
+        response = self.client.post(
+            reverse('shortcuts:shortcut-list'),
+            {'trigger': trigger, 'title': 'Proposta', 'content': 'Segue em anexo a proposta'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_low_confidence_uses_ai_and_quota(self):
+        """Testa que a IA complementa sugestões de baixa confiança consumindo a cota"""
+        ai_result = [{'trigger': '//bom-dia', 'title': 'Bom dia', 'description': 'Saudação'},
+                     {'trigger': '//prazo', 'title': 'Prazo', 'description': 'Prazo de entrega'}]
+        with mock.patch('shortcuts.ai_backends.FakeBackend.suggest_shortcuts', return_value=ai_result):
+            suggestions = AIService().suggest_shortcuts('O prazo de entrega é sexta', 3, user=self.user)
+
+        self.assertEqual(suggestions, [{**ai_result[0], 'source': 'ai'}, {**ai_result[1], 'source': 'ai'}])
+        self.assertEqual(self.user.profile.ai_requests_used, 1)
+
+    def test_usage_history_counted_incrementally(self):
+        """Testa que o histórico de uso é contado de forma incremental"""
+        for _ in range(2):
+            ShortcutUsage.objects.create(shortcut=self.shortcut, user=self.user, context='Painel de vendas')
+        self.assertEqual(suggest_local(self.user)['suggestions'][0]['occurrences'], 2)
+
+        ShortcutUsage.objects.create(shortcut=self.shortcut, user=self.user, context='painel de vendas')
+        result = suggest_local(self.user)
+        self.assertEqual(result['suggestions'][0]['content'], 'Painel de vendas')
+        self.assertEqual(result['suggestions'][0]['occurrences'], 3)
+        self.assertEqual(stats_cache.get(self.user).usage_watermark, ShortcutUsage.objects.latest('id').id)
+
+
+class TriggerIndexTest(TestCase):
+    """Testes para o índice de colisões de gatilhos"""
+
+    def test_conflict_types(self):
+        """Testa conflitos exatos, de prefixo e de distância de edição 1"""
+        index = TriggerIndex([(1, '//email'), (2, '//em'), (3, '//assinatura'), (4, '//emails-vendas')])
+
+        def conflicts(trigger, exclude_id=None):
+            return {(item['trigger'], item['type']) for item in index.conflicts(trigger, exclude_id)}
+
+        self.assertEqual(conflicts('//email'), {('//email', 'exact'), ('//em', 'prefix'), ('//emails-vendas', 'prefix')})
+        self.assertEqual(conflicts('//email', exclude_id=1), {('//em', 'prefix'), ('//emails-vendas', 'prefix')})
+        self.assertEqual(conflicts('//emial'), {('//em', 'prefix')})
+        self.assertEqual(conflicts('//emal'), {('//em', 'prefix'), ('//email', 'similar')})
+        self.assertEqual(conflicts('//asinatura'), {('//assinatura', 'similar')})
+        self.assertEqual(conflicts('//assinaturb'), {('//assinatura', 'similar')})
+        self.assertEqual(conflicts('//obrigado'), set())
+
+        index.add(2, '//oi')
+        index.remove(4)
+        self.assertEqual(conflicts('//email'), {('//email', 'exact')})
+        self.assertEqual(conflicts('//oii'), {('//oi', 'prefix')})
+
+
+class TriggerConflictAPITest(APITestCase):
+    """Testes para a validação de gatilhos na API"""
+
+    def setUp(self):
+        cache.clear()
+        trigger_index_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(user=self.user, trigger='//email', title='Email', content='Olá')
+        self.client.force_authenticate(user=self.user)
+
+    def create(self, trigger):
+        return self.client.post(
+            reverse('shortcuts:shortcut-list'),
+            {'trigger': trigger, 'title': 'Novo', 'content': 'Texto'},
+            format='json'
+        )
+
+    def test_create_and_update_reject_prefix_conflicts(self):
+        """Testa que criar ou renomear para um gatilho ambíguo é recusado"""
+        self.assertEqual(self.create('//em').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create('//email').status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.create('//emial')  # quase-duplicado apenas gera aviso
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.patch(
+            reverse('shortcuts:shortcut-detail', args=[self.shortcut.id]), {'trigger': '//emi'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            reverse('shortcuts:shortcut-detail', args=[self.shortcut.id]), {'trigger': '//mail'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.create('//email').status_code, status.HTTP_201_CREATED)
+
+    def test_trigger_check(self):
+        """Testa o endpoint usado pelo editor enquanto o usuário digita"""
+        url = reverse('shortcuts:shortcut-trigger-check')
+
+        response = self.client.get(url, {'trigger': '//emai'})
+        self.assertFalse(response.data['available'])
+        self.assertEqual(
+            [(conflict['trigger'], conflict['type']) for conflict in response.data['conflicts']],
+            [('//email', 'prefix')]
+        )
+
+        response = self.client.get(url, {'trigger': '//email', 'exclude': self.shortcut.id})
+        self.assertTrue(response.data['available'])
+
+        response = self.client.get(url, {'trigger': 'email'})
+        self.assertFalse(response.data['available'])
+        self.assertTrue(response.data['errors'])
+
+    def test_bulk_import_detects_collisions_within_batch(self):
+        """Testa que a importação recusa colisões com o banco e dentro do próprio lote"""
+        response = self.client.post(reverse('shortcuts:shortcut-import-shortcuts'), {'shortcuts': [
+            {'trigger': '//obrigado', 'title': 'Obrigado', 'content': 'Muito obrigado!'},
+            {'trigger': '//obrigado-2', 'title': 'Obrigado', 'content': 'Obrigado de novo'},
+            {'trigger': '//email', 'title': 'Email', 'content': 'Duplicado'},
+            {'trigger': '//obrigadx', 'title': 'Parecido', 'content': 'Quase igual'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([item['index'] for item in response.data['skipped']], [1, 2])
+        self.assertEqual(response.data['warnings'][0]['trigger'], '//obrigadx')
+        self.assertEqual(
+            set(Shortcut.objects.filter(user=self.user).values_list('trigger', flat=True)),
+            {'//email', '//obrigado', '//obrigadx'}
+        )
+
+
+@override_settings(SHORTCUT_USAGE_BUFFERED=False)
+class DailyUsageRollupTest(APITestCase):
+    """Testes para os totais diários de uso"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.shortcut = Shortcut.objects.create(user=self.user, trigger='//oi', title='Oi', content='Olá!')
+        self.other = Shortcut.objects.create(user=self.user, trigger='//tchau', title='Tchau', content='Até!')
+        self.client.force_authenticate(user=self.user)
+
+    def record(self, shortcut, days_ago=0, times=1):
+        used_at = timezone.now() - timedelta(days=days_ago)
+        # O snapshot de estatísticas é invalidado no commit
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_usage_events([UsageEvent(shortcut.id, self.user.id, used_at)] * times)
+
+    def totals(self):
+        return {
+            (row.shortcut_id, row.date): row.count
+            for row in ShortcutUsageDaily.objects.filter(user=self.user)
+        }
+
+    def test_ingestion_updates_rollup_and_backfill_matches(self):
+        """Testa que a ingestão soma os totais diários e o backfill chega ao mesmo resultado"""
+        self.record(self.shortcut, times=2)
+        self.record(self.shortcut)
+        self.record(self.other, days_ago=1)
+
+        today = timezone.localdate()
+        expected = {
+            (self.shortcut.id, today): 3,
+            (self.other.id, today - timedelta(days=1)): 1,
+        }
+        self.assertEqual(self.totals(), expected)
+
+        ShortcutUsageDaily.objects.all().delete()
+        call_command('backfill_usage_daily', stdout=StringIO())
+        self.assertEqual(self.totals(), expected)
+
+    @override_settings(LOG_RETENTION_DAYS={'shortcut_usage': 30})
+    def test_backfill_keeps_days_past_retention(self):
+        """Testa que o backfill não apaga os totais de dias cujos usos já foram removidos pela retenção"""
+        self.record(self.shortcut, days_ago=40, times=2)
+        self.record(self.shortcut)
+        ShortcutUsage.objects.filter(used_at__lt=timezone.now() - timedelta(days=30)).delete()
+
+        call_command('backfill_usage_daily', stdout=StringIO())
+        today = timezone.localdate()
+        self.assertEqual(self.totals(), {
+            (self.shortcut.id, today - timedelta(days=40)): 2,
+            (self.shortcut.id, today): 1,
+        })
+
+    def test_dashboards_read_rollup_with_constant_queries(self):
+        """Testa que os dashboards usam os totais diários sem depender do tamanho do histórico"""
+        self.record(self.shortcut, times=2)
+        self.record(self.other, days_ago=2)
+
+        def dashboard_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('core:api-dashboard-stats'))
+            return response, len(queries)
+
+        response, small_history_queries = dashboard_queries()
+        self.assertEqual(response.data['usages_today'], 2)
+        self.assertEqual(response.data['monthly_usage'], 3)
+        self.assertEqual([day['count'] for day in response.data['weekly_usage']], [0, 0, 0, 0, 1, 0, 2])
+
+        for days_ago in range(40):
+            self.record(self.other, days_ago=days_ago, times=3)
+        self.assertEqual(dashboard_queries()[1], small_history_queries)
+
+        response = self.client.get(reverse('users:user-stats'))
+        self.assertEqual(
+            response.data['usage_by_month'][timezone.localdate().strftime('%Y-%m')]['count'],
+            ShortcutUsageDaily.objects.filter(
+                user=self.user, date__gte=timezone.localdate().replace(day=1)
+            ).aggregate(total=Sum('count'))['total']
+        )
+
+        response = self.client.get(reverse('shortcuts:shortcut-most-used'), {'days': 1})
+        self.assertEqual([item['trigger'] for item in response.data], ['//tchau', '//oi'])
+
+    def test_day_windows_include_today(self):
+        """Testa que ?days=N cobre os mesmos N dias nos rankings e nos gráficos"""
+        self.record(self.shortcut)
+        self.record(self.other, days_ago=1, times=5)
+
+        response = self.client.get(reverse('shortcuts:shortcut-most-used'), {'days': 1})
+        self.assertEqual([item['trigger'] for item in response.data], ['//oi'])
+        response = self.client.get(reverse('shortcuts:shortcut-most-used'), {'days': 2})
+        self.assertEqual([item['trigger'] for item in response.data], ['//tchau', '//oi'])
+        self.assertEqual(list(get_daily_usage(self.user, 2).values()), [5, 1])
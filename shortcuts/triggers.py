@@ -0,0 +1,223 @@
+"""
+Índice de gatilhos por usuário para detectar colisões.
+
+Três tipos de conflito são detectados para um gatilho novo:
+
+* ``exact``: o gatilho já existe;
+* ``prefix``: um gatilho é prefixo do outro (``//em`` e ``//email``), o que
+  torna a expansão ambígua enquanto o usuário digita;
+* ``similar``: distância de edição 1 (``//email`` e ``//emial``).
+
+Os gatilhos ficam em uma lista ordenada (prefixos via ``bisect``) e em um
+mapa de vizinhança por deleção (cada gatilho indexado também por todas as
+variantes com um caractere a menos), de modo que quase-duplicados são
+encontrados com consultas a dicionário, sem percorrer os gatilhos do usuário.
+
+O índice fica em memória no processo, validado pela mesma versão do índice de
+autocomplete. Quando um atalho é gravado, o índice do processo que gravou é
+atualizado no lugar (sem recompilar); os demais processos recompilam na
+próxima consulta, desde que o cache do Django seja compartilhado entre eles.
+"""
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .autocomplete import get_index_version, invalidate_user_index
+from .models import Shortcut
+
+logger = logging.getLogger(__name__)
+
+PREFIX_LENGTH = len('//')
+
+CONFLICT_MESSAGES = {
+    'exact': 'Este gatilho já existe',
+    'prefix': 'Conflita com o gatilho {trigger} (um é prefixo do outro)',
+    'similar': 'Muito parecido com o gatilho {trigger}',
+}
+
+
+def _deletions(trigger: str) -> set:
+    """Variantes do gatilho com um caractere removido (sem mexer no '//' inicial)"""
+    return {trigger[:index] + trigger[index + 1:] for index in range(PREFIX_LENGTH, len(trigger))}
+
+
+def is_edit_distance_one(first: str, second: str) -> bool:
+    """Verifica se as strings diferem por exatamente uma inserção, remoção ou troca"""
+    if first == second or abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+
+    index = 0
+    while index < len(first) and first[index] == second[index]:
+        index += 1
+    if len(first) == len(second):
+        return first[index + 1:] == second[index + 1:]
+    return first[index:] == second[index + 1:]
+
+
+class TriggerIndex:
+    """Gatilhos de um usuário ordenados e indexados por vizinhança de deleção"""
+
+    def __init__(self, shortcuts=()):
+        """
+        Args:
+            shortcuts: Pares (id do atalho, gatilho)
+        """
+        self._owners = {}
+        self._by_id = {}
+        self._neighbors = defaultdict(set)
+        for shortcut_id, trigger in shortcuts:
+            self._register(shortcut_id, trigger)
+        self._sorted = sorted(self._owners)
+
+    def __len__(self):
+        return len(self._owners)
+
+    def __contains__(self, trigger):
+        return trigger in self._owners
+
+    def _register(self, shortcut_id, trigger):
+        self._owners[trigger] = shortcut_id
+        self._by_id[shortcut_id] = trigger
+        self._neighbors[trigger].add(trigger)
+        for variant in _deletions(trigger):
+            self._neighbors[variant].add(trigger)
+
+    def add(self, shortcut_id, trigger: str):
+        """Adiciona (ou renomeia) o gatilho de um atalho"""
+        if self._by_id.get(shortcut_id) == trigger:
+            return
+        self.remove(shortcut_id)
+        self._register(shortcut_id, trigger)
+        insort(self._sorted, trigger)
+
+    def remove(self, shortcut_id):
+        trigger = self._by_id.pop(shortcut_id, None)
+        if trigger is None:
+            return
+        if self._owners.get(trigger) == shortcut_id:
+            del self._owners[trigger]
+            index = bisect_left(self._sorted, trigger)
+            if index < len(self._sorted) and self._sorted[index] == trigger:
+                del self._sorted[index]
+        for variant in _deletions(trigger) | {trigger}:
+            self._neighbors[variant].discard(trigger)
+            if not self._neighbors[variant]:
+                del self._neighbors[variant]
+
+    def conflicts(self, trigger: str, exclude_id=None, limit: int = 10) -> list:
+        """
+        Lista os gatilhos que conflitam com ``trigger``
+
+        Args:
+            exclude_id: Atalho sendo editado (seu gatilho atual não conta)
+
+        Returns:
+            Lista de dicts com ``trigger``, ``shortcut_id`` e ``type``
+        """
+        found = []
+        seen = set()
+
+        def collect(other, conflict_type):
+            shortcut_id = self._owners.get(other)
+            if other in seen or shortcut_id is None or shortcut_id == exclude_id:
+                return
+            seen.add(other)
+            found.append({'trigger': other, 'shortcut_id': shortcut_id, 'type': conflict_type})
+
+        collect(trigger, 'exact')
+
+        # Gatilhos existentes que são prefixo do novo
+        for length in range(PREFIX_LENGTH + 1, len(trigger)):
+            if trigger[:length] in self._owners:
+                collect(trigger[:length], 'prefix')
+
+        # Gatilhos existentes que começam com o novo (faixa contígua da lista ordenada)
+        index = bisect_left(self._sorted, trigger)
+        while index < len(self._sorted) and len(found) < limit and self._sorted[index].startswith(trigger):
+            collect(self._sorted[index], 'prefix')
+            index += 1
+
+        for variant in _deletions(trigger) | {trigger}:
+            for other in self._neighbors.get(variant, ()):
+                if is_edit_distance_one(trigger, other):
+                    collect(other, 'similar')
+
+        return found[:limit]
+
+
+class TriggerIndexCache:
+    """Cache LRU em processo dos índices de gatilhos por usuário"""
+
+    def __init__(self, max_users: int = 256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> TriggerIndex:
+        version = get_index_version(user_id)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        index = TriggerIndex(Shortcut.objects.filter(user_id=user_id).values_list('id', 'trigger'))
+        logger.debug(f"Índice de gatilhos recompilado para usuário {user_id} ({len(index)} gatilhos)")
+
+        with self._lock:
+            self._entries[user_id] = (version, index)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        return index
+
+    def apply(self, user_id, previous_version, version, shortcut_id, trigger: str = None):
+        """Aplica uma gravação ao índice do processo se ele estava atualizado; senão o descarta"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            if entry[0] != previous_version:
+                del self._entries[user_id]
+                return
+
+            index = entry[1]
+            if trigger is None:
+                index.remove(shortcut_id)
+            else:
+                index.add(shortcut_id, trigger)
+            self._entries[user_id] = (version, index)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+trigger_index_cache = TriggerIndexCache()
+
+
+def record_trigger_change(shortcut, deleted: bool = False):
+    """Invalida os índices do usuário e atualiza o índice de gatilhos deste processo"""
+    previous_version = get_index_version(shortcut.user_id)
+    version = invalidate_user_index(shortcut.user_id)
+    trigger_index_cache.apply(
+        shortcut.user_id, previous_version, version, shortcut.pk,
+        None if deleted else shortcut.trigger
+    )
+
+
+def find_trigger_conflicts(user, trigger: str, exclude_id=None, limit: int = 10) -> list:
+    """Conflitos do gatilho com os atalhos do usuário, cada um com ``message`` e ``blocking``"""
+    blocking_types = getattr(settings, 'SHORTCUT_TRIGGER_BLOCKING_CONFLICTS', ('exact', 'prefix'))
+    conflicts = trigger_index_cache.get(user.pk).conflicts(trigger.lower(), exclude_id, limit)
+    for conflict in conflicts:
+        conflict['message'] = CONFLICT_MESSAGES[conflict['type']].format(trigger=conflict['trigger'])
+        conflict['blocking'] = conflict['type'] in blocking_types
+    return conflicts
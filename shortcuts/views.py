@@ -1,24 +1,39 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Sum
-from django.utils import timezone
+from django.db.models import Q, Sum
 from django.db import IntegrityError
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from datetime import timedelta
-import time
+from rest_framework.renderers import JSONRenderer
 import logging
 
 logger = logging.getLogger(__name__)
 
-from .models import Category, Shortcut, ShortcutUsage, AIEnhancementLog
+from .models import Category, Shortcut, ShortcutUsage, AIEnhancementLog, AIJob
 from .serializers import (
     CategorySerializer, ShortcutSerializer, ShortcutCreateSerializer,
     ShortcutUpdateSerializer, ShortcutUsageSerializer, AIEnhancementLogSerializer,
-    ShortcutSearchSerializer, ShortcutStatsSerializer, BulkShortcutActionSerializer
+    ShortcutSearchSerializer, ShortcutStatsSerializer, BulkShortcutActionSerializer,
+    ExpandTextSerializer, RenderBatchSerializer, UsageBatchSerializer, AIJobSerializer,
+    ShortcutSuggestionSerializer, ShortcutImportSerializer
 )
+from .ai_jobs import submit_enhancement, submit_regenerations
+from .ai_stream import EventStreamRenderer, stream_regeneration
+from .autocomplete import invalidate_user_index
+from .counters import move_shortcuts_to_category, set_shortcuts_active
+from .expansion import expand_text_for_user, expand_texts_for_user
+from .ingestion import record_usage, record_usage_batch
+from .rollups import window_start
+from .templating import render_shortcut_batch
+from .triggers import find_trigger_conflicts
+from .search import search_shortcuts
 from .services import AIService
+from .sync import get_changes, InvalidCursor
+from users.quota import reserve_ai_requests
+from users.stats import get_user_stats, wants_fresh
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -34,9 +49,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        return Category.objects.filter(user=self.request.user).annotate(
-            shortcuts_count=Count('shortcuts', filter=Q(shortcuts__is_active=True))
-        ).order_by('name')
+        return Category.objects.filter(user=self.request.user).order_by('name')
 
     def create(self, request, *args, **kwargs):
         """Sobrescreve create para tratar erros de integridade"""
@@ -167,11 +180,7 @@ class ShortcutViewSet(viewsets.ModelViewSet):
             # Aplicar filtros
             query = serializer.validated_data.get('query')
             if query:
-                queryset = queryset.filter(
-                    Q(trigger__icontains=query) |
-                    Q(title__icontains=query) |
-                    Q(content__icontains=query)
-                )
+                queryset = search_shortcuts(queryset, query)
 
             category = serializer.validated_data.get('category')
             if category:
@@ -185,9 +194,14 @@ class ShortcutViewSet(viewsets.ModelViewSet):
             if is_active is not None:
                 queryset = queryset.filter(is_active=is_active)
 
-            # Ordenação
-            order_by = serializer.validated_data.get('order_by', '-last_used')
-            queryset = queryset.order_by(order_by)
+            # Ordenação (por relevância quando há busca e nenhuma ordem explícita)
+            order_by = serializer.validated_data.get('order_by')
+            if order_by:
+                queryset = queryset.order_by(order_by)
+            elif query:
+                queryset = queryset.order_by('-search_rank', '-last_used', 'trigger')
+            else:
+                queryset = queryset.order_by('-last_used')
 
             # Paginação
             page = self.paginate_queryset(queryset)
@@ -200,80 +214,129 @@ class ShortcutViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'], url_path='trigger-check')
+    def trigger_check(self, request):
+        """Verifica, enquanto o usuário digita, se o gatilho é válido e livre de conflitos"""
+        trigger = request.query_params.get('trigger', '')
+        exclude_id = request.query_params.get('exclude')
+
+        try:
+            trigger = ShortcutSerializer().validate_trigger(trigger)
+        except ValidationError as e:
+            return Response({'trigger': trigger, 'available': False, 'errors': e.detail, 'conflicts': []})
+
+        conflicts = find_trigger_conflicts(
+            request.user, trigger, int(exclude_id) if exclude_id and exclude_id.isdigit() else None
+        )
+        return Response({
+            'trigger': trigger,
+            'available': not any(conflict['blocking'] for conflict in conflicts),
+            'errors': [],
+            'conflicts': conflicts
+        })
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_shortcuts(self, request):
+        """Importa vários atalhos, ignorando os que colidem com gatilhos existentes ou do próprio lote"""
+        serializer = ShortcutImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        profile = request.user.profile
+        remaining = None if profile.max_shortcuts == -1 else max(0, profile.max_shortcuts - profile.shortcuts_active)
+        created = []
+        skipped = []
+        warnings = []
+
+        for position, item in enumerate(serializer.validated_data['shortcuts']):
+            if remaining is not None and len(created) >= remaining:
+                skipped.append({'index': position, 'trigger': item.get('trigger'), 'errors': {
+                    'non_field_errors': [f'Limite de {profile.max_shortcuts} atalhos atingido']
+                }})
+                continue
+
+            # Cada atalho gravado atualiza o índice de gatilhos, então colisões dentro do lote também são detectadas
+            item_serializer = ShortcutCreateSerializer(data=item, context={'request': request})
+            if not item_serializer.is_valid():
+                skipped.append({'index': position, 'trigger': item.get('trigger'), 'errors': item_serializer.errors})
+                continue
+            try:
+                shortcut = item_serializer.save()
+            except IntegrityError:
+                skipped.append({'index': position, 'trigger': item.get('trigger'), 'errors': {
+                    'trigger': ['Já existe um atalho com este gatilho.']
+                }})
+                continue
+            created.append(shortcut.id)
+
+            similar = [
+                conflict for conflict in find_trigger_conflicts(request.user, shortcut.trigger, shortcut.id)
+                if not conflict['blocking']
+            ]
+            if similar:
+                warnings.append({'index': position, 'trigger': shortcut.trigger, 'conflicts': similar})
+
+        return Response({
+            'created': len(created),
+            'created_ids': created,
+            'skipped': skipped,
+            'warnings': warnings
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def suggest(self, request):
+        """Sugere novos atalhos a partir do texto enviado e do histórico do usuário"""
+        serializer = ShortcutSuggestionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        suggestions = AIService().suggest_shortcuts(
+            serializer.validated_data['text'],
+            serializer.validated_data['max_suggestions'],
+            user=request.user
+        )
+        return Response({'suggestions': suggestions})
+
     @action(detail=True, methods=['post'])
     def use(self, request, pk=None):
         """Marca um atalho como usado e retorna o conteúdo processado"""
         shortcut = self.get_object()
 
-        # Incrementa contador de uso
-        shortcut.increment_usage()
-
-        # Registra o uso
-        context = request.data.get('context', '')
-        ShortcutUsage.objects.create(
-            shortcut=shortcut,
-            user=request.user,
-            context=context
-        )
+        # Registra o uso (gravado em lote em segundo plano)
+        event = record_usage(shortcut, request.user, request.data.get('context', ''))
+        shortcut.use_count += 1
+        shortcut.last_used = event.used_at
 
         # Processa conteúdo com IA se necessário
-        content = shortcut.get_processed_content()
-
+        variables = request.data.get('variables')
+        if shortcut.expansion_type == 'dynamic' and isinstance(variables, dict):
+            content = shortcut.process_dynamic_content(variables)
+        else:
+            content = shortcut.get_processed_content()
+
+        # A expansão por IA é enfileirada; responde com o conteúdo já disponível
+        ai_job = None
         if (shortcut.expansion_type == 'ai_enhanced' and
             shortcut.ai_prompt and
             request.user.profile.can_use_ai()):
 
-            content = self.enhance_with_ai(shortcut, content)
+            job = submit_enhancement(shortcut, request.user)
+            if job.status == 'succeeded':
+                content = job.result
+            ai_job = {'id': job.id, 'status': job.status}
 
         return Response({
             'content': content,
             'use_count': shortcut.use_count,
-            'last_used': shortcut.last_used
+            'last_used': shortcut.last_used,
+            'ai_job': ai_job
         })
 
-    def enhance_with_ai(self, shortcut, content):
-        """Expande conteúdo usando IA"""
-        try:
-            start_time = time.time()
-            ai_service = AIService()
-
-            enhanced_content = ai_service.enhance_text(
-                content,
-                shortcut.ai_prompt
-            )
-
-            processing_time = time.time() - start_time
-
-            # Salva o log apenas se houve expansão real
-            if enhanced_content != content:
-                AIEnhancementLog.objects.create(
-                    shortcut=shortcut,
-                    original_content=content,
-                    enhanced_content=enhanced_content,
-                    ai_model_used=ai_service.model_name,
-                    processing_time=processing_time
-                )
-
-                # Atualiza contador de uso de IA
-                self.request.user.profile.increment_ai_usage()
-
-                # Salva conteúdo expandido no atalho
-                shortcut.expanded_content = enhanced_content
-                shortcut.save(update_fields=['expanded_content'])
-
-            return enhanced_content
-
-        except Exception as e:
-            logger.error(f"Erro no enhance_with_ai: {e}")
-            # Em caso de erro, retorna conteúdo original
-            return content
-
     @action(detail=True, methods=['post'])
     def regenerate_ai(self, request, pk=None):
-        """Regenera conteúdo expandido pela IA"""
+        """Enfileira a regeneração do conteúdo expandido pela IA"""
         shortcut = self.get_object()
+        profile = request.user.profile
 
-        if not request.user.profile.can_use_ai():
+        if not profile.can_use_ai():
             return Response(
                 {'error': 'Limite de uso de IA atingido'},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -285,53 +348,105 @@ class ShortcutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        enhanced_content = self.enhance_with_ai(shortcut, shortcut.content)
+        # Regeneração explícita: ignora o cache e gera uma nova versão
+        job = submit_enhancement(shortcut, request.user, bypass_cache=True)
+        if job.status == 'succeeded':
+            enhanced_content = job.result
+        else:
+            enhanced_content = shortcut.expanded_content or shortcut.content
 
         return Response({
+            'job_id': job.id,
+            'status': job.status,
             'enhanced_content': enhanced_content,
-            'ai_requests_remaining': (
-                shortcut.user.profile.max_ai_requests -
-                shortcut.user.profile.ai_requests_used
+            'ai_requests_remaining': profile.max_ai_requests - profile.ai_requests_used
+        }, status=status.HTTP_200_OK if job.is_finished else status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='regenerate-ai/stream',
+            renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def regenerate_ai_stream(self, request, pk=None):
+        """Regenera o conteúdo expandido pela IA enviando o texto por SSE à medida que é gerado"""
+        shortcut = self.get_object()
+
+        if shortcut.expansion_type != 'ai_enhanced':
+            return Response(
+                {'error': 'Este atalho não usa expansão por IA'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+
+        reservation = reserve_ai_requests(request.user.pk)
+        if reservation is None:
+            return Response(
+                {'error': 'Limite de uso de IA atingido'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        response = StreamingHttpResponse(
+            stream_regeneration(shortcut, reservation),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Desativa o buffer de proxies (nginx)
+        return response
+
+    @action(detail=True, methods=['post'])
+    def render_batch(self, request, pk=None):
+        """Renderiza um atalho contra vários conjuntos de variáveis (mala direta)"""
+        shortcut = self.get_object()
+
+        serializer = RenderBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results = render_shortcut_batch(shortcut, serializer.validated_data['variable_sets'])
+
+        return Response({
+            'shortcut_id': shortcut.id,
+            'count': len(results),
+            'results': results
         })
 
     @action(detail=False, methods=['get'])
-    def stats(self, request):
-        """Retorna estatísticas dos atalhos do usuário"""
-        queryset = self.get_queryset()
-
-        total_shortcuts = queryset.count()
-        active_shortcuts = queryset.filter(is_active=True).count()
-        total_uses = queryset.aggregate(total=Sum('use_count'))['total'] or 0
+    def changes(self, request):
+        """Retorna atalhos e categorias alterados ou excluídos desde o cursor informado"""
+        try:
+            changes = get_changes(request.user, request.query_params.get('since'))
+        except InvalidCursor:
+            return Response(
+                {'error': 'Cursor de sincronização inválido', 'reset': True},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Atalho mais usado
-        most_used = queryset.filter(use_count__gt=0).order_by('-use_count').first()
+        return Response({
+            'cursor': changes['cursor'],
+            'full': changes['full'],
+            'shortcuts': ShortcutSerializer(changes['shortcuts'], many=True).data,
+            'categories': CategorySerializer(changes['categories'], many=True).data,
+            'deleted': changes['deleted'],
+        })
 
-        # Atalhos recentes (últimos 5)
-        recent_shortcuts = queryset.order_by('-created_at')[:5]
+    @action(detail=False, methods=['post'], url_path='use-batch')
+    def use_batch(self, request):
+        """Registra vários usos de atalhos de uma vez (ex: fila offline da extensão)"""
+        serializer = UsageBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        # Estatísticas por categoria
-        shortcuts_by_category = dict(
-            queryset.values('category__name')
-            .annotate(count=Count('id'))
-            .values_list('category__name', 'count')
-        )
+        result = record_usage_batch(request.user, serializer.validated_data['events'])
+        return Response(result)
 
-        # Estatísticas por tipo
-        shortcuts_by_type = dict(
-            queryset.values('expansion_type')
-            .annotate(count=Count('id'))
-            .values_list('expansion_type', 'count')
-        )
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Retorna estatísticas dos atalhos do usuário (snapshot em cache; ``?fresh=1`` recalcula)"""
+        stats = get_user_stats(request.user, fresh=wants_fresh(request))
 
         stats_data = {
-            'total_shortcuts': total_shortcuts,
-            'active_shortcuts': active_shortcuts,
-            'total_uses': total_uses,
-            'most_used_shortcut': most_used,
-            'recent_shortcuts': recent_shortcuts,
-            'shortcuts_by_category': shortcuts_by_category,
-            'shortcuts_by_type': shortcuts_by_type
+            'total_shortcuts': stats['total_shortcuts'],
+            'active_shortcuts': stats['active_shortcuts'],
+            'total_uses': stats['total_uses'],
+            'most_used_shortcut': stats['most_used_shortcut'],
+            'recent_shortcuts': stats['recent_shortcuts'],
+            'shortcuts_by_category': stats['shortcuts_by_category'],
+            'shortcuts_by_type': stats['shortcuts_by_type']
         }
 
         serializer = ShortcutStatsSerializer(stats_data)
@@ -348,16 +463,35 @@ class ShortcutViewSet(viewsets.ModelViewSet):
             # Filtra apenas atalhos do usuário
             shortcuts = self.get_queryset().filter(id__in=shortcut_ids)
 
+            if action_type == 'regenerate_ai':
+                if not request.user.profile.can_use_ai():
+                    return Response(
+                        {'error': 'Limite de uso de IA atingido'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS
+                    )
+                # A IA roda no run_ai_worker; a resposta traz as tarefas para acompanhar o andamento
+                summary = submit_regenerations(request.user, shortcuts.order_by('id'))
+                jobs = summary.pop('jobs')
+                return Response({
+                    'message': f'Ação {action_type} enfileirada para {len(jobs)} atalhos',
+                    **summary,
+                    'job_ids': [job.id for job in jobs],
+                }, status=status.HTTP_200_OK if all(job.is_finished for job in jobs) else status.HTTP_202_ACCEPTED)
+
+            # Os helpers atualizam updated_at e os contadores desnormalizados
             if action_type == 'activate':
-                shortcuts.update(is_active=True)
+                set_shortcuts_active(shortcuts, True)
             elif action_type == 'deactivate':
-                shortcuts.update(is_active=False)
+                set_shortcuts_active(shortcuts, False)
             elif action_type == 'delete':
                 shortcuts.delete()
             elif action_type == 'change_category':
                 category_id = serializer.validated_data.get('category_id')
                 category = get_object_or_404(Category, id=category_id, user=request.user)
-                shortcuts.update(category=category)
+                move_shortcuts_to_category(shortcuts, category)
+
+            # update() não dispara sinais
+            invalidate_user_index(request.user.id)
 
             return Response({'message': f'Ação {action_type} executada em {shortcuts.count()} atalhos'})
 
@@ -367,11 +501,12 @@ class ShortcutViewSet(viewsets.ModelViewSet):
     def most_used(self, request):
         """Retorna os atalhos mais usados"""
         days = int(request.query_params.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
+        start_date = window_start(days)
 
-        queryset = self.get_queryset().filter(
-            last_used__gte=start_date
-        ).order_by('-use_count')[:10]
+        # Usos no período somados a partir dos totais diários
+        queryset = self.get_queryset().annotate(
+            period_uses=Sum('daily_usage__count', filter=Q(daily_usage__date__gte=start_date))
+        ).filter(period_uses__gt=0).order_by('-period_uses', '-use_count')[:10]
 
         serializer = ShortcutSerializer(queryset, many=True)
         return Response(serializer.data)
@@ -396,6 +531,16 @@ class ShortcutUsageViewSet(viewsets.ReadOnlyModelViewSet):
         return ShortcutUsage.objects.filter(user=self.request.user).order_by('-used_at')
 
 
+class AIJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet para acompanhar as tarefas de expansão por IA"""
+    serializer_class = AIJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        return AIJob.objects.filter(user=self.request.user).select_related('shortcut').order_by('-created_at')
+
+
 class AIEnhancementLogViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para visualizar logs de expansão por IA"""
     serializer_class = AIEnhancementLogSerializer
@@ -404,3 +549,17 @@ class AIEnhancementLogViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         return AIEnhancementLog.objects.filter(shortcut__user=self.request.user).order_by('-created_at')
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def expand_text(request):
+    """Expande todos os gatilhos de um ou vários textos em uma única chamada"""
+    serializer = ExpandTextSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    if 'text' in serializer.validated_data:
+        return Response(expand_text_for_user(request.user, serializer.validated_data['text']))
+
+    return Response({'results': expand_texts_for_user(request.user, serializer.validated_data['texts'])})
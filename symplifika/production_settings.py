@@ -10,6 +10,16 @@ from .settings import *
 # Override settings for production
 DEBUG = False
 
+# Cache compartilhado entre os processos, mesmo se DEBUG vier ligado no ambiente
+if not REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'symplifika_cache',
+        }
+    }
+SHARED_CACHE_REQUIRED = True
+
 # Production-specific overrides (everything else inherited from base settings)
 SECURE_HSTS_PRELOAD = True
 
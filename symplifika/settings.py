@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from decouple import config
 import dj_database_url
@@ -32,6 +33,9 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-08hhywmq^&43h_lqxa4pc
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+# Rodando a suíte de testes (manage.py test): filas em segundo plano ficam desligadas
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Sentry configuration (replace with your DSN)
 SENTRY_DSN = os.environ.get("SENTRY_DSN", "")
 if SENTRY_DSN:
@@ -175,10 +179,48 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Escritas concorrentes (run_ai_worker, buffers em segundo plano) esperam o lock em vez de falhar
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Testes em arquivo: o SQLite em memória compartilhado entre threads falha em escritas concorrentes
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
 
+# Cache
+# Compartilhado entre os processos (workers do gunicorn e run_ai_worker): guarda as versões dos
+# índices por usuário, os snapshots de estatísticas e os contadores. Redis com REDIS_URL (requer o
+# pacote redis); senão a tabela do banco (createcachetable). LocMemCache (por processo) só em DEBUG.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'symplifika_cache',
+        }
+    }
+
+# Sem cache compartilhado os comandos falham na verificação do sistema (core.E001)
+SHARED_CACHE_REQUIRED = config('SHARED_CACHE_REQUIRED', default=not DEBUG, cast=bool)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -360,11 +402,101 @@ CSRF_USE_SESSIONS = False
 # AI Configuration
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 
+# Backend de IA: 'gemini', 'fake' (local, para testes de carga) ou caminho de uma classe
+AI_BACKEND = config('AI_BACKEND', default='gemini')
+
+# Backend falso: latência até o primeiro token ('fixed', 'uniform' ou 'lognormal'),
+# taxa de erros, vazão de tokens (0 = instantâneo) e semente para reprodutibilidade
+AI_FAKE_LATENCY = {
+    'distribution': config('AI_FAKE_LATENCY_DISTRIBUTION', default='lognormal'),
+    'ms': config('AI_FAKE_LATENCY_MS', default=300, cast=float),
+    'median_ms': config('AI_FAKE_LATENCY_MS', default=300, cast=float),
+    'sigma': config('AI_FAKE_LATENCY_SIGMA', default=0.5, cast=float),
+    'min_ms': config('AI_FAKE_LATENCY_MIN_MS', default=100, cast=float),
+    'max_ms': config('AI_FAKE_LATENCY_MAX_MS', default=800, cast=float),
+}
+AI_FAKE_ERROR_RATE = config('AI_FAKE_ERROR_RATE', default=0.0, cast=float)
+AI_FAKE_TOKENS_PER_SECOND = config('AI_FAKE_TOKENS_PER_SECOND', default=50.0, cast=float)
+AI_FAKE_OUTPUT_TOKENS = config('AI_FAKE_OUTPUT_TOKENS', default=60, cast=int)
+AI_FAKE_SEED = config('AI_FAKE_SEED', default=None)
+
+# Cache das respostas da IA (LRU em processo + cache do Django)
+AI_CACHE_ENABLED = config('AI_CACHE_ENABLED', default=True, cast=bool)
+AI_CACHE_TTL = config('AI_CACHE_TTL', default=7 * 24 * 3600, cast=int)
+AI_CACHE_MAX_ENTRIES = config('AI_CACHE_MAX_ENTRIES', default=1000, cast=int)
+AI_CACHE_SHARED = config('AI_CACHE_SHARED', default=True, cast=bool)
+
+# Cliente Gemini compartilhado (limite por worker, timeout por chamada e circuit breaker)
+AI_CLIENT_MAX_CONCURRENCY = config('AI_CLIENT_MAX_CONCURRENCY', default=4, cast=int)
+AI_CLIENT_ACQUIRE_TIMEOUT = config('AI_CLIENT_ACQUIRE_TIMEOUT', default=2.0, cast=float)
+AI_CLIENT_TIMEOUT = config('AI_CLIENT_TIMEOUT', default=15.0, cast=float)
+AI_CIRCUIT_FAILURE_THRESHOLD = config('AI_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+AI_CIRCUIT_RESET_TIMEOUT = config('AI_CIRCUIT_RESET_TIMEOUT', default=30.0, cast=float)
+
+# Fila de expansões por IA (processada por `manage.py run_ai_worker`)
+AI_JOBS_ASYNC = config('AI_JOBS_ASYNC', default=True, cast=bool)
+AI_JOBS_MAX_ATTEMPTS = config('AI_JOBS_MAX_ATTEMPTS', default=3, cast=int)
+AI_JOBS_RETRY_BASE_DELAY = config('AI_JOBS_RETRY_BASE_DELAY', default=30, cast=int)
+AI_JOBS_RETRY_MAX_DELAY = config('AI_JOBS_RETRY_MAX_DELAY', default=900, cast=int)
+AI_JOBS_STALE_TIMEOUT = config('AI_JOBS_STALE_TIMEOUT', default=600, cast=int)
+AI_WORKER_CONCURRENCY = config('AI_WORKER_CONCURRENCY', default=2, cast=int)
+AI_WORKER_POLL_INTERVAL = config('AI_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+
+# Regeneração em lote (bulk_action 'regenerate_ai' e comando regenerate_ai)
+AI_BULK_MAX_WORKERS = config('AI_BULK_MAX_WORKERS', default=4, cast=int)
+AI_BULK_MAX_SHORTCUTS = config('AI_BULK_MAX_SHORTCUTS', default=100, cast=int)
+
+# Gatilhos: conflitos que impedem salvar ('exact', 'prefix', 'similar') e limite da importação em lote
+SHORTCUT_TRIGGER_BLOCKING_CONFLICTS = config(
+    'SHORTCUT_TRIGGER_BLOCKING_CONFLICTS',
+    default='exact,prefix',
+    cast=str
+).split(',')
+SHORTCUT_IMPORT_MAX_ITEMS = config('SHORTCUT_IMPORT_MAX_ITEMS', default=500, cast=int)
+
+# Sugestões de atalhos (frases frequentes calculadas localmente; IA só com baixa confiança)
+AI_SUGGESTIONS_MIN_CONFIDENCE = config('AI_SUGGESTIONS_MIN_CONFIDENCE', default=0.6, cast=float)
+AI_SUGGESTIONS_MIN_OCCURRENCES = config('AI_SUGGESTIONS_MIN_OCCURRENCES', default=2, cast=int)
+AI_SUGGESTIONS_CONFIDENT_OCCURRENCES = config('AI_SUGGESTIONS_CONFIDENT_OCCURRENCES', default=3, cast=int)
+AI_SUGGESTIONS_MAX_PHRASES = config('AI_SUGGESTIONS_MAX_PHRASES', default=5000, cast=int)
+AI_SUGGESTIONS_MAX_USAGES = config('AI_SUGGESTIONS_MAX_USAGES', default=5000, cast=int)
+
 # Application Configuration
 APP_NAME = config('APP_NAME', default='Symplifika')
 DEFAULT_MAX_SHORTCUTS = config('DEFAULT_MAX_SHORTCUTS', default=50, cast=int)
 DEFAULT_MAX_AI_REQUESTS = config('DEFAULT_MAX_AI_REQUESTS', default=100, cast=int)
 
+# Sincronização incremental da extensão (dias de retenção dos registros de exclusão)
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Registro de uso dos atalhos em lote (buffer em memória descarregado em segundo plano)
+SHORTCUT_USAGE_BUFFERED = config('SHORTCUT_USAGE_BUFFERED', default=not TESTING, cast=bool)
+SHORTCUT_USAGE_FLUSH_INTERVAL = config('SHORTCUT_USAGE_FLUSH_INTERVAL', default=2.0, cast=float)
+SHORTCUT_USAGE_BUFFER_SIZE = config('SHORTCUT_USAGE_BUFFER_SIZE', default=500, cast=int)
+SHORTCUT_USAGE_QUEUE_SIZE = config('SHORTCUT_USAGE_QUEUE_SIZE', default=10000, cast=int)
+
+# Log de atividades gravado em lote por uma thread em segundo plano (False grava na hora)
+ACTIVITY_LOG_ASYNC = config('ACTIVITY_LOG_ASYNC', default=not TESTING, cast=bool)
+ACTIVITY_LOG_FLUSH_INTERVAL = config('ACTIVITY_LOG_FLUSH_INTERVAL', default=2.0, cast=float)
+ACTIVITY_LOG_BATCH_SIZE = config('ACTIVITY_LOG_BATCH_SIZE', default=200, cast=int)
+ACTIVITY_LOG_QUEUE_SIZE = config('ACTIVITY_LOG_QUEUE_SIZE', default=10000, cast=int)
+
+# Retenção dos logs (dias mantidos no banco; 0 desativa) e arquivamento em JSONL compactado (comando prune_logs)
+LOG_RETENTION_DAYS = {
+    'shortcut_usage': config('LOG_RETENTION_SHORTCUT_USAGE_DAYS', default=180, cast=int),
+    'activity_log': config('LOG_RETENTION_ACTIVITY_LOG_DAYS', default=90, cast=int),
+    'ai_enhancement_log': config('LOG_RETENTION_AI_ENHANCEMENT_LOG_DAYS', default=90, cast=int),
+    'stripe_webhook_event': config('LOG_RETENTION_STRIPE_WEBHOOK_EVENT_DAYS', default=90, cast=int),
+}
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'logs'))
+# Tabelas já particionadas por mês no PostgreSQL (ex: shortcuts_shortcutusage,core_activitylog)
+LOG_PARTITIONED_TABLES = [
+    table for table in config('LOG_PARTITIONED_TABLES', default='', cast=str).split(',') if table
+]
+
+# Snapshot das estatísticas por usuário (segundos; invalidado a cada alteração)
+USER_STATS_CACHE_TTL = config('USER_STATS_CACHE_TTL', default=3600, cast=int)
+
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
@@ -404,6 +536,8 @@ API_ENDPOINTS = {
     },
     'shortcuts': {
         'list': f'{API_BASE_URL}/shortcuts/api/shortcuts/',
+        'changes': f'{API_BASE_URL}/shortcuts/api/shortcuts/changes/',
+        'expand': f'{API_BASE_URL}/shortcuts/api/expand/',
         'create': f'{API_BASE_URL}/shortcuts/api/shortcuts/',
         'detail': f'{API_BASE_URL}/shortcuts/api/shortcuts/{{id}}/',
         'categories': f'{API_BASE_URL}/shortcuts/api/categories/',
@@ -444,6 +578,7 @@ CHROME_EXTENSION = {
     'id': config('CHROME_EXTENSION_ID', default='npbabdmkiegnhkmpndnnbmoeljkaeedl'),
     'api_endpoints': {
         'shortcuts': f'{API_BASE_URL}/shortcuts/api/shortcuts/',
+        'changes': f'{API_BASE_URL}/shortcuts/api/shortcuts/changes/',
         'auth': f'{API_BASE_URL}/users/api/auth/login/',
         'execute': f'{API_BASE_URL}/shortcuts/api/shortcuts/{{id}}/execute/',
     }
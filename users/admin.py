@@ -1,9 +1,30 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import UserProfile, PlanPricing, Subscription, Payment, PlanUpgradeRequest
+from .models import UserProfile, AIQuotaUsage, PlanPricing, Subscription, Payment, PlanUpgradeRequest
+from .quota import current_period
+
+
+class CurrentAIUsageAdminMixin:
+    """Coluna com o uso de IA do período atual, anotado no queryset da listagem"""
+
+    @admin.display(description='Requisições IA Usadas', ordering='current_ai_requests_used')
+    def ai_requests_used_display(self, obj):
+        return obj.current_ai_requests_used
+
+    def get_queryset(self, request):
+        # Uma subconsulta em vez de uma consulta ao AIQuotaUsage por linha
+        current_usage = AIQuotaUsage.objects.filter(
+            user_id=OuterRef('user_id'),
+            period=current_period()
+        ).values('used')[:1]
+        return super().get_queryset(request).annotate(
+            current_ai_requests_used=Coalesce(Subquery(current_usage), Value(0))
+        )
 
 
 class UserProfileInline(admin.StackedInline):
@@ -70,9 +91,9 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(CurrentAIUsageAdminMixin, admin.ModelAdmin):
     list_display = [
-        'user', 'plan_display', 'shortcuts_count', 'ai_requests_used',
+        'user', 'plan_display', 'shortcuts_count', 'ai_requests_used_display',
         'max_ai_requests', 'total_shortcuts_used', 'referral_stats_display', 'created_at'
     ]
     list_filter = ['plan', 'ai_enabled', 'theme', 'created_at', 'referred_by']
@@ -141,11 +162,11 @@ class UserProfileAdmin(admin.ModelAdmin):
             )
         return '—'
 
-    @admin.display(description='Atalhos Ativos')
+    @admin.display(description='Atalhos Ativos', ordering='shortcuts_active')
     def shortcuts_count(self, obj):
-        count = obj.user.shortcuts.filter(is_active=True).count()
+        count = obj.shortcuts_active
         if count > 0:
-            url = reverse('admin:shortcuts_shortcut_changelist') + f'?user__id__exact={obj.user.id}'
+            url = reverse('admin:shortcuts_shortcut_changelist') + f'?user__id__exact={obj.user_id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
 
@@ -325,6 +346,18 @@ class PlanUpgradeRequestAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user', 'processed_by')
 
 
+@admin.register(AIQuotaUsage)
+class AIQuotaUsageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'period', 'used', 'updated_at']
+    list_filter = ['period']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['updated_at']
+    date_hierarchy = 'period'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+
 # Desregistra o UserAdmin padrão e registra o customizado
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
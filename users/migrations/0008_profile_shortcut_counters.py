@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_add_unique_referral_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='shortcuts_active',
+            field=models.IntegerField(default=0, verbose_name='Atalhos Ativos'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='shortcuts_total',
+            field=models.IntegerField(default=0, verbose_name='Total de Atalhos'),
+        ),
+    ]
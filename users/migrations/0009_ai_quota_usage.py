@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_current_usage(apps, schema_editor):
+    """Move o contador do perfil para o período atual"""
+    UserProfile = apps.get_model('users', 'UserProfile')
+    AIQuotaUsage = apps.get_model('users', 'AIQuotaUsage')
+    period = timezone.localdate().replace(day=1)
+    AIQuotaUsage.objects.bulk_create([
+        AIQuotaUsage(user_id=user_id, period=period, used=used)
+        for user_id, used in UserProfile.objects.filter(ai_requests_used__gt=0).values_list('user_id', 'ai_requests_used')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_profile_shortcut_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIQuotaUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='Primeiro dia do mês de cobrança', verbose_name='Período')),
+                ('used', models.PositiveIntegerField(default=0, verbose_name='Requisições IA Usadas')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_quota_usages', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Uso de IA por Período',
+                'verbose_name_plural': 'Uso de IA por Período',
+                'ordering': ['-period'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'period'), name='unique_ai_quota_usage_period')],
+            },
+        ),
+        migrations.RunPython(copy_current_usage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='ai_requests_used',
+        ),
+    ]
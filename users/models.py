@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from decimal import Decimal
@@ -103,11 +103,6 @@ class UserProfile(models.Model):
         verbose_name="Modelo IA Preferido"
     )
 
-    ai_requests_used = models.PositiveIntegerField(
-        default=0,
-        verbose_name="Requisições IA Usadas (mês atual)"
-    )
-
     max_ai_requests = models.IntegerField(
         default=100,
         verbose_name="Máximo de Requisições IA por Mês",
@@ -132,12 +127,22 @@ class UserProfile(models.Model):
         verbose_name="Notificações por Email"
     )
 
-    # Estatísticas
+    # Estatísticas (contadores mantidos incrementalmente por shortcuts.counters)
     total_shortcuts_used = models.PositiveIntegerField(
         default=0,
         verbose_name="Total de Atalhos Usados"
     )
 
+    shortcuts_total = models.IntegerField(
+        default=0,
+        verbose_name="Total de Atalhos"
+    )
+
+    shortcuts_active = models.IntegerField(
+        default=0,
+        verbose_name="Atalhos Ativos"
+    )
+
     time_saved_minutes = models.PositiveIntegerField(
         default=0,
         verbose_name="Tempo Economizado (minutos)"
@@ -199,8 +204,13 @@ class UserProfile(models.Model):
         """Verifica se o usuário pode criar mais atalhos"""
         if self.max_shortcuts == -1:  # Ilimitado
             return True
-        current_shortcuts = self.user.shortcuts.filter(is_active=True).count()
-        return current_shortcuts < self.max_shortcuts
+        return self.shortcuts_active < self.max_shortcuts
+
+    @property
+    def ai_requests_used(self):
+        """Requisições de IA usadas no período atual (ver ``AIQuotaUsage``)"""
+        from .quota import get_ai_requests_used
+        return get_ai_requests_used(self.user_id)
 
     def can_use_ai(self):
         """Verifica se o usuário pode usar IA este mês"""
@@ -211,17 +221,14 @@ class UserProfile(models.Model):
         return self.ai_requests_used < self.max_ai_requests
 
     def increment_ai_usage(self):
-        """Incrementa o uso de IA"""
-        if self.can_use_ai():
-            self.ai_requests_used += 1
-            self.save(update_fields=['ai_requests_used'])
-            return True
-        return False
+        """Consome uma requisição de IA de forma atômica"""
+        from .quota import reserve_ai_requests
+        return reserve_ai_requests(self.user_id) is not None
 
     def reset_monthly_counters(self):
-        """Reseta contadores mensais (para ser executado todo mês)"""
-        self.ai_requests_used = 0
-        self.save(update_fields=['ai_requests_used'])
+        """Zera o uso de IA do período atual (a virada do mês é automática)"""
+        from .quota import current_period
+        AIQuotaUsage.objects.filter(user_id=self.user_id, period=current_period()).update(used=0)
 
     def get_avatar_url(self):
         """Retorna a URL do avatar ou None se não existir"""
@@ -429,6 +436,43 @@ def save_user_profile(sender, instance, **kwargs):
         instance.profile.save()
 
 
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_stats(sender, instance, **kwargs):
+    """Descarta o snapshot de estatísticas quando o perfil muda"""
+    from .stats import invalidate_user_stats
+    invalidate_user_stats(instance.user_id)
+
+
+class AIQuotaUsage(models.Model):
+    """Uso de IA de um usuário em um período de cobrança (mês)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='ai_quota_usages',
+        verbose_name="Usuário"
+    )
+    period = models.DateField(
+        verbose_name="Período",
+        help_text="Primeiro dia do mês de cobrança"
+    )
+    used = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Requisições IA Usadas"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Uso de IA por Período"
+        verbose_name_plural = "Uso de IA por Período"
+        ordering = ['-period']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period'], name='unique_ai_quota_usage_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.period:%m/%Y}: {self.used}"
+
+
 class PlanPricing(models.Model):
     """Preços dos planos"""
 
@@ -0,0 +1,106 @@
+"""
+Cota mensal de requisições de IA.
+
+O uso fica em um ``AIQuotaUsage`` por (usuário, período), onde o período é o
+primeiro dia do mês. A reserva é um único ``UPDATE`` condicional
+(``used = used + n WHERE used + n <= limite``), então requisições simultâneas
+nunca ultrapassam o limite do plano. Chamadas que falham devolvem a reserva.
+
+A virada do mês é preguiçosa: a primeira reserva do mês cria o registro do
+novo período, sem job de reset em massa.
+"""
+from datetime import date
+from typing import NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIQuotaUsage, UserProfile
+
+
+class QuotaReservation(NamedTuple):
+    """Requisições reservadas na cota de um usuário"""
+    user_id: int
+    period: date
+    count: int
+
+
+def current_period() -> date:
+    """Primeiro dia do mês atual (período de cobrança)"""
+    return timezone.localdate().replace(day=1)
+
+
+def get_ai_requests_used(user_id, period: date = None) -> int:
+    """Requisições de IA usadas pelo usuário no período (padrão: atual)"""
+    used = AIQuotaUsage.objects.filter(
+        user_id=user_id,
+        period=period or current_period()
+    ).values_list('used', flat=True).first()
+    return used or 0
+
+
+def _ensure_period(user_id, period: date):
+    if AIQuotaUsage.objects.filter(user_id=user_id, period=period).exists():
+        return
+    try:
+        with transaction.atomic():
+            AIQuotaUsage.objects.create(user_id=user_id, period=period)
+    except IntegrityError:
+        # Outra requisição criou o período ao mesmo tempo
+        pass
+
+
+def reserve_ai_requests(user_id, count: int = 1, partial: bool = False) -> Optional[QuotaReservation]:
+    """
+    Reserva ``count`` requisições de IA na cota do período atual
+
+    Args:
+        partial: Aceita reservar menos que ``count`` se a cota não comportar todas
+
+    Returns:
+        ``QuotaReservation`` com a quantidade reservada, ou None se a IA estiver
+        desabilitada ou a cota esgotada
+    """
+    if count <= 0:
+        return None
+
+    profile = UserProfile.objects.filter(user_id=user_id).values('ai_enabled', 'max_ai_requests').first()
+    if not profile or not profile['ai_enabled']:
+        return None
+
+    limit = profile['max_ai_requests']
+    period = current_period()
+    _ensure_period(user_id, period)
+    usage = AIQuotaUsage.objects.filter(user_id=user_id, period=period)
+
+    if limit == -1:  # Ilimitado
+        usage.update(used=F('used') + count)
+        return QuotaReservation(user_id, period, count)
+
+    granted = count
+    for _ in range(5):
+        if usage.filter(used__lte=limit - granted).update(used=F('used') + granted):
+            return QuotaReservation(user_id, period, granted)
+        if not partial:
+            return None
+
+        # Cota insuficiente para tudo: tenta reservar o que ainda resta
+        granted = min(count, limit - get_ai_requests_used(user_id, period))
+        if granted <= 0:
+            return None
+
+    return None
+
+
+def release_ai_requests(reservation: Optional[QuotaReservation], count: int = None):
+    """Devolve requisições reservadas e não utilizadas (padrão: a reserva inteira)"""
+    if reservation is None:
+        return
+    count = reservation.count if count is None else min(count, reservation.count)
+    if count > 0:
+        AIQuotaUsage.objects.filter(
+            user_id=reservation.user_id,
+            period=reservation.period,
+            used__gte=count
+        ).update(used=F('used') - count)
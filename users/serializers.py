@@ -26,7 +26,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
 
     def get_shortcuts_count(self, obj):
-        return obj.user.shortcuts.filter(is_active=True).count()
+        return obj.shortcuts_active
 
     def get_ai_requests_remaining(self, obj):
         return max(0, obj.max_ai_requests - obj.ai_requests_used)
@@ -0,0 +1,139 @@
+"""
+Snapshot das estatísticas de um usuário.
+
+Dashboards e endpoints de estatísticas leem um único dicionário calculado de
+uma vez (contadores do perfil, atalhos mais usados, totais por categoria,
+tipo, dia e mês) e guardado no cache compartilhado do Django. A chave inclui uma versão
+por usuário, trocada pelos sinais de ``Shortcut``, ``Category``,
+``ShortcutUsage`` e ``UserProfile`` e pelas gravações em lote que não
+disparam sinais; a próxima leitura recalcula o snapshot. A data também faz
+parte da chave, então os totais "de hoje" viram à meia-noite.
+
+O uso de IA muda a cada chamada e é lido à parte (``AIQuotaUsage``), sem
+invalidar o snapshot.
+"""
+import calendar
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import UserProfile
+from .quota import get_ai_requests_used
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'users:stats:version:{user_id}'
+SNAPSHOT_CACHE_KEY = 'users:stats:{user_id}:{version}:{day}'
+
+
+def get_stats_version(user_id) -> str:
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user_stats(user_id):
+    """
+    Descarta o snapshot do usuário em todos os processos
+
+    A versão só muda depois do commit da transação em andamento: trocada
+    antes, uma leitura concorrente recalcularia o snapshot com os dados
+    antigos e o guardaria já com a versão nova.
+    """
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def wants_fresh(request) -> bool:
+    """``?fresh=1`` força o recálculo do snapshot"""
+    return request.query_params.get('fresh', '').lower() in ('1', 'true', 'yes')
+
+
+def compute_user_stats(user) -> dict:
+    """Calcula todas as estatísticas do usuário"""
+    from shortcuts.counters import get_shortcuts_by_category
+    from shortcuts.models import Shortcut
+    from shortcuts.rollups import count_shortcuts_used_since, get_daily_usage, get_monthly_usage, window_start
+    from shortcuts.serializers import ShortcutSerializer
+
+    profile, _ = UserProfile.objects.get_or_create(user=user)
+    shortcuts = Shortcut.objects.filter(user=user)
+    today = timezone.localdate()
+
+    most_used = list(shortcuts.filter(use_count__gt=0).order_by('-use_count')[:5])
+    recent = list(shortcuts.order_by('-created_at')[:5])
+
+    months = []
+    month = today.replace(day=1)
+    for _ in range(6):
+        months.append(month)
+        month = (month - timedelta(days=1)).replace(day=1)
+    monthly = get_monthly_usage(user, months[-1])
+
+    return {
+        'computed_at': timezone.now(),
+        'plan': profile.plan,
+        'plan_display': profile.get_plan_display(),
+        'max_shortcuts': profile.max_shortcuts,
+        'max_ai_requests': profile.max_ai_requests,
+        'max_ai_requests_free': profile.max_ai_requests_free,
+        'theme': profile.theme,
+        'total_shortcuts': profile.shortcuts_total,
+        'active_shortcuts': profile.shortcuts_active,
+        'total_uses': profile.total_shortcuts_used,
+        'time_saved_minutes': profile.time_saved_minutes,
+        'categories_count': user.categories.filter(shortcuts_total__gt=0).count(),
+        'most_used_shortcuts': [
+            {'trigger': shortcut.trigger, 'title': shortcut.title, 'use_count': shortcut.use_count}
+            for shortcut in most_used
+        ],
+        'most_used_shortcut': ShortcutSerializer(most_used[0]).data if most_used else None,
+        'top_shortcuts': ShortcutSerializer(most_used[:3], many=True).data,
+        'recent_shortcuts': ShortcutSerializer(recent, many=True).data,
+        'shortcuts_by_category': get_shortcuts_by_category(user, profile.shortcuts_total),
+        'shortcuts_by_type': dict(
+            shortcuts.values('expansion_type').annotate(count=Count('id')).values_list('expansion_type', 'count')
+        ),
+        'daily_usage': get_daily_usage(user, 30),
+        'usage_by_month': {
+            month.strftime('%Y-%m'): {'month': calendar.month_name[month.month], 'count': monthly.get(month, 0)}
+            for month in months
+        },
+        'recent_activity': count_shortcuts_used_since(user, window_start(7)),
+    }
+
+
+def get_user_stats(user, fresh: bool = False) -> dict:
+    """
+    Estatísticas do usuário a partir do snapshot em cache
+
+    Args:
+        fresh: Ignora o snapshot e recalcula
+
+    Returns:
+        Dict do snapshot com ``ai_requests_used`` e ``ai_requests_remaining`` atuais
+    """
+    key = SNAPSHOT_CACHE_KEY.format(
+        user_id=user.pk, version=get_stats_version(user.pk), day=timezone.localdate().isoformat()
+    )
+    stats = None if fresh else cache.get(key)
+    if stats is None:
+        stats = compute_user_stats(user)
+        cache.set(key, stats, getattr(settings, 'USER_STATS_CACHE_TTL', 3600))
+        logger.debug(f"Snapshot de estatísticas recalculado para usuário {user.pk}")
+
+    ai_requests_used = get_ai_requests_used(user.pk)
+    return {
+        **stats,
+        'ai_requests_used': ai_requests_used,
+        'ai_requests_remaining': max(0, stats['max_ai_requests'] - ai_requests_used),
+    }
@@ -1,3 +1,185 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from shortcuts.ingestion import record_usage
+from shortcuts.models import Shortcut
+
+from .models import AIQuotaUsage
+from .quota import current_period, get_ai_requests_used, release_ai_requests, reserve_ai_requests
+from .stats import compute_user_stats, get_user_stats
+
+
+class AIQuotaTest(TestCase):
+    """Testes da cota de IA por período"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='quota', password='testpass123')
+        self.user.profile.max_ai_requests = 3
+        self.user.profile.save()
+
+    def test_reserve_until_limit(self):
+        """Testa que a reserva respeita o limite do plano"""
+        for _ in range(3):
+            self.assertIsNotNone(reserve_ai_requests(self.user.pk))
+        self.assertIsNone(reserve_ai_requests(self.user.pk))
+        self.assertEqual(self.user.profile.ai_requests_used, 3)
+        self.assertFalse(self.user.profile.can_use_ai())
+
+    def test_partial_reservation_and_release(self):
+        """Testa reserva parcial e devolução"""
+        reservation = reserve_ai_requests(self.user.pk, 5, partial=True)
+        self.assertEqual(reservation.count, 3)
+        self.assertIsNone(reserve_ai_requests(self.user.pk, 2))
+
+        release_ai_requests(reservation, 2)
+        self.assertEqual(get_ai_requests_used(self.user.pk), 1)
+
+    def test_disabled_and_unlimited(self):
+        """Testa IA desabilitada e plano ilimitado"""
+        profile = self.user.profile
+        profile.ai_enabled = False
+        profile.save()
+        self.assertIsNone(reserve_ai_requests(self.user.pk))
+
+        profile.ai_enabled = True
+        profile.max_ai_requests = -1
+        profile.save()
+        self.assertEqual(reserve_ai_requests(self.user.pk, 10).count, 10)
+
+    def test_period_rolls_over_lazily(self):
+        """Testa que o novo mês começa zerado sem job de reset"""
+        with mock.patch('users.quota.current_period', return_value=date(2026, 1, 1)):
+            reserve_ai_requests(self.user.pk, 3)
+            self.assertFalse(self.user.profile.can_use_ai())
+
+        with mock.patch('users.quota.current_period', return_value=date(2026, 2, 1)):
+            self.assertTrue(self.user.profile.can_use_ai())
+            self.assertIsNotNone(reserve_ai_requests(self.user.pk))
+
+        self.assertEqual(
+            dict(AIQuotaUsage.objects.filter(user=self.user).values_list('period', 'used')),
+            {date(2026, 1, 1): 3, date(2026, 2, 1): 1}
+        )
+
+    def test_reset_monthly_counters(self):
+        """Testa o reset manual do período atual"""
+        self.user.profile.increment_ai_usage()
+        self.user.profile.reset_monthly_counters()
+        self.assertEqual(get_ai_requests_used(self.user.pk, current_period()), 0)
+
+
+class UserProfileAdminTest(TestCase):
+    """Testes da listagem de perfis no admin"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123', email='a@a.com')
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/users/userprofile/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_without_per_row_queries(self):
+        """Testa que o uso de IA do período vem anotado, sem uma consulta por perfil"""
+        AIQuotaUsage.objects.create(user=self.admin, period=current_period(), used=7)
+        AIQuotaUsage.objects.create(user=self.admin, period=date(2020, 1, 1), used=99)
+        baseline = self.changelist_queries()
+
+        for index in range(3):
+            User.objects.create_user(username=f'user{index}', password='testpass123')
+        self.assertEqual(self.changelist_queries(), baseline)
+
+        response = self.client.get('/admin/users/userprofile/')
+        self.assertContains(response, '<td class="field-ai_requests_used_display">7</td>', html=True)
+
+class AIQuotaConcurrencyTest(TransactionTestCase):
+    """Testa reservas simultâneas"""
+
+    def test_concurrent_reservations_never_exceed_limit(self):
+        """Testa que reservas concorrentes não ultrapassam o limite"""
+        user = User.objects.create_user(username='concurrent', password='testpass123')
+        user.profile.max_ai_requests = 5
+        user.profile.save()
+
+        def reserve(_):
+            try:
+                return reserve_ai_requests(user.pk) is not None
+            except Exception:
+                # SQLite pode recusar escritas simultâneas; o que importa é o limite
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            granted = sum(executor.map(reserve, range(12)))
+
+        self.assertLessEqual(granted, 5)
+        self.assertEqual(get_ai_requests_used(user.pk), granted)
+
+
+@override_settings(SHORTCUT_USAGE_BUFFERED=False)
+class UserStatsSnapshotTest(TestCase):
+    """Testes do snapshot de estatísticas por usuário"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='stats', password='testpass123')
+        self.shortcut = Shortcut.objects.create(
+            user=self.user, trigger='//oi', title='Oi', content='Olá, tudo bem?'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_snapshot_is_cached(self):
+        """Testa que a segunda leitura não recalcula"""
+        get_user_stats(self.user)
+        with mock.patch('users.stats.compute_user_stats') as compute:
+            stats = get_user_stats(self.user)
+        compute.assert_not_called()
+        self.assertEqual(stats['total_shortcuts'], 1)
+
+    def test_invalidated_by_writes(self):
+        """Testa a invalidação, após o commit, ao criar atalho e registrar uso"""
+        self.assertEqual(get_user_stats(self.user)['total_shortcuts'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Shortcut.objects.create(user=self.user, trigger='//tchau', title='Tchau', content='Até logo')
+            # Antes do commit o snapshot anterior continua valendo
+            self.assertEqual(get_user_stats(self.user)['total_shortcuts'], 1)
+        self.assertEqual(get_user_stats(self.user)['total_shortcuts'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_usage(self.shortcut, self.user)
+        stats = get_user_stats(self.user)
+        self.assertEqual(stats['total_uses'], 1)
+        self.assertEqual(stats['most_used_shortcut']['trigger'], '//oi')
+
+    def test_ai_usage_is_live(self):
+        """Testa que o uso de IA não depende do snapshot"""
+        get_user_stats(self.user)
+        reserve_ai_requests(self.user.pk, 2)
+        self.assertEqual(get_user_stats(self.user)['ai_requests_used'], 2)
+
+    def test_fresh_parameter_recomputes(self):
+        """Testa ?fresh=1 nos endpoints"""
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_shortcuts'], 1)
+
+        with mock.patch('users.stats.compute_user_stats', wraps=compute_user_stats) as compute:
+            self.client.get('/shortcuts/api/shortcuts/stats/')
+            compute.assert_not_called()
+            response = self.client.get('/users/api/users/stats/?fresh=1')
+            compute.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_shortcuts'], 1)
@@ -2,18 +2,16 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Sum, Count
 from django.utils import timezone
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from datetime import timedelta
-import calendar
 from django.contrib.auth.decorators import login_required
 
 from .models import UserProfile
+from .stats import get_user_stats, wants_fresh
 from .serializers import (
     UserSerializer,
     UserUpdateSerializer,
@@ -83,93 +81,25 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def stats(self, request):
-        """Retorna estatísticas do usuário"""
-        user = request.user
-
-        # Estatísticas básicas
-        shortcuts = user.shortcuts.all()
-        total_shortcuts = shortcuts.count()
-        active_shortcuts = shortcuts.filter(is_active=True).count()
-        total_uses = shortcuts.aggregate(total=Sum("use_count"))["total"] or 0
-
-        # Estatísticas de IA (cria profile se não existir)
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        ai_requests_used = profile.ai_requests_used
-        ai_requests_remaining = max(0, profile.max_ai_requests - ai_requests_used)
-
-        # Tempo economizado
-        time_saved_minutes = profile.time_saved_minutes
-        time_saved_hours = round(time_saved_minutes / 60, 2)
-
-        # Atalhos mais usados (top 5)
-        most_used_shortcuts = list(
-            shortcuts.filter(use_count__gt=0)
-            .order_by("-use_count")[:5]
-            .values("trigger", "title", "use_count")
-        )
-
-        # Uso por mês (últimos 6 meses)
-        usage_by_month = self.get_usage_by_month(user)
-
-        # Atalhos por categoria
-        shortcuts_by_category = dict(
-            shortcuts.values("category__name")
-            .annotate(count=Count("id"))
-            .values_list("category__name", "count")
-        )
+        """Retorna estatísticas do usuário (snapshot em cache; ``?fresh=1`` recalcula)"""
+        stats = get_user_stats(request.user, fresh=wants_fresh(request))
 
         stats_data = {
-            "total_shortcuts": total_shortcuts,
-            "active_shortcuts": active_shortcuts,
-            "total_uses": total_uses,
-            "ai_requests_used": ai_requests_used,
-            "ai_requests_remaining": ai_requests_remaining,
-            "time_saved_minutes": time_saved_minutes,
-            "time_saved_hours": time_saved_hours,
-            "most_used_shortcuts": most_used_shortcuts,
-            "usage_by_month": usage_by_month,
-            "shortcuts_by_category": shortcuts_by_category,
+            "total_shortcuts": stats["total_shortcuts"],
+            "active_shortcuts": stats["active_shortcuts"],
+            "total_uses": stats["total_uses"],
+            "ai_requests_used": stats["ai_requests_used"],
+            "ai_requests_remaining": stats["ai_requests_remaining"],
+            "time_saved_minutes": stats["time_saved_minutes"],
+            "time_saved_hours": round(stats["time_saved_minutes"] / 60, 2),
+            "most_used_shortcuts": stats["most_used_shortcuts"],
+            "usage_by_month": stats["usage_by_month"],
+            "shortcuts_by_category": stats["shortcuts_by_category"],
         }
 
         serializer = UserStatsSerializer(stats_data)
         return Response(serializer.data)
 
-    def get_usage_by_month(self, user):
-        """Calcula uso por mês dos últimos 6 meses"""
-        now = timezone.now()
-        usage_by_month = {}
-
-        for i in range(6):
-            # Calcula o mês
-            month_date = now - timedelta(days=30 * i)
-            month_key = month_date.strftime("%Y-%m")
-            month_name = calendar.month_name[month_date.month]
-
-            # Conta usos no mês
-            month_start = month_date.replace(
-                day=1, hour=0, minute=0, second=0, microsecond=0
-            )
-            if i == 0:
-                month_end = now
-            else:
-                next_month = (
-                    month_start.replace(month=month_start.month + 1)
-                    if month_start.month < 12
-                    else month_start.replace(year=month_start.year + 1, month=1)
-                )
-                month_end = next_month - timedelta(seconds=1)
-
-            usage_count = (
-                user.shortcuts.filter(
-                    usage_history__used_at__range=[month_start, month_end]
-                ).aggregate(total=Count("usage_history"))["total"]
-                or 0
-            )
-
-            usage_by_month[month_key] = {"month": month_name, "count": usage_count}
-
-        return usage_by_month
-
     @action(detail=False, methods=["post"])
     def delete_account(self, request):
         """Exclui a conta do usuário"""
@@ -539,38 +469,18 @@ def password_reset_confirm(request):
 @permission_classes([IsAuthenticated])
 def dashboard_data(request):
     """Retorna dados para o dashboard do usuário"""
-    user = request.user
-
-    # Estatísticas rápidas
-    shortcuts_count = user.shortcuts.filter(is_active=True).count()
-    total_uses = user.shortcuts.aggregate(total=Sum("use_count"))["total"] or 0
-
-    # Atalhos recentes (últimos 5 criados)
-    recent_shortcuts = user.shortcuts.order_by("-created_at")[:5]
-
-    # Atalhos mais usados (top 3)
-    top_shortcuts = user.shortcuts.filter(use_count__gt=0).order_by("-use_count")[:3]
-
-    # Atividade recente (últimos 7 dias)
-    week_ago = timezone.now() - timedelta(days=7)
-    recent_activity = (
-        user.shortcuts.filter(usage_history__used_at__gte=week_ago).distinct().count()
-    )
-
-    from shortcuts.serializers import ShortcutSerializer
+    stats = get_user_stats(request.user, fresh=wants_fresh(request))
 
     return Response(
         {
-            "shortcuts_count": shortcuts_count,
-            "total_uses": total_uses,
-            "recent_activity": recent_activity,
-            "ai_requests_remaining": max(
-                0, profile.max_ai_requests - profile.ai_requests_used
-            ),
-            "recent_shortcuts": ShortcutSerializer(recent_shortcuts, many=True).data,
-            "top_shortcuts": ShortcutSerializer(top_shortcuts, many=True).data,
-            "plan": profile.get_plan_display(),
-            "theme": profile.theme,
+            "shortcuts_count": stats["active_shortcuts"],
+            "total_uses": stats["total_uses"],
+            "recent_activity": stats["recent_activity"],
+            "ai_requests_remaining": stats["ai_requests_remaining"],
+            "recent_shortcuts": stats["recent_shortcuts"],
+            "top_shortcuts": stats["top_shortcuts"],
+            "plan": stats["plan_display"],
+            "theme": stats["theme"],
         }
     )
 